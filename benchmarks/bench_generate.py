@@ -0,0 +1,78 @@
+"""generate_city end-to-end (activity totals -> snapshot files)"""
+import os
+import json
+import random
+import shutil
+import tempfile
+
+from benchmarks.common import quiet
+
+import fetch_stargazers
+
+
+class CityFixture:
+    """Fake activity totals worth n entities (half houses, half trees), run in a temp dir"""
+
+    def setup(self, n):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="bitville_bench_")
+        os.chdir(self.tmp)
+        self.original_metrics = fetch_stargazers.load_activity_metrics
+        metrics = {
+            "total_keys": n * 1000,
+            "total_active_seconds": (n // 2) * 300,
+            "total_idle_seconds": (n // 2) * 300
+        }
+        fetch_stargazers.load_activity_metrics = lambda: metrics
+
+    def teardown(self, n):
+        fetch_stargazers.load_activity_metrics = self.original_metrics
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class GenerateCity(CityFixture):
+    # Entities generated
+    params = [100, 1000, 10000, 100000]
+    quick_params = [100, 1000]
+
+    def time_generate_city(self, n):
+        with quiet():
+            fetch_stargazers.generate_city("BenchUser")
+
+
+class GenerateCityBulk(CityFixture):
+    params = [100, 1000, 10000, 100000, 1000000]
+    quick_params = [100, 1000]
+
+    def time_generate_city_bulk(self, n):
+        with quiet():
+            fetch_stargazers.generate_city_bulk("BenchUser")
+
+    def run_in(self, generate, dirname):
+        """Runs one generator in its own subdirectory; returns (houses, roads, grid bytes)"""
+        os.makedirs(dirname)
+        os.chdir(dirname)
+        try:
+            with quiet():
+                generate("BenchUser")
+            with open("stargazers_houses.json") as f:
+                houses = json.load(f)
+            with open("roads.json") as f:
+                roads = json.load(f)
+            with open("occupancy.bin", "rb") as f:
+                grid = f.read()
+        finally:
+            os.chdir(self.tmp)
+        return houses, roads, grid
+
+    def check_parity(self, n):
+        """generate_city_bulk() writes the same city as generate_city() for the same inputs"""
+        return self.run_in(fetch_stargazers.generate_city, "scalar") == self.run_in(fetch_stargazers.generate_city_bulk, "bulk")
+
+    def check_reproducible(self, n):
+        """Same username and activity totals -> the same city, whatever the global random state"""
+        random.seed(n)
+        first = self.run_in(fetch_stargazers.generate_city_bulk, "first")
+        random.seed(n + 1)
+        return first == self.run_in(fetch_stargazers.generate_city_bulk, "second")
@@ -0,0 +1,62 @@
+"""City layout generation and road lookups"""
+import os
+import json
+import shutil
+import tempfile
+
+from benchmarks.common import quiet
+
+from fetch_stargazers import generate_city_slots
+from layout_cache import LayoutCache
+
+
+class GenerateCitySlots:
+    params = [100, 1000, 10000, 100000, 1000000]
+    quick_params = [100, 1000, 10000]
+
+    def time_generate_city_slots(self, n):
+        generate_city_slots(n)
+
+
+class CachedCitySlots:
+    """generate_city_slots(n) answered from a warm layout_cache.bin (mapped at every run)"""
+    params = [100, 1000, 10000, 100000, 1000000]
+    quick_params = [100, 1000, 10000]
+
+    def setup(self, n):
+        self.tmp = tempfile.mkdtemp(prefix="bitville_bench_")
+        self.path = os.path.join(self.tmp, "layout_cache.bin")
+        LayoutCache(self.path).ensure(n)
+
+    def teardown(self, n):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def time_cached_slots(self, n):
+        cache = LayoutCache(self.path)
+        cache.slots(n)
+        cache.close()
+
+    def time_cached_next_slot(self, n):
+        cache = LayoutCache(self.path)
+        cache.slot(n - 1)
+        cache.close()
+
+
+class RoadLookup:
+    """Per-tile membership tests, as the renderer does for every visible tile"""
+    params = [1000, 100000]
+    quick_params = [1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.roads = generate_city_slots(n)[2]
+
+    def time_has_100x100_viewport(self, n):
+        has = self.roads.has
+        for y in range(-50, 50):
+            for x in range(-50, 50):
+                has(x, y)
+
+    def time_serialize(self, n):
+        json.dumps(self.roads.to_dict())
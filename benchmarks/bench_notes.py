@@ -0,0 +1,88 @@
+"""Activity Feed notes log: the page's 2 s poll, its first load, saving a note and searching"""
+import os
+import json
+import atexit
+import shutil
+import tempfile
+
+from benchmarks.common import ROOT  # noqa: F401 (puts the project root on sys.path)
+
+from notes_store import NotesLog, append_note
+from notes_index import NotesIndex
+
+
+def make_notes_log(n):
+    """A temp dir holding a notes log with n records; returns (dir, path)"""
+    tmp = tempfile.mkdtemp(prefix="bitville_bench_")
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    path = os.path.join(tmp, "user_inputs.jsonl")
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "question": "What are you gonna do?",
+                "answer": f"Note number {i} about refactoring the parser",
+                "timestamp": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}"
+            }) + "\n")
+    return tmp, path
+
+
+class NotesFeed:
+    params = [1000, 10000, 100000]
+    quick_params = [1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.tmp, self.path = make_notes_log(n)
+            self.log = NotesLog(self.path)
+            self.cursor = self.log.get_since(0)["cursor"]
+
+    def time_poll_unchanged(self, n):
+        self.log.get_since(self.cursor)
+
+    def time_poll_one_new(self, n):
+        append_note({"answer": "one more"}, self.path)
+        self.cursor = self.log.get_since(self.cursor)["cursor"]
+
+    def time_first_load(self, n):
+        NotesLog(self.path).get_since(0)
+
+
+class NoteSave:
+    """GlassApp.save_answer: one locked, fsynced append, independent of the log size"""
+    params = [1000, 100000]
+    quick_params = [1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.tmp, self.path = make_notes_log(n)
+
+    def time_append(self, n):
+        append_note({"question": "What are you gonna do?", "answer": "one more"}, self.path)
+
+
+class NotesSearch:
+    """Api.search against the persisted index (budget: 10 ms at 100k notes)"""
+    params = [1000, 100000]
+    quick_params = [1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.tmp, self.path = make_notes_log(n)
+            self.index = NotesIndex(self.path)
+            self.index.refresh()
+            self.index.save()
+
+    def time_common_term(self, n):
+        self.index.search("parser")
+
+    def time_prefix(self, n):
+        self.index.search("refac")
+
+    def time_rare_and_common(self, n):
+        self.index.search("number 42")
+
+    def time_load_snapshot(self, n):
+        NotesIndex(self.path)
@@ -0,0 +1,89 @@
+"""Persistence: activity log saves, city snapshot (de)serialization and map.json"""
+import io
+import os
+import json
+
+from benchmarks.common import CityWorkdir, quiet
+import map_store
+
+
+class SaveData:
+    """save_data() without a reward firing (the once-a-minute steady state)"""
+    params = [100, 1000, 10000, 100000]
+    quick_params = [100, 1000]
+    ops = 20
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(n)
+        c = self.city.collector
+        c.progress_active_sec = c.progress_idle_sec = c.progress_keys = c.progress_commits = 0
+
+    def time_save_data(self, n):
+        c = self.city.collector
+        with quiet():
+            for _ in range(self.ops):
+                c.key_presses += 1
+                c.active_seconds += 1
+                c.save_data()
+
+
+class StargazersJson:
+    params = [100, 1000, 10000, 100000]
+    quick_params = [100, 1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(n)
+            self.houses = json.loads(self.city.snapshot)
+
+    def time_parse(self, n):
+        json.loads(self.city.snapshot)
+
+    def time_dump(self, n):
+        json.dump(self.houses, io.StringIO(), indent=4)
+
+
+class MapStore:
+    """map.json: shape-encoded save/load and the chunked bridge round trip, with the city's houses as entities"""
+    params = [1000, 10000, 100000]
+    quick_params = [1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(n)
+            self.map = {"entities": json.loads(self.city.snapshot), "name": "bench"}
+            self.path = os.path.join(self.city.path, "datas", "map.json")
+            map_store.save_map(self.map, self.path)
+
+    def time_save(self, n):
+        map_store.save_map(self.map, self.path)
+
+    def time_save_indent4(self, n):
+        """What save_map did before: pretty-printed, written in place"""
+        with open(self.path + ".plain", 'w') as f:
+            json.dump(self.map, f, indent=4)
+
+    def time_load(self, n):
+        map_store.load_map(self.path)
+
+    def time_chunked_read(self, n):
+        transfers = map_store.Transfers()
+        info = transfers.begin_read(map_store.read_map_text(self.path))
+        map_store.decode_map("".join(transfers.read_chunk(info["id"], i) for i in range(info["chunks"])))
+
+    def check_roundtrip(self, n):
+        """Saved and loaded back (directly and through chunks), the map is unchanged and smaller than indent=4"""
+        map_store.save_map(self.map, self.path)
+        transfers = map_store.Transfers(chunk_chars=4096)
+        tid = transfers.begin_write()
+        text = json.dumps(self.map)
+        for i in range(0, len(text), 4096):
+            transfers.write_chunk(tid, i // 4096, text[i:i + 4096])
+        map_store.save_map_text(transfers.finish_write(tid), self.path + ".chunked")
+        return (map_store.load_map(self.path) == self.map
+                and map_store.load_map(self.path + ".chunked") == self.map
+                and os.path.getsize(self.path) < len(json.dumps(self.map, indent=4)))
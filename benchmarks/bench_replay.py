@@ -0,0 +1,106 @@
+"""Time-lapse replay: loading a city history, seeking and scrubbing through it"""
+import os
+import atexit
+import random
+import shutil
+import tempfile
+
+from benchmarks.common import ROOT  # noqa: F401 (puts the project root on sys.path)
+from city_history import CityReplay, HistoryLog, FULL_STATE_RATIO
+from road_network import RoadNetwork
+
+
+def write_history(path, records, seed=0):
+    """A year of growth in `records` saves: mostly appended houses/trees (with a road now and then), some terraces"""
+    rng = random.Random(seed)
+    history = HistoryLog(path)
+    entities = [{"id": 0, "type": "owner", "login": "BenchUser", "x": 0, "y": 0, "facing": "down", "slot": 0}]
+    roads = RoadNetwork()
+    roads.add_h(1, -2, 2)
+    history.record_city(0.0, entities, roads)
+    t = 0.0
+    for i in range(records - 1):
+        t += rng.uniform(0, 2 * 365 * 86400 / records)
+        if rng.random() < 0.15 and len(entities) > 1:
+            ent = dict(rng.choice(entities[1:]))
+            ent["has_terrace"] = True
+            entities[ent["id"]] = ent
+            # What record_city logs for it, without diffing the whole city each time
+            history.append({"t": t, "set": [ent]})
+            continue
+        added = []
+        for _ in range(rng.randint(1, 3)):
+            n = len(entities)
+            ent = {"id": n, "type": "tree" if rng.random() < 0.4 else "activity_house",
+                   "login": f"House {n}", "x": n % 97, "y": n // 97, "facing": "left", "slot": n}
+            entities.append(ent)
+            added.append(ent)
+        new_roads = RoadNetwork()
+        if rng.random() < 0.1:
+            new_roads.add_v(len(entities) % 97, 0, len(entities) // 97)
+            roads.add_v(len(entities) % 97, 0, len(entities) // 97)
+        history.record_added(t, entities, added, new_roads, roads)
+    return t
+
+
+class Replay:
+    params = [1000, 10000, 100000]
+    quick_params = [1000, 10000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            if getattr(self, 'tmp', None):
+                shutil.rmtree(self.tmp, ignore_errors=True)
+            self.n = n
+            self.tmp = tempfile.mkdtemp(prefix="bitville_bench_")
+            atexit.register(shutil.rmtree, self.tmp, ignore_errors=True)
+            self.path = os.path.join(self.tmp, "city_history.jsonl")
+            self.end = write_history(self.path, n)
+            self.replay = CityReplay(self.path)
+            self.replay.refresh()
+            rng = random.Random(n)
+            self.seeks = [rng.uniform(0, self.end) for _ in range(50)]
+
+    def time_load(self, n):
+        CityReplay(self.path).refresh()
+
+    def time_seek(self, n):
+        """50 random jumps, each a full state"""
+        r = self.replay
+        for t in self.seeks:
+            r.state_at(r.index_at(t))
+
+    def time_play(self, n):
+        """Playing a year at 30 days/s, 30 steps/s: 365 steps forward, each a delta"""
+        r = self.replay
+        index = -1
+        for k in range(1, 366):
+            j = r.index_at(self.end * k / 365)
+            r.delta(index, j)
+            index = j
+
+    def time_scrub(self, n):
+        """Dragging the slider back and forth: deltas, or a full state past FULL_STATE_RATIO of the city"""
+        r = self.replay
+        index = r.index_at(self.end / 2)
+        for k in range(200):
+            j = r.index_at(self.end * (0.5 + 0.3 * ((k % 50) / 50 - 0.5) * (1 if k < 100 else -1)))
+            if r.delta(index, j, max(64, int(len(r.ents) * FULL_STATE_RATIO))) is None:
+                r.state_at(j)
+            index = j
+
+    def check_consistency(self, n):
+        """Keyframe + records == delta from anywhere, in both directions; the end is the full log applied"""
+        r = self.replay
+        rng = random.Random(n)
+        for _ in range(30):
+            i, j = rng.randrange(-1, len(r)), rng.randrange(-1, len(r))
+            state = {e["id"]: e for e in r.state_at(i)[0]}
+            d = r.delta(i, j)
+            for ent_id in d["del"]:
+                state.pop(ent_id, None)
+            for e in d["put"]:
+                state[e["id"]] = e
+            if state != {e["id"]: e for e in r.state_at(j)[0]}:
+                return False
+        return r.state_at(len(r) - 1)[0] == list(r.ents.values())
@@ -0,0 +1,101 @@
+"""Reward processing on cities of increasing size"""
+from benchmarks.common import CityWorkdir, make_raw_city, quiet
+from data_collector import write_json
+
+
+class RecalculateAndSave:
+    params = [100, 1000, 10000, 100000]
+    quick_params = [100, 1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(1)
+            self.raw = make_raw_city(n)
+
+    def time_recalculate_and_save(self, n):
+        c = self.city.collector
+        with quiet():
+            c.recalculate_and_save([dict(e) for e in self.raw], c.houses_path, c.roads_path)
+
+
+class CheckRewards:
+    params = [100, 1000, 10000, 100000]
+    quick_params = [100, 1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(n)
+        self.city.restore()
+        c = self.city.collector
+        # One of each reward per call
+        c.progress_active_sec = c.THRESHOLD_HOUSE
+        c.progress_idle_sec = c.THRESHOLD_TREE
+        c.progress_keys = c.THRESHOLD_UPGRADE
+        c.progress_commits = c.GIT_POST_THRESHOLD
+
+    def time_check_rewards(self, n):
+        with quiet():
+            self.city.collector.check_rewards()
+
+
+class NextUpgradeTarget:
+    """Picking the next upgrade target once the current one got its terrace"""
+    params = [1000, 10000, 100000]
+    quick_params = [1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(n)
+        self.city.collector.upgrade_target = None
+
+    def time_ensure_next_upgrade_target(self, n):
+        with quiet():
+            self.city.collector.ensure_next_upgrade_target()
+
+
+class RewardBacklog:
+    """Coming back to a big backlog: `n` pending rewards of each kind, applied in one batch"""
+    params = [100, 1000, 10000]
+    quick_params = [100]
+
+    def setup(self, n):
+        if getattr(self, 'city', None) is None:
+            self.city = CityWorkdir(1000)
+        self.city.restore()
+        c = self.city.collector
+        self.notifications = []
+        c.on_reward = lambda title, msg: self.notifications.append(title)
+        c.progress_active_sec = n * c.THRESHOLD_HOUSE
+        c.progress_idle_sec = n * c.THRESHOLD_TREE
+        c.progress_keys = n * c.THRESHOLD_UPGRADE
+        c.progress_commits = n * c.GIT_POST_THRESHOLD
+
+    def time_check_rewards_backlog(self, n):
+        with quiet():
+            self.city.collector.check_rewards()
+
+
+class Requantize:
+    """Threshold change on an existing city: diff + one layout save"""
+    params = [1000, 10000, 100000]
+    quick_params = [1000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(n)
+        self.city.restore()
+        c = self.city.collector
+        # History worth ~10% more houses/trees than the city has
+        write_json(c.filename, {
+            "total_active_seconds": int(n * 0.55) * c.THRESHOLD_HOUSE,
+            "total_idle_seconds": int(n * 0.5) * c.THRESHOLD_TREE,
+            "total_keys": int(n * 0.2) * c.THRESHOLD_UPGRADE
+        })
+
+    def time_requantize_city(self, n):
+        with quiet():
+            self.city.collector.requantize_city()
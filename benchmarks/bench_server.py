@@ -0,0 +1,48 @@
+"""Loopback asset server: a data poll of an unchanged city vs re-reading and parsing it"""
+import os
+import json
+import http.client
+
+from benchmarks.common import CityWorkdir
+
+from local_server import AssetServer
+
+
+class CityPoll:
+    """stargazers_houses.json polled over a kept-alive connection"""
+    params = [1000, 10000, 100000]
+    quick_params = [1000, 10000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            if getattr(self, 'server', None):
+                self.server.stop()
+            self.n = n
+            self.city = CityWorkdir(n)
+            self.server = AssetServer({"visualizer": [os.path.join(self.city.path, "visualizer")]}).start()
+            self.path = "/" + self.server.url("visualizer/stargazers_houses.json").split("/", 3)[3]
+            self.conn = http.client.HTTPConnection(self.server.host, self.server.port)
+            self.etag = self.get()[1]
+
+    def get(self, headers=None):
+        self.conn.request("GET", self.path, headers=headers or {})
+        res = self.conn.getresponse()
+        return res.status, res.getheader("ETag"), res.read()
+
+    def time_unchanged_poll(self, n):
+        """Revalidation: a 304, no body"""
+        self.get({"If-None-Match": self.etag})
+
+    def time_gzip_fetch(self, n):
+        """A full (cached, gzipped) response"""
+        self.get({"Accept-Encoding": "gzip"})
+
+    def time_reread_parse(self, n):
+        """What every ?t= poll cost the page before: the whole file read and parsed"""
+        with open(self.city.collector.houses_path, 'r') as f:
+            json.load(f)
+
+    def check_not_modified(self, n):
+        """An unchanged file answers 304; a changed one a new ETag and its body"""
+        status, etag, body = self.get({"If-None-Match": self.etag})
+        return status == 304 and etag == self.etag and body == b""
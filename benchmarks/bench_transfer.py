@@ -0,0 +1,51 @@
+"""City entities across the pywebview bridge: JSON text vs the base64 binary entity table"""
+import json
+import base64
+
+from benchmarks.common import CityWorkdir
+
+import entity_table
+from map_store import Transfers
+
+
+class CityTransfer:
+    """
+    The Python side of one city load. JSON: what pywebview does with a
+    returned list (json.dumps per call). Binary: the encoded table is cached
+    per file version, so a load only slices the base64 into chunks.
+    """
+    params = [1000, 10000, 100000]
+    quick_params = [1000, 10000]
+
+    def setup(self, n):
+        if getattr(self, 'n', None) != n:
+            self.n = n
+            self.city = CityWorkdir(n)
+            self.houses = json.loads(self.city.snapshot)
+            self.blob = entity_table.encode(self.houses)
+            self.b64 = base64.b64encode(self.blob).decode('ascii')
+
+    def time_json(self, n):
+        json.dumps(self.houses)
+
+    def time_binary_encode(self, n):
+        """After the city changed: encode + base64 (once per version)"""
+        base64.b64encode(entity_table.encode(self.houses))
+
+    def time_binary_chunks(self, n):
+        transfers = Transfers()
+        info = transfers.begin_read(self.b64)
+        for i in range(info["chunks"]):
+            transfers.read_chunk(info["id"], i)
+
+    def time_binary_decode(self, n):
+        """Reference decoder (the page uses entity_table.js)"""
+        entity_table.decode(base64.b64decode(self.b64))
+
+    def check_roundtrip(self, n):
+        """The table decodes back to the same entities"""
+        return entity_table.decode(base64.b64decode(self.b64)) == self.houses
+
+    def check_smaller(self, n):
+        """Even as base64, the table is smaller than the JSON text"""
+        return len(self.b64) < len(json.dumps(self.houses))
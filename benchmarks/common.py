@@ -0,0 +1,59 @@
+"""Shared fixtures for the benchmark suite"""
+import os
+import sys
+import json
+import atexit
+import random
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+if os.path.join(ROOT, 'visualizer') not in sys.path:
+    sys.path.insert(0, os.path.join(ROOT, 'visualizer'))
+
+from data_collector import DataCollector
+from simulator import setup_workdir, quiet_logs as quiet
+
+
+def make_raw_city(n, seed=0):
+    """N raw entities (owner + mixed houses/trees/git posts), as check_rewards appends them"""
+    rng = random.Random(seed)
+    entities = [{"type": "owner", "login": "BenchUser"}]
+    for i in range(n - 1):
+        roll = rng.random()
+        if roll < 0.45:
+            entities.append({"type": "tree", "x": 0, "y": 0, "obstacle": "tree"})
+        elif roll < 0.5:
+            entities.append({"type": "git_post", "login": f"Commit Node {i}", "x": 0, "y": 0, "username": f"Git {i}"})
+        else:
+            entities.append({"type": "activity_house", "login": f"House {i}", "x": 0, "y": 0})
+    return entities
+
+
+class CityWorkdir:
+    """A throwaway city directory with a headless collector pointed at it"""
+    def __init__(self, n):
+        self.path = tempfile.mkdtemp(prefix="bitville_bench_")
+        atexit.register(self.cleanup)
+        setup_workdir(self.path, "BenchUser")
+        with quiet():
+            self.collector = DataCollector(
+                filename=os.path.join(self.path, "datas", "activity_log.json"),
+                base_path=self.path,
+                headless=True
+            )
+            self.collector.recalculate_and_save(make_raw_city(n), self.collector.houses_path, self.collector.roads_path)
+            self.collector.migrate_ids()
+        with open(self.collector.houses_path, 'r') as f:
+            self.snapshot = f.read()
+
+    def restore(self):
+        """Puts the city back to its initial N entities (and the collector's indexes with it)"""
+        with open(self.collector.houses_path, 'w') as f:
+            f.write(self.snapshot)
+        self.collector.index_city(json.loads(self.snapshot))
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
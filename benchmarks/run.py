@@ -0,0 +1,191 @@
+"""
+Benchmark runner (asv-style).
+
+Every benchmarks/bench_*.py module holds classes with a `params` list, optional
+`setup(n)` / `teardown(n)` (run around every timed call, outside the timing)
+and `time_*` methods. `check_*` methods are correctness checks (e.g. a fast
+path against its reference): they run once per param, untimed, and must return
+True. Results are written to benchmarks/results/ as JSON and
+compared against a baseline so regressions fail the run.
+
+Usage:
+    python benchmarks/run.py                      # full suite, compare to baseline.json
+    python benchmarks/run.py --quick -k layout    # small sizes, only matching names
+    python benchmarks/run.py --save-baseline      # record this run as the new baseline
+    python benchmarks/run.py --compare results/20260101-120000.json --threshold 1.10
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import platform
+import argparse
+import importlib
+import statistics
+import subprocess
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_FILE = os.path.join(RESULTS_DIR, "baseline.json")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def discover(pattern=None, prefix="time_"):
+    """Yields (name, cls, method_name) for every time_* benchmark (or check_* with prefix="check_")"""
+    for fname in sorted(os.listdir(BENCH_DIR)):
+        if not (fname.startswith("bench_") and fname.endswith(".py")):
+            continue
+        mod_name = fname[:-3]
+        module = importlib.import_module(f"benchmarks.{mod_name}")
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for meth in sorted(m for m in dir(cls) if m.startswith(prefix)):
+                name = f"{mod_name}.{cls_name}.{meth}"
+                if pattern and pattern not in name:
+                    continue
+                yield name, cls, meth
+
+
+def time_one(inst, meth, n, repeat, budget):
+    """Times inst.meth(n) up to `repeat` times, stopping early once `budget` seconds are spent"""
+    times = []
+    for _ in range(repeat):
+        if hasattr(inst, "setup"):
+            inst.setup(n)
+        t0 = time.perf_counter()
+        getattr(inst, meth)(n)
+        times.append(time.perf_counter() - t0)
+        if hasattr(inst, "teardown"):
+            inst.teardown(n)
+        if sum(times) >= budget:
+            break
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "runs": len(times)
+    }
+
+
+def check_one(inst, meth, n):
+    if hasattr(inst, "setup"):
+        inst.setup(n)
+    try:
+        return bool(getattr(inst, meth)(n))
+    finally:
+        if hasattr(inst, "teardown"):
+            inst.teardown(n)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of (name, base_min, new_min, ratio) that got slower than threshold"""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = res["min"] / base["min"] if base["min"] > 0 else 1.0
+        res["baseline_ratio"] = ratio
+        if ratio > threshold:
+            regressions.append((name, base["min"], res["min"], ratio))
+    return regressions
+
+
+def fmt_time(sec):
+    if sec < 1e-3:
+        return f"{sec * 1e6:.1f}us"
+    if sec < 1:
+        return f"{sec * 1e3:.2f}ms"
+    return f"{sec:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BitVille benchmark suite")
+    parser.add_argument("-k", dest="pattern", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Use the small quick_params sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Max timed runs per benchmark")
+    parser.add_argument("--budget", type=float, default=5.0, help="Stop repeating after this many seconds")
+    parser.add_argument("--compare", help="Baseline results file (default: results/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Fail if min time exceeds baseline by this ratio")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write this run as results/baseline.json")
+    args = parser.parse_args()
+
+    failed_checks = []
+    for name, cls, meth in discover(args.pattern, prefix="check_"):
+        params = getattr(cls, "quick_params", None) if args.quick else None
+        params = params or getattr(cls, "params", [None])
+        inst = cls()
+        for n in params:
+            key = f"{name}[{n}]"
+            ok = check_one(inst, meth, n)
+            if not ok:
+                failed_checks.append(key)
+            print(f"{key:<60} {'ok' if ok else 'FAILED':>10}")
+
+    results = {}
+    for name, cls, meth in discover(args.pattern):
+        params = getattr(cls, "quick_params", None) if args.quick else None
+        params = params or getattr(cls, "params", [None])
+        inst = cls()
+        for n in params:
+            key = f"{name}[{n}]"
+            res = time_one(inst, meth, n, args.repeat, args.budget)
+            results[key] = res
+            print(f"{key:<60} {fmt_time(res['min']):>10} (median {fmt_time(res['median'])}, {res['runs']} runs)")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    run = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "quick": args.quick,
+        "results": results
+    }
+
+    baseline_path = args.compare or BASELINE_FILE
+    regressions = []
+    if os.path.exists(baseline_path):
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.threshold)
+        run["baseline"] = os.path.relpath(baseline_path, BENCH_DIR)
+
+    out_path = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(out_path, 'w') as f:
+        json.dump(run, f, indent=4)
+    print(f"Results written to {out_path}")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(run, f, indent=4)
+        print(f"Baseline updated: {BASELINE_FILE}")
+
+    if failed_checks:
+        print(f"\n{len(failed_checks)} check(s) failed:")
+        for name in failed_checks:
+            print(f"  {name}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.2f}x baseline:")
+        for name, base, new, ratio in regressions:
+            print(f"  {name}: {fmt_time(base)} -> {fmt_time(new)} ({ratio:.2f}x)")
+    if failed_checks or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
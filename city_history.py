@@ -0,0 +1,323 @@
+"""
+City history for the time-lapse replay: datas/city_history.jsonl
+(map_store.history_path()), one JSON record per layout save, appended by
+the collector (HistoryLog).
+
+    {"t": 1767258000.0, "add": [ent, ...], "roads": {segments}}
+    {"t": ..., "del": [id, ...], "set": [ent, ...], "add": [...], "roads_all": {segments}}
+
+Entities are keyed by their "id". A record applies as: del, then set
+(replace the whole entity), then add; "roads" adds segments, "roads_all"
+replaces the network. The first record holds the whole city as it was when
+the history started. Saves that only append entities log just those; full
+rewrites (terraces, requantize, compact layout) are diffed against the state
+at the end of the log, so a record is as small as the change.
+
+CityReplay rebuilds any point in time without re-running the layout:
+
+- Loading applies the records in order and keeps a keyframe (a shallow copy
+  of the state) once the records since the last one changed 1/KEYFRAME_SHARE
+  of the city (or after KEYFRAME_EVERY records), so the copies add up to a
+  few times the entities ever changed, not records x city size.
+- state_at(i) bisects the keyframes and applies the few records between the
+  one before i and i on top of a copy of it; index_at(t) bisects the record
+  times. Both are O(log n) to find.
+- delta(i, j) is the net change between two points, either direction (each
+  record keeps its inverse), so playing or scrubbing nearby only moves the
+  entities that changed.
+
+Needs visualizer/ on sys.path (road_network), as data_collector sets it up.
+"""
+import os
+import gc
+import json
+import logging
+from bisect import bisect_right
+from itertools import chain
+
+from road_network import RoadNetwork
+
+log = logging.getLogger(__name__)
+
+KEYFRAME_EVERY = 4096
+KEYFRAME_SHARE = 8      # A keyframe once the changes since the last one reach 1/8 of the city
+KEYFRAME_MIN_CHANGES = 256
+FULL_STATE_RATIO = 0.5  # delta() gives up past this share of the city
+
+
+def apply_record(ents, roads, rec):
+    """
+    Applies a record to the state (ents: id -> entity, in order; roads: a
+    RoadNetwork, changed in place). Returns (roads, inverse), inverse being
+    (ids to delete, {id: entity} to put back) to undo the entity changes.
+    """
+    inv_del = []
+    inv_put = {}
+    for ent_id in rec.get("del", ()):
+        old = ents.pop(ent_id, None)
+        if old is not None:
+            inv_put[ent_id] = old
+    for ent in rec.get("set", ()):
+        old = ents.get(ent["id"])
+        ents[ent["id"]] = ent
+        if old is None:
+            inv_del.append(ent["id"])
+        else:
+            inv_put.setdefault(ent["id"], old)
+    for ent in rec.get("add", ()):
+        old = ents.get(ent["id"])
+        ents[ent["id"]] = ent
+        if old is None:
+            inv_del.append(ent["id"])
+        else:
+            inv_put.setdefault(ent["id"], old)
+    if "roads_all" in rec:
+        roads = RoadNetwork.from_dict(rec["roads_all"])
+    elif rec.get("roads"):
+        extra = rec["roads"]
+        for y, a, b in extra.get("h", ()):
+            roads.add_h(y, a, b)
+        for x, a, b in extra.get("v", ()):
+            roads.add_v(x, a, b)
+        roads.normalize()
+    return roads, (inv_del, inv_put)
+
+
+def changes_roads(rec):
+    return "roads_all" in rec or bool(rec.get("roads", {}).get("h") or rec.get("roads", {}).get("v"))
+
+
+def read_records(path, offset=0):
+    """(records, end offset) for the complete lines after `offset`; unreadable lines are skipped"""
+    records = []
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return records, offset
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            log.warning("Skipping unreadable city history record")
+            continue
+        if isinstance(rec, dict) and "t" in rec:
+            records.append(rec)
+    return records, offset + end
+
+
+class HistoryLog:
+    """
+    The collector's side: appends a record per layout save. Knows the state
+    at the end of the log (replayed from it on first use) to diff full saves.
+    If the file isn't the size this log left it at (deleted by a data reset,
+    replaced), the state is replayed again, so the next record starts from
+    what the file holds.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.ents = None
+        self.roads = None
+        self.size = 0
+
+    def file_size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def load_state(self):
+        size = self.file_size()
+        if self.ents is not None and size == self.size:
+            return
+        self.ents = {}
+        self.roads = RoadNetwork()
+        records, _ = read_records(self.path)
+        self.size = size
+        for rec in records:
+            self.roads, _ = apply_record(self.ents, self.roads, rec)
+
+    def append(self, rec):
+        line = json.dumps(rec, separators=(',', ':')) + "\n"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(line.encode('utf-8'))
+            self.size = f.tell()
+        self.roads, _ = apply_record(self.ents, self.roads, rec)
+        return len(line)
+
+    def record_added(self, t, entities, added, new_roads, roads):
+        """New entities at the end of `entities` (and the road segments they brought); returns bytes written"""
+        self.load_state()
+        if not self.ents:
+            return self.record_city(t, entities, roads)
+        rec = {"t": t, "add": [dict(e) for e in added]}
+        roads_dict = new_roads.to_dict()
+        if roads_dict["h"] or roads_dict["v"]:
+            rec["roads"] = {"h": roads_dict["h"], "v": roads_dict["v"]}
+        return self.append(rec)
+
+    def record_city(self, t, entities, roads):
+        """The whole city after a rewrite, logged as its difference from the log's end; returns bytes written"""
+        self.load_state()
+        current = {}
+        for e in entities:
+            if 'id' in e:
+                current[e['id']] = e
+        rec = {"t": t}
+        dels = [i for i in self.ents if i not in current]
+        sets = [dict(e) for i, e in current.items() if i in self.ents and self.ents[i] != e]
+        adds = [dict(e) for i, e in current.items() if i not in self.ents]
+        if dels:
+            rec["del"] = dels
+        if sets:
+            rec["set"] = sets
+        if adds:
+            rec["add"] = adds
+        roads_dict = roads.to_dict()
+        if roads_dict != self.roads.to_dict():
+            rec["roads_all"] = roads_dict
+        if len(rec) == 1:
+            return 0
+        return self.append(rec)
+
+
+class CityReplay:
+    """The city at any point of its history (see the module docstring). Call refresh() to pick up new records."""
+    def __init__(self, path, keyframe_every=KEYFRAME_EVERY):
+        self.path = path
+        self.keyframe_every = keyframe_every
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.size = 0
+        self.records = []
+        self.times = []
+        self.inverses = []
+        self.roads_version = []     # Index of the last record at or before i that changed the roads
+        self.ents = {}              # State after the last record
+        self.roads = RoadNetwork()
+        self.keyframes = [(-1, {}, RoadNetwork())]   # (index, ents, roads), ascending
+        self.keyframe_index = [-1]
+        self.since_keyframe = 0
+
+    def refresh(self):
+        """Reads records appended since the last call; returns how many were added"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self.size:
+            self.reset()   # Replaced / truncated
+        self.size = size
+        # Only containers that live on: collecting while they pile up just rescans them
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            records, self.offset = read_records(self.path, self.offset)
+            for rec in records:
+                self.add(rec)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return len(records)
+
+    def add(self, rec):
+        i = len(self.records)
+        t = float(rec["t"])
+        if self.times and t < self.times[-1]:
+            t = self.times[-1]   # Clock went back: keep the times sorted
+        self.roads, inverse = apply_record(self.ents, self.roads, rec)
+        self.records.append(rec)
+        self.times.append(t)
+        self.inverses.append(inverse)
+        prev = self.roads_version[-1] if self.roads_version else -1
+        self.roads_version.append(i if changes_roads(rec) else prev)
+
+        self.since_keyframe += len(rec.get("add", ())) + len(rec.get("set", ())) + len(rec.get("del", ()))
+        if (i - self.keyframe_index[-1] >= self.keyframe_every
+                or self.since_keyframe >= max(KEYFRAME_MIN_CHANGES, len(self.ents) // KEYFRAME_SHARE)):
+            self.keyframes.append((i, dict(self.ents), self.roads.copy()))
+            self.keyframe_index.append(i)
+            self.since_keyframe = 0
+
+    # --- Queries ---
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def start(self):
+        return self.times[0] if self.times else None
+
+    @property
+    def end(self):
+        return self.times[-1] if self.times else None
+
+    def index_at(self, t):
+        """Index of the last record at or before time t (-1: before the history starts)"""
+        return bisect_right(self.times, t) - 1
+
+    def state_at(self, index):
+        """(entities in order, RoadNetwork) after record `index` (-1 = empty city)"""
+        index = min(index, len(self.records) - 1)
+        k = bisect_right(self.keyframe_index, index) - 1
+        start, ents, roads = self.keyframes[k]
+        ents = dict(ents)
+        roads = roads.copy()
+        for rec in self.records[start + 1:index + 1]:
+            roads, _ = apply_record(ents, roads, rec)
+        return list(ents.values()), roads
+
+    def roads_at(self, index):
+        index = min(index, len(self.records) - 1)
+        version = self.roads_version[index] if index >= 0 else -1
+        k = bisect_right(self.keyframe_index, version) - 1
+        start, _, roads = self.keyframes[k]
+        roads = roads.copy()
+        for i in range(start + 1, version + 1):
+            rec = self.records[i]
+            if changes_roads(rec):
+                roads, _ = apply_record({}, roads, {key: rec[key] for key in ("roads", "roads_all") if key in rec})
+        return roads
+
+    def roads_changed(self, i, j):
+        version = lambda k: self.roads_version[k] if k >= 0 else -1
+        return version(min(i, len(self.records) - 1)) != version(min(j, len(self.records) - 1))
+
+    def delta(self, i, j, limit=None):
+        """
+        Net change from the state after record i to the one after record j:
+        {"put": [entities], "del": [ids]}, or None if it touches more than
+        `limit` entities (fetch state_at(j) instead).
+        """
+        last = len(self.records) - 1
+        i, j = min(i, last), min(j, last)
+        puts = {}
+        dels = set()
+        if j >= i:
+            for rec in self.records[i + 1:j + 1]:
+                for ent_id in rec.get("del", ()):
+                    puts.pop(ent_id, None)
+                    dels.add(ent_id)
+                for ent in chain(rec.get("set", ()), rec.get("add", ())):
+                    puts[ent["id"]] = ent
+                    dels.discard(ent["id"])
+                if limit is not None and len(puts) + len(dels) > limit:
+                    return None
+        else:
+            for k in range(i, j, -1):
+                inv_del, inv_put = self.inverses[k]
+                for ent_id in inv_del:
+                    puts.pop(ent_id, None)
+                    dels.add(ent_id)
+                for ent_id, ent in inv_put.items():
+                    puts[ent_id] = ent
+                    dels.discard(ent_id)
+                if limit is not None and len(puts) + len(dels) > limit:
+                    return None
+        return {"put": list(puts.values()), "del": sorted(dels)}
@@ -0,0 +1,87 @@
+"""
+Stable city layout: an entity gets its position once, when it is placed, and
+keeps it forever.
+
+generate_city_slots(n) lays the city out as an ordered list of slots (spiral
+of blocks around the owner). The "compact" layout re-assigns slot i to entity
+i on every change, so removing one entity shifts everything after it and
+every save rewrites every record. In the "stable" layout:
+
+- Every placed entity carries "slot" (its index in that slot order) next to
+  its x / y / facing. Those are never recomputed.
+- New entities take the lowest free slots (holes left by removed entities
+  are reused first, then the city grows outwards).
+- Roads only ever grow: the new tiles are the ones the larger layout adds.
+
+pin_layout() is the one-time migration for cities saved by the compact
+layout: it records the slot each entity currently sits on.
+"""
+
+
+def is_pinned(ent):
+    return 'slot' in ent
+
+
+def pin_layout(entities, slots):
+    """
+    Marks entities that already sit on a slot as pinned there. `slots` is
+    generate_city_slots(len(entities))[0]. Returns how many were pinned;
+    entities on placeholder / duplicate positions stay unpinned and get
+    placed like new ones.
+    """
+    index = {}
+    for i, (x, y) in enumerate(slots):
+        index.setdefault((x, y), i)
+    taken = set()
+    pinned = 0
+    for ent in entities:
+        if is_pinned(ent):
+            taken.add(ent['slot'])
+            continue
+        slot = index.get((ent.get('x'), ent.get('y')))
+        if slot is None or slot in taken:
+            continue
+        ent['slot'] = slot
+        taken.add(slot)
+        pinned += 1
+    return pinned
+
+
+def free_slots(entities, count):
+    """The `count` lowest slot indices no pinned entity occupies"""
+    occupied = set(ent['slot'] for ent in entities if is_pinned(ent))
+    free = []
+    i = 0
+    while len(free) < count:
+        if i not in occupied:
+            free.append(i)
+        i += 1
+    return free
+
+
+def slot_limit(entities):
+    """Slots the current layout spans (highest pinned slot + 1)"""
+    return max((ent['slot'] for ent in entities if is_pinned(ent)), default=-1) + 1
+
+
+def assign_slots(entities, generate_slots):
+    """
+    Pins every unpinned entity to the lowest free slot.
+
+    generate_slots: generate_city_slots.
+    Returns (placed, roads): the newly placed entities (x / y / facing / slot
+    set) and the RoadNetwork of the grown layout.
+    """
+    new = [ent for ent in entities if not is_pinned(ent)]
+    targets = free_slots(entities, len(new))
+    limit = max(slot_limit(entities), (targets[-1] + 1) if targets else 0, 1)
+    slots, facings, roads = generate_slots(limit)
+    for ent, slot in zip(new, targets):
+        ent['x'], ent['y'] = slots[slot]
+        ent['facing'] = facings[slot] if slot < len(facings) else 'down'
+        ent['slot'] = slot
+    return new, roads
+
+
+def next_free_slot(entities):
+    return free_slots(entities, 1)[0]
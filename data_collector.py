@@ -1,11 +1,18 @@
 import os
 import json
 import time
-import threading
 from datetime import datetime
-from pynput import keyboard, mouse
+try:
+    from pynput import keyboard, mouse
+except ImportError:
+    # Headless runs (simulator, benchmarks) work without global input hooks
+    keyboard = mouse = None
 import ctypes
-from ctypes import Structure, windll, c_uint, sizeof, byref
+from ctypes import Structure, c_uint, sizeof, byref
+try:
+    from ctypes import windll
+except ImportError:
+    windll = None
 
 # -------------------------------------------------------------------------
 # Windows API for Idle Time
@@ -14,7 +21,18 @@ import sys
 import re
 import urllib.request
 import ssl
-import random
+import itertools
+import logging
+
+from metrics import METRICS
+from log_setup import rate_limited
+from scheduler import Scheduler
+from settings_service import load_settings as read_settings_file, settings_path, SettingsWatcher
+import economy
+import city_layout
+import map_store
+
+log = logging.getLogger(__name__)
 
 # CONSTANTS
 GITHUB_USERNAME = "Addressmehari"
@@ -32,8 +50,13 @@ try:
     # Attempt to import generation logic
     # We need to suppress print output from the import if possible or just accept it
     from fetch_stargazers import generate_city_slots, string_to_pseudo_random, string_to_color
+    from road_network import RoadNetwork
+    from occupancy import OccupancyGrid
+    from city_seed import city_rng
+    from layout_cache import LayoutCache
+    from city_history import HistoryLog
 except ImportError:
-    print("Could not import visualizer logic. Make sure fetch_stargazers.py is in visualizer/")
+    log.error("Could not import visualizer logic. Make sure fetch_stargazers.py is in visualizer/")
     generate_city_slots = None
 
 class LASTINPUTINFO(Structure):
@@ -43,6 +66,7 @@ class LASTINPUTINFO(Structure):
     ]
 
 def get_idle_duration():
+    if windll is None: return 0.0
     lastInputInfo = LASTINPUTINFO()
     lastInputInfo.cbSize = sizeof(lastInputInfo)
     if windll.user32.GetLastInputInfo(byref(lastInputInfo)):
@@ -50,6 +74,41 @@ def get_idle_duration():
         return millis / 1000.0
     return 0.0
 
+def write_json(path, data, indent=None):
+    """Serializes and writes `data`, counting files/bytes written for diagnostics"""
+    text = json.dumps(data, indent=indent)
+    with open(path, 'w') as f:
+        f.write(text)
+    METRICS.inc("files_written")
+    METRICS.inc("bytes_written", len(text))
+
+def append_json(path, items, indent=4):
+    """
+    Appends `items` to the JSON array stored at `path` in place (only the new
+    items are written). Raises ValueError if the file doesn't end in an array.
+    """
+    if not items: return
+    text = json.dumps(items, indent=indent)
+    # "[\n    {...},\n    {...}\n]" -> the items, ready to go where the old "]" was
+    body = text[1:].lstrip('\n')
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        back = min(end, 256)
+        f.seek(end - back)
+        tail = f.read()
+        close = tail.rstrip().rfind(b']')
+        if close < 0:
+            raise ValueError(f"{path} is not a JSON array")
+        # Arrays of objects: anything but "[" before the "]" means there are items
+        empty = tail[:close].rstrip().endswith(b'[')
+        f.seek(end - back + close)
+        data = (('\n' if empty else ',\n') + body).encode()
+        f.write(data)
+        f.truncate()
+    METRICS.inc("files_written")
+    METRICS.inc("bytes_written", len(data))
+
 def get_github_contributions(username):
     """Scrapes the total contributions from the Github profile page."""
     # Use the partial view which is more reliable and lighter
@@ -79,24 +138,50 @@ def get_github_contributions(username):
                     count_str = match.group(1).replace(',', '')
                     return int(count_str)
                     
-            print("Could not find contribution count in profile HTML.")
+            log.warning("Could not find contribution count in profile HTML.", extra=rate_limited(1800, "github_parse"))
             return None
             
     except Exception as e:
-        print(f"Error fetching Github stats: {e}")
+        log.warning("Error fetching Github stats: %s", e, extra=rate_limited(1800, "github_error"))
         return None
 
 # -------------------------------------------------------------------------
 # Data Collector Class
 # -------------------------------------------------------------------------
 class DataCollector:
-    def __init__(self, filename="datas/activity_log.json", on_reward=None):
-        self.filename = filename
+    # Changes kept in city_changes.json for the visualizer to catch up on
+    CHANGE_HISTORY = 32
+
+    def __init__(self, filename=None, on_reward=None,
+                 base_path=None, clock=None, idle_source=None, github_source=None, headless=False,
+                 scheduler=None):
+        # Default: datas/ as map_store resolves it (next to the exe when frozen), not the working directory
+        self.filename = filename or map_store.activity_log_path()
         self.on_reward = on_reward
         
-        # Load Settings
-        self.settings_file = os.path.join(BASE_PATH, 'settings.json')
+        # Injectable environment (the simulator swaps these for fakes)
+        self.clock = clock or datetime.now
+        self.get_idle = idle_source or get_idle_duration
+        self.fetch_contributions = github_source or get_github_contributions
+        self.headless = headless
+        
+        # Paths
+        self.base_path = base_path or BASE_PATH
+        self.houses_path = os.path.join(self.base_path, "visualizer", "stargazers_houses.json")
+        self.roads_path = os.path.join(self.base_path, "visualizer", "roads.json")
+        self.world_path = os.path.join(self.base_path, "visualizer", "world.json")
+        self.construction_path = os.path.join(self.base_path, "visualizer", "construction_state.json")
+        self.changes_path = os.path.join(self.base_path, "visualizer", "city_changes.json")
+        self.occupancy_path = os.path.join(self.base_path, "visualizer", "occupancy.bin")
+        self.layout_cache_path = os.path.join(self.base_path, "visualizer", "layout_cache.bin")
+        # Every layout save, for the time-lapse replay: where visualizer_app reads it unless a base path was given
+        history_path = os.path.join(base_path, 'datas', map_store.HISTORY_FILENAME) if base_path else map_store.history_path()
+        self.history = HistoryLog(history_path) if generate_city_slots else None
+        
+        # Load Settings (the stable, writable location unless a base path was given)
+        self.settings_file = os.path.join(base_path, 'settings.json') if base_path else settings_path()
         self.load_settings()
+        self.settings_watcher = None
         
         # In-memory metrics
         self.key_presses = 0
@@ -104,7 +189,6 @@ class DataCollector:
         self.active_seconds = 0 
         self.idle_seconds = 0
         
-        self.save_interval_sec = 60
         self.idle_threshold_sec = 2.0 
         self.running = True
 
@@ -116,58 +200,88 @@ class DataCollector:
         
         # Last known total to calculate diffs
         self.last_total_commits = 0
-        self.upgrade_target_user = None
-        
-        # Start listeners
-        self.keyboard_listener = keyboard.Listener(on_release=self.on_key)
-        self.mouse_listener = mouse.Listener(on_click=self.on_click)
-        
-        self.keyboard_listener.start()
-        self.mouse_listener.start()
+        self.github_rebaseline = False
+        # Next upgrade target (an entity id) and the index of houses that can still get a terrace
+        self.upgrade_target = None
+        self.candidates = None
+        self.positions = None
+        self.next_id = 0
+        self.terraces = 0
         
         # Cache for house count to avoid reading file every second
         self.cached_house_count = 0
+        self.next_slot = None
+        # Slot layout: computed once, kept in layout_cache.bin and sliced for any city size
+        self.layout = LayoutCache(self.layout_cache_path) if generate_city_slots else None
+        self.load_changes()
+        self.migrate_layout()
+        self.migrate_ids()
         self.update_house_count()
+        # Before the scheduler starts: from then on only its thread touches the city index
+        self.ensure_next_upgrade_target()
         
-        # Start background threads
-        self.saver_thread = threading.Thread(target=self.save_loop, daemon=True)
-        self.monitor_thread = threading.Thread(target=self.monitor_loop, daemon=True)
-        self.github_thread = threading.Thread(target=self.github_loop, daemon=True)
+        # All periodic work (monitor / save / github) runs on one scheduler thread
+        self.scheduler = scheduler or Scheduler(name="collector-scheduler")
+        self.setup_jobs()
         
-        self.saver_thread.start()
-        self.monitor_thread.start()
-        self.github_thread.start()
+        # Headless mode: no hooks, no threads. The caller drives the jobs
+        # with self.scheduler.run_due() (see simulator.py)
+        self.keyboard_listener = None
+        self.mouse_listener = None
         
-        print(f"Collector started. saving to {self.filename} every minute.")
-        self.ensure_next_upgrade_target()
+        if not headless:
+            # Start listeners
+            self.keyboard_listener = keyboard.Listener(on_release=self.on_key)
+            self.mouse_listener = mouse.Listener(on_click=self.on_click)
+            
+            self.keyboard_listener.start()
+            self.mouse_listener.start()
+            
+            self.scheduler.start()
+            
+            # Settings changes apply live
+            self.settings_watcher = SettingsWatcher(self.settings_file, self.scheduler, self.apply_settings, self.settings)
+            self.settings_watcher.start()
+            
+            log.info("Collector started. saving to %s every minute.", self.filename)
 
     def load_settings(self):
-        defaults = {
-            "github_username": "Addressmehari",
-            "git_post_threshold": 10,
-            "threshold_house": 300,
-            "threshold_tree": 300,
-            "threshold_upgrade": 1000
-        }
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r') as f:
-                    self.settings = json.load(f)
-                    # Merge defaults
-                    for k, v in defaults.items():
-                        if k not in self.settings:
-                            self.settings[k] = v
-            except:
-                self.settings = defaults
-        else:
-            self.settings = defaults
-            
+        self.settings = read_settings_file(self.settings_file)
+        self.apply_values(self.settings)
+
+    def apply_values(self, settings):
         # Apply to local vars for convenience
-        self.THRESHOLD_HOUSE = self.settings["threshold_house"]
-        self.THRESHOLD_TREE = self.settings["threshold_tree"]
-        self.THRESHOLD_UPGRADE = self.settings["threshold_upgrade"]
-        self.GIT_POST_THRESHOLD = self.settings["git_post_threshold"]
-        self.GITHUB_USERNAME = self.settings["github_username"]
+        self.THRESHOLD_HOUSE = settings.threshold_house
+        self.THRESHOLD_TREE = settings.threshold_tree
+        self.THRESHOLD_UPGRADE = settings.threshold_upgrade
+        self.GIT_POST_THRESHOLD = settings.git_post_threshold
+        self.GITHUB_USERNAME = settings.github_username
+        self.save_interval_sec = settings.save_interval_sec
+        self.github_poll_sec = settings.github_poll_sec
+
+    def apply_settings(self, new, old):
+        """
+        Hot-reload: runs on the scheduler thread (via SettingsWatcher), so no
+        job observes a half-applied update.
+        """
+        self.settings = new
+        self.apply_values(new)
+        
+        if new.save_interval_sec != old.save_interval_sec:
+            self.scheduler.reschedule("save", new.save_interval_sec)
+        if new.github_poll_sec != old.github_poll_sec:
+            self.scheduler.reschedule("github", new.github_poll_sec)
+        if new.github_username != old.github_username:
+            # Different profile, different total: take a fresh baseline
+            self.github_rebaseline = True
+            self.scheduler.reschedule("github", new.github_poll_sec, delay=0)
+        if new.layout_mode != old.layout_mode:
+            self.switch_layout()
+        if new.ambient_fps != old.ambient_fps:
+            self.update_world_state()
+        if any(getattr(new, k) != getattr(old, k) for k in ("threshold_house", "threshold_tree", "threshold_upgrade")):
+            self.requantize_city()
+        log.info("Settings applied: %s", new.to_dict())
 
     def on_key(self, key):
         self.key_presses += 1
@@ -176,6 +290,7 @@ class DataCollector:
         if pressed:
             self.mouse_clicks += 1
 
+    @METRICS.timed("save_data")
     def save_data(self):
         # 1. Read existing totals
         if os.path.exists(self.filename):
@@ -223,7 +338,7 @@ class DataCollector:
         data["total_clicks"] = data.get("total_clicks", 0) + self.mouse_clicks
         data["total_active_seconds"] = data.get("total_active_seconds", 0) + self.active_seconds
         data["total_idle_seconds"] = data.get("total_idle_seconds", 0) + self.idle_seconds
-        data["last_updated"] = datetime.now().isoformat()
+        data["last_updated"] = self.clock().isoformat()
         
         # 3. Update Progress Counters (Temporary)
         self.progress_active_sec += self.active_seconds
@@ -233,6 +348,7 @@ class DataCollector:
         # Persist the commit counters (they are updated in github_loop, but save them here)
         data["total_commits"] = self.last_total_commits
         data["progress_commits"] = self.progress_commits
+        data["upgrade_target"] = self.upgrade_target
 
         # 4. Check & Trigger Rewards
         self.check_rewards()
@@ -248,133 +364,257 @@ class DataCollector:
             # Ensure datas dir exists
             os.makedirs(os.path.dirname(self.filename), exist_ok=True)
             
-            with open(self.filename, 'w') as f:
-                json.dump(data, f, indent=4)
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Stats saved. Progress - Active: {self.progress_active_sec}/{self.THRESHOLD_HOUSE}, Idle: {self.progress_idle_sec}/{self.THRESHOLD_TREE}")
+            write_json(self.filename, data, indent=4)
+            log.info("Stats saved. Progress - Active: %s/%s, Idle: %s/%s",
+                     self.progress_active_sec, self.THRESHOLD_HOUSE, self.progress_idle_sec, self.THRESHOLD_TREE,
+                     extra=rate_limited(600, "stats_saved"))
         except Exception as e:
-            print(f"Error saving: {e}")
+            log.error("Error saving: %s", e, extra=rate_limited(300, "save_error"))
+
+    def city_rng(self, index, purpose):
+        """RNG for one city event: seeded by the username and the event index (see city_seed.py)"""
+        return city_rng(self.GITHUB_USERNAME, index, purpose)
 
-    def get_random_house_name(self):
+    def get_random_house_name(self, index):
+        """Name for the entity created at position `index` of the city (same index, same name)"""
+        rng = self.city_rng(index, "house_name")
         prefixes = ["Pixel", "Syntax", "Logic", "Binary", "Coder's", "Data", "Algorithm", "Memory", "Git", "Python", "Terminal", "Debug", "Loop", "Function", "Variable", "Cloud", "Server", "Script", "Byte", "Stack"]
         suffixes = ["Cottage", "Station", "Loft", "Bungalow", "Cabin", "Den", "Abode", "Manor", "Garrison", "Palace", "Tower", "Dwelling", "Lodge", "Farm", "Villa", "Hut", "Keep", "Hub", "Base", "Outpost"]
-        return f"{random.choice(prefixes)} {random.choice(suffixes)}"
+        return f"{rng.choice(prefixes)} {rng.choice(suffixes)}"
 
+    # Single-reward notifications; batches get one summary instead (see notify_rewards)
+    REWARD_MESSAGES = {
+        "houses": ("New House Built! 🏠", "Your activity has constructed a new building in the city."),
+        "trees": ("Tree Planted! 🌳", "Your idle time has grown a new tree."),
+        "terraces": ("Upgrade Unlocked! ✨", "Your typing frenzy added a terrace to a house!"),
+        "git_posts": ("Git Post! 🐙", "{n} Commits pushed! A new Git House appears.")
+    }
+    REWARD_LABELS = {"houses": ("house", "houses"), "trees": ("tree", "trees"), "terraces": ("terrace", "terraces"), "git_posts": ("git post", "git posts")}
+
+    def notify_rewards(self, earned):
+        """One notification per batch: the usual toast for a single reward, a summary otherwise"""
+        earned = {k: n for k, n in earned.items() if n}
+        if not earned or not self.on_reward: return
+        if sum(earned.values()) == 1:
+            title, msg = self.REWARD_MESSAGES[next(iter(earned))]
+            self.on_reward(title, msg.format(n=self.GIT_POST_THRESHOLD))
+            return
+        parts = [f"+{n} {self.REWARD_LABELS[k][n != 1]}" for k, n in earned.items()]
+        self.on_reward("City Grew! 🏙️", ", ".join(parts))
+
+    @METRICS.timed("check_rewards")
     def check_rewards(self):
-        """Checks if progress counters met thresholds"""
-        rewards_triggered = False
-        houses_path = os.path.join(BASE_PATH, "visualizer", "stargazers_houses.json")
-        roads_path = os.path.join(BASE_PATH, "visualizer", "roads.json")
+        """
+        Converts progress counters into rewards. Everything pending is applied
+        as one batch: counts via divmod, one layout save, one notification.
+        """
+        houses_path = self.houses_path
+        roads_path = self.roads_path
         
         if not os.path.exists(houses_path): return
 
+        n_houses = self.progress_active_sec // self.THRESHOLD_HOUSE
+        n_trees = self.progress_idle_sec // self.THRESHOLD_TREE
+        n_upgrades = self.progress_keys // self.THRESHOLD_UPGRADE
+        n_git = self.progress_commits // self.GIT_POST_THRESHOLD
+        if not (n_houses or n_trees or n_upgrades or n_git): return
+
         try:
             with open(houses_path, 'r') as f:
                 houses = json.load(f)
         except:
             return
 
+        if self.candidates is None or len(self.positions) != len(houses):
+            self.index_city(houses)
+
+        # Progress is only consumed once the city could be loaded
+        self.progress_active_sec %= self.THRESHOLD_HOUSE
+        self.progress_idle_sec %= self.THRESHOLD_TREE
+        self.progress_keys %= self.THRESHOLD_UPGRADE
+        self.progress_commits %= self.GIT_POST_THRESHOLD
+
+        loaded_count = len(houses)
+
         # A. Houses (Active Time)
-        while self.progress_active_sec >= self.THRESHOLD_HOUSE:
-            self.progress_active_sec -= self.THRESHOLD_HOUSE
-            print(">>> REWARD: New House Earned!")
-            if self.on_reward: self.on_reward("New House Built! 🏠", "Your activity has constructed a new building in the city.")
-            # Add House
-            # count = len([h for h in houses if h.get('type') == 'activity_house'])
-            houses.append({
-                "type": "activity_house",
-                "login": self.get_random_house_name(),
-                # Placeholder, will be fixed by recalculate
-                "x": 0, "y": 0 
-            })
-            rewards_triggered = True
+        for _ in range(n_houses):
+            # Placeholder position, will be fixed by recalculate
+            self.add_entity(houses, {"type": "activity_house", "login": self.get_random_house_name(len(houses)), "x": 0, "y": 0})
 
         # B. Trees (Idle Time)
-        while self.progress_idle_sec >= self.THRESHOLD_TREE:
-            self.progress_idle_sec -= self.THRESHOLD_TREE
-            print(">>> REWARD: New Tree Planted!")
-            if self.on_reward: self.on_reward("Tree Planted! 🌳", "Your idle time has grown a new tree.")
-            houses.append({
-                "type": "tree",
-                "x": 0, "y": 0,
-                "obstacle": "tree"
-            })
-            rewards_triggered = True
+        for _ in range(n_trees):
+            self.add_entity(houses, {"type": "tree", "x": 0, "y": 0, "obstacle": "tree"})
 
-        # C. Upgrades (Keys)
-        while self.progress_keys >= self.THRESHOLD_UPGRADE:
-            self.progress_keys -= self.THRESHOLD_UPGRADE
-            print(">>> REWARD: House Upgrade Unlocked!")
-            if self.on_reward: self.on_reward("Upgrade Unlocked! ✨", "Your typing frenzy added a terrace to a house!")
-            
-            # 1. Find the designated target from 'houses' list
-            target = next((h for h in houses if h.get('is_upgrade_target')), None)
-            
-            # Fallback if no target marked
-            if not target:
-                candidates = [h for h in houses if h.get('obstacle') != 'tree' and not h.get('has_terrace')]
-                if candidates:
-                    target = random.choice(candidates)
-
-            if target:
+        # C. Upgrades (Keys): the designated target first, then random candidates
+        n_terraces = 0
+        if n_upgrades:
+            # Seeded by how many terraces the city had before this batch
+            rng = self.city_rng(self.terraces, "upgrade")
+            for _ in range(n_upgrades):
+                if self.upgrade_target in self.candidates:
+                    ent_id = self.upgrade_target
+                else:
+                    ent_id = self.candidates.pick(rng)
+                if ent_id is None: break
+                self.candidates.discard(ent_id)
+                target = self.entity_by_id(houses, ent_id)
+                if target is None: continue
                 target['has_terrace'] = True
-                # Clean up flag
-                if 'is_upgrade_target' in target:
-                    del target['is_upgrade_target']
-                
-                rewards_triggered = True
+                n_terraces += 1
+            self.terraces += n_terraces
 
-                # 2. Pick NEXT target immediately to show in UI
-                candidates = [h for h in houses if h.get('obstacle') != 'tree' and h.get('type') != 'git_post' and not h.get('has_terrace') and not h.get('is_upgrade_target')]
-                if candidates:
-                    next_target = random.choice(candidates)
-                    next_target['is_upgrade_target'] = True
-                    self.upgrade_target_user = next_target.get('username')
+            # Pick NEXT target immediately to show in UI
+            self.upgrade_target = self.candidates.pick(rng)
 
         # D. Github Posts (Commits)
-        while self.progress_commits >= self.GIT_POST_THRESHOLD:
-            self.progress_commits -= self.GIT_POST_THRESHOLD
-            print(">>> REWARD: New Git Post Created!")
-            if self.on_reward: self.on_reward("Git Post! 🐙", f"{self.GIT_POST_THRESHOLD} Commits pushed! A new Git House appears.")
-            
-            # Find a location? (Recalculate handles it)
-            # Create Git Post House
-            houses.append({
+        for _ in range(n_git):
+            index = len(houses)
+            self.add_entity(houses, {
                 "type": "git_post",
-                "login": f"Commit Node {random.randint(100,999)}",
+                "login": f"Commit Node {self.city_rng(index, 'git_post').randint(100,999)}",
                 "x": 0, "y": 0, # Placeholder
-                "username": self.get_random_house_name(), # Use random name for variety
+                "username": self.get_random_house_name(index), # Use random name for variety
             })
-            rewards_triggered = True
 
-        if rewards_triggered and generate_city_slots:
-            self.recalculate_and_save(houses, houses_path, roads_path)
+        earned = {"houses": n_houses, "trees": n_trees, "terraces": n_terraces, "git_posts": n_git}
+        log.info(">>> REWARDS: %s", {k: n for k, n in earned.items() if n})
+        METRICS.inc("rewards_batches")
+        METRICS.inc("rewards_applied", sum(earned.values()))
 
-    def recalculate_and_save(self, entities, h_path, r_path):
-        """Recalculates positions and saves files"""
-        # Separate Owner (First)
-        if not entities: return
-        
-        owner = entities[0]
-        others = entities[1:]
-        
-        # Shuffle others to mix new entities in
-        # Note: If we shuffle every time, the whole city rearranges every minute.
-        # This might be jarring. 
-        # OPTION: Only append new ones to the end?
-        # But generate_city_slots does a spiral. If we append, they go to the outside.
-        # That is actually perfect. "Constructing" outwards.
-        # So DO NOT SHUFFLE, just preserve order.
+        if generate_city_slots and (n_houses or n_trees or n_terraces or n_git):
+            # Terraces / a new upgrade target change existing records; pure additions can be appended
+            self.recalculate_and_save(houses, houses_path, roads_path, appended_from=None if n_upgrades else loaded_count)
+        self.notify_rewards(earned)
+
+    def index_city(self, houses):
+        """Builds the upgrade-candidate index (and the id -> list position map) for a loaded city"""
+        self.next_id = economy.assign_ids(houses)
+        self.positions = {ent['id']: i for i, ent in enumerate(houses)}
+        self.candidates = economy.UpgradeCandidates.from_entities(houses)
+        self.terraces = economy.count_entities(houses)["terraces"]
+
+    def add_entity(self, houses, ent):
+        """Appends a new entity with the next id, keeping the indexes current"""
+        ent['id'] = self.next_id
+        self.next_id += 1
+        self.positions[ent['id']] = len(houses)
+        houses.append(ent)
+        if economy.is_upgrade_candidate(ent):
+            self.candidates.add(ent['id'])
+
+    def entity_by_id(self, houses, ent_id):
+        i = self.positions.get(ent_id)
+        if i is None or i >= len(houses) or houses[i].get('id') != ent_id:
+            # Out of sync (the file changed under us): re-index once
+            self.index_city(houses)
+            i = self.positions.get(ent_id)
+        return houses[i] if i is not None else None
+
+    def switch_layout(self):
+        """Applies a layout_mode change: pin the current positions (stable) or re-pack the city (compact)"""
+        self.next_slot = None
+        if self.settings.layout_mode == "stable":
+            self.migrate_layout()
+            return
+        try:
+            with open(self.houses_path, 'r') as f:
+                houses = json.load(f)
+        except (OSError, ValueError):
+            return
+        if generate_city_slots:
+            self.recalculate_and_save(houses, self.houses_path, self.roads_path)
+
+    def read_totals(self):
+        """Saved activity totals (the unsaved minute is still in the in-memory buffers)"""
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    @METRICS.timed("requantize")
+    def requantize_city(self):
+        """
+        Rebuilds the city for new thresholds: what the saved history is worth
+        now, applied as one minimal diff and one layout save (see economy.py).
+        """
+        totals = self.read_totals()
+        if totals is None or not os.path.exists(self.houses_path): return None
+        try:
+            with open(self.houses_path, 'r') as f:
+                houses = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        expected, progress = economy.expected_counts(totals, self.settings)
+        # New houses are named by their creation order after the ones already built
+        created = itertools.count(len(houses))
+        new_house = lambda: {"type": "activity_house", "login": self.get_random_house_name(next(created)), "x": 0, "y": 0}
+        rng = self.city_rng(economy.count_entities(houses)["terraces"], "upgrade")
+        houses, diff = economy.requantize(houses, expected, new_house, rng, self.upgrade_target)
+        # Entities were dropped / terraced: re-index the new list (new ones get their ids here)
+        self.index_city(houses)
+
+        # Leftover progress under the new thresholds (unsaved buffers are added on the next save)
+        self.progress_active_sec = progress["active"]
+        self.progress_idle_sec = progress["idle"]
+        self.progress_keys = progress["keys"]
+
+        if any(diff.values()) and generate_city_slots:
+            self.recalculate_and_save(houses, self.houses_path, self.roads_path)
+            self.ensure_next_upgrade_target()
+        log.info("City requantized for new thresholds: %s", diff)
+        return diff
+
+    def decorate_entity(self, ent):
+        """Fills in the look of a newly created raw entry (house colors/styles, Git Post styling)"""
+        # If it's a house, ensure attributes exist (if newly created raw)
+        if ent.get('obstacle') != 'tree':
+            if 'color' not in ent:
+                # It's a raw new house entry
+                name = ent.get('login', 'Unknown')
+                ent['username'] = name
+                ent['color'] = string_to_color(name)
+                attrs = string_to_pseudo_random(name)
+                ent['roofStyle'] = attrs[0]
+                ent['doorStyle'] = attrs[1]
+                ent['windowStyle'] = attrs[2]
+                ent['chimneyStyle'] = attrs[3]
+                ent['wallStyle'] = attrs[4]
+                if 'has_terrace' not in ent: ent['has_terrace'] = False
         
-        # However, generate_city_slots logic in fetch_stargazers previously shuffled.
-        # Let's trust the current order in JSON is chronological.
+        # Determine color/style for git_post
+        if ent.get('type') == 'git_post':
+             # Force Orange for Git Posts
+             ent['color'] = "#f05032" # Git Orange
+             ent['roofStyle'] = 1
+             ent['doorStyle'] = 3
+             ent['wallStyle'] = 0
+             ent['username'] = ent.get('login', 'Git Post')
+             ent['has_terrace'] = True # Always fancy
+
+    @METRICS.timed("recalculate_and_save")
+    def recalculate_and_save(self, entities, h_path, r_path, appended_from=None):
+        """
+        Positions new entities and saves the city.
+
+        appended_from: index where new entities start, if everything before it
+        is unchanged on disk (lets the stable layout append instead of rewriting).
+        """
+        if not entities: return
+        self.next_slot = None
+        if self.settings.layout_mode == "stable":
+            return self.place_and_save(entities, h_path, r_path, appended_from)
         
-        # Recalculate Layout
-        full_list = [owner] + others # Owner should be 0
-        slots, facings, roads = generate_city_slots(len(full_list))
+        # Compact layout: every entity is re-assigned slot i
+        # Preserve order: the JSON order is chronological and the slots spiral
+        # outwards, so new entities are "constructed" on the outside.
+        slots, facings, roads = self.layout.slots(len(entities))
         
         processed = []
         
-        for i, ent in enumerate(full_list):
+        for i, ent in enumerate(entities):
             if i >= len(slots): break
             
             s_x, s_y = slots[i]
@@ -382,32 +622,9 @@ class DataCollector:
             # Update Position
             ent['x'] = s_x
             ent['y'] = s_y
+            ent.pop('slot', None)
             
-            # If it's a house, ensure attributes exist (if newly created raw)
-            if ent.get('obstacle') != 'tree':
-                if 'color' not in ent:
-                    # It's a raw new house entry
-                    name = ent.get('login', 'Unknown')
-                    ent['username'] = name
-                    ent['color'] = string_to_color(name)
-                    attrs = string_to_pseudo_random(name)
-                    ent['roofStyle'] = attrs[0]
-                    ent['doorStyle'] = attrs[1]
-                    ent['windowStyle'] = attrs[2]
-                    ent['chimneyStyle'] = attrs[3]
-                    ent['wallStyle'] = attrs[4]
-                    ent['wallStyle'] = attrs[4]
-                    if 'has_terrace' not in ent: ent['has_terrace'] = False
-            
-            # Determine color/style for git_post
-            if ent.get('type') == 'git_post':
-                 # Force Orange for Git Posts
-                 ent['color'] = "#f05032" # Git Orange
-                 ent['roofStyle'] = 1
-                 ent['doorStyle'] = 3
-                 ent['wallStyle'] = 0
-                 ent['username'] = ent.get('login', 'Git Post')
-                 ent['has_terrace'] = True # Always fancy
+            self.decorate_entity(ent)
 
             # Update Facing
             if i < len(facings):
@@ -418,22 +635,188 @@ class DataCollector:
             processed.append(ent)
             
         # Save
-        with open(h_path, 'w') as f:
-            json.dump(processed, f, indent=4)
+        write_json(h_path, processed, indent=4)
             
-        road_data = [{"x": int(r[0]), "y": int(r[1])} for r in roads]
-        with open(r_path, 'w') as f:
-            json.dump(road_data, f, indent=4)
+        write_json(r_path, roads.to_dict())
+        self.save_occupancy(processed, roads)
+        self.record_change(reload=True)
+        self.record_history(processed, roads)
             
-        print(f"City Layout Updated: {len(processed)} entities.")
+        log.info("City Layout Updated: %d entities.", len(processed))
         self.cached_house_count = len(processed)
 
+    def place_and_save(self, entities, h_path, r_path, appended_from=None):
+        """Stable layout: only unpinned entities get a slot; only they and their new roads are written"""
+        placed, roads = city_layout.assign_slots(entities, self.layout.slots)
+        for ent in placed:
+            self.decorate_entity(ent)
+        
+        # Houses: append when only new entities were added, full rewrite otherwise (removals, terraces)
+        appended = (appended_from is not None and os.path.exists(h_path)
+                    and len(placed) == len(entities) - appended_from
+                    and all(placed[i] is entities[appended_from + i] for i in range(len(placed))))
+        if appended:
+            try:
+                append_json(h_path, placed)
+            except (OSError, ValueError):
+                appended = False
+        if not appended:
+            write_json(h_path, entities, indent=4)
+        
+        # Roads only ever grow; the segment list is small enough to rewrite
+        new_roads = roads.difference(self.read_roads(r_path))
+        if new_roads.segment_count():
+            write_json(r_path, roads.to_dict())
+        
+        if appended:
+            self.save_occupancy(entities, roads, placed, new_roads, appended_from)
+            self.record_change(added=placed, roads=new_roads.to_dict())
+            self.record_history(entities, roads, placed, new_roads)
+        else:
+            self.save_occupancy(entities, roads)
+            self.record_change(reload=True)
+            self.record_history(entities, roads)
+        
+        log.info("City Layout Updated: %d entities (%d placed, %d new road segments, %s).",
+                 len(entities), len(placed), new_roads.segment_count(), "appended" if appended else "rewritten")
+        self.cached_house_count = len(entities)
+
+    def save_occupancy(self, entities, roads, placed=None, new_roads=None, first_index=None):
+        """
+        Writes visualizer/occupancy.bin. With `placed` / `new_roads` (pure
+        additions) the saved grid is patched instead of rebuilt.
+        """
+        grid = OccupancyGrid.load(self.occupancy_path) if placed is not None else None
+        try:
+            if grid is not None:
+                grid.mark_entities(placed, first_index)
+                grid.mark_roads(new_roads)
+                # Still mapped: nothing was marked, and the file is already right.
+                # (Replacing a file that is mapped fails on Windows.)
+                if grid.mapping is not None:
+                    return
+            else:
+                grid = OccupancyGrid.from_city(entities, roads)
+            size = grid.save(self.occupancy_path)
+            METRICS.inc("files_written")
+            METRICS.inc("bytes_written", size)
+        except OSError as e:
+            log.error("Error writing occupancy grid: %s", e, extra=rate_limited(300, "occupancy_error"))
+        finally:
+            if grid is not None:
+                grid.close()
+
+    def read_roads(self, r_path):
+        """Current RoadNetwork (either roads.json format), or None if the file is missing/corrupt"""
+        try:
+            with open(r_path, 'r') as f:
+                return RoadNetwork.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def record_change(self, added=None, roads=None, reload=False):
+        """
+        Appends a change to visualizer/city_changes.json so an open visualizer
+        can add just the new entities/roads ("reload" = re-fetch everything).
+        Only the last CHANGE_HISTORY changes are kept.
+        """
+        # Someone else wrote a newer change (the settings window's data reset): carry on after it
+        seq, changes = self.read_changes()
+        if seq > self.change_seq:
+            self.change_seq, self.changes = seq, changes
+        self.change_seq += 1
+        change = {"seq": self.change_seq}
+        if reload:
+            change["reload"] = True
+        else:
+            change["added"] = added or []
+            change["roads"] = roads or []
+        self.changes = (self.changes + [change])[-self.CHANGE_HISTORY:]
+        try:
+            write_json(self.changes_path, {"seq": self.change_seq, "changes": self.changes})
+        except OSError as e:
+            log.error("Error writing city changes: %s", e, extra=rate_limited(300, "changes_error"))
+
+    def record_history(self, entities, roads, placed=None, new_roads=None):
+        """Logs a layout save to city_history.jsonl: just the placed entities when they were appended, a diff otherwise"""
+        if self.history is None: return
+        try:
+            t = self.clock().timestamp()
+            if placed is not None:
+                size = self.history.record_added(t, entities, placed, new_roads, roads)
+            else:
+                size = self.history.record_city(t, entities, roads)
+        except OSError as e:
+            log.error("Error writing city history: %s", e, extra=rate_limited(300, "history_error"))
+            return
+        if size:
+            METRICS.inc("files_written")
+            METRICS.inc("bytes_written", size)
+
+    def read_changes(self):
+        """(seq, changes) from city_changes.json; (0, []) if missing or unreadable"""
+        try:
+            with open(self.changes_path, 'r') as f:
+                data = json.load(f)
+            return int(data.get("seq", 0)), list(data.get("changes", []))[-self.CHANGE_HISTORY:]
+        except (OSError, ValueError, TypeError, AttributeError):
+            return 0, []
+
+    def load_changes(self):
+        """Continues the change sequence across restarts"""
+        self.change_seq, self.changes = self.read_changes()
+
+    def migrate_layout(self):
+        """One-time migration to the stable layout: pins every entity to the slot it sits on now"""
+        if self.settings.layout_mode != "stable" or not generate_city_slots: return 0
+        try:
+            with open(self.houses_path, 'r') as f:
+                houses = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if not houses or all(city_layout.is_pinned(h) for h in houses): return 0
+        slots, _, _ = self.layout.slots(len(houses))
+        pinned = city_layout.pin_layout(houses, slots)
+        if pinned:
+            write_json(self.houses_path, houses, indent=4)
+            log.info("Layout migrated to stable mode: %d of %d entities pinned.", pinned, len(houses))
+        return pinned
+
+    def migrate_ids(self):
+        """
+        One-time migration: gives every entity an id and turns the legacy
+        is_upgrade_target flag into self.upgrade_target. Builds the candidate index.
+        """
+        try:
+            with open(self.houses_path, 'r') as f:
+                houses = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(houses, list): return
+        changed = any('id' not in h or 'is_upgrade_target' in h for h in houses)
+        self.index_city(houses)
+        legacy = None
+        for h in houses:
+            if h.pop('is_upgrade_target', None):
+                legacy = h['id']
+        saved = (self.read_totals() or {}).get("upgrade_target")
+        self.upgrade_target = saved if saved is not None else legacy
+        if changed:
+            write_json(self.houses_path, houses, indent=4)
+            self.record_change(reload=True)
+            log.info("City migrated to entity ids: %d entities.", len(houses))
+
     def update_world_state(self):
-        """Updates world.json with current time of day"""
-        world_path = os.path.join(BASE_PATH, "visualizer", "world.json")
+        """
+        Updates world.json with the time of day and the map's idle frame rate
+        (ambient_fps). minuteOfDay drives the map's lighting (visualizer/lighting.js,
+        smooth dawn and dusk); timeOfDay is the plain day / night for older pages.
+        """
+        world_path = self.world_path
         try:
-            now = datetime.now()
+            now = self.clock()
             hour = now.hour
+            minute_of_day = hour * 60 + now.minute
             # Simple logic: Night from 6 PM (18) to 6 AM (6)
             is_night = hour < 6 or hour >= 18
             time_of_day = "night" if is_night else "day"
@@ -443,18 +826,23 @@ class DataCollector:
                 with open(world_path, 'r') as f:
                     current_state = json.load(f)
             
-            # Only save if changed to reduce IO
-            if current_state.get("timeOfDay") != time_of_day:
+            ambient_fps = self.settings.ambient_fps
+
+            # Only save if changed to reduce IO (once a minute at most)
+            flipped = current_state.get("timeOfDay") != time_of_day or current_state.get("ambientFps") != ambient_fps
+            if flipped or current_state.get("minuteOfDay") != minute_of_day:
                 current_state["timeOfDay"] = time_of_day
-                with open(world_path, 'w') as f:
-                    json.dump(current_state, f, indent=4)
-                print(f"World state updated: {time_of_day}")
+                current_state["minuteOfDay"] = minute_of_day
+                current_state["ambientFps"] = ambient_fps
+                write_json(world_path, current_state, indent=4)
+                if flipped:
+                    log.info("World state updated: %s, %d fps idle", time_of_day, ambient_fps)
         except Exception as e:
-            print(f"Error updating world state: {e}")
+            log.error("Error updating world state: %s", e, extra=rate_limited(300, "world_error"))
 
     def update_house_count(self):
         """Updates the cached number of houses from file"""
-        houses_path = os.path.join(BASE_PATH, "visualizer", "stargazers_houses.json")
+        houses_path = self.houses_path
         try:
             if os.path.exists(houses_path):
                 with open(houses_path, 'r') as f:
@@ -463,18 +851,29 @@ class DataCollector:
         except:
             pass
 
+    def find_next_slot(self):
+        """Where the next entity will be built"""
+        if self.settings.layout_mode == "stable":
+            try:
+                with open(self.houses_path, 'r') as f:
+                    houses = json.load(f)
+                index = city_layout.next_free_slot(houses)
+            except (OSError, ValueError):
+                index = self.cached_house_count
+        else:
+            # If we have N houses, the next one is at index N (0-indexed)
+            index = self.cached_house_count
+        return self.layout.slot(index)
+
     def update_construction_state(self):
         """Updates the visualizer with the next potential building spot and progress"""
         if not generate_city_slots: return
 
-        # 1. Calculate Next Slot
-        # If we have N houses, the next one is at index N (0-indexed) -> limit=N+1
-        next_count = self.cached_house_count + 1
-        slots, _, _ = generate_city_slots(next_count)
-        
-        if not slots: return
-        
-        next_slot = slots[-1] # The last one is the new one
+        # 1. Next Slot (cached until the layout changes)
+        if self.next_slot is None:
+            self.next_slot = self.find_next_slot()
+        if self.next_slot is None: return
+        next_slot = self.next_slot
         
         # 2. Calculate Progress
         # We need "Existing Progress stored in file" + "Pending buffer in memory"
@@ -515,78 +914,69 @@ class DataCollector:
                     "label": "Upgrade"
                 }
             },
-            "upgrade_target": self.upgrade_target_user
+            "upgrade_target": self.upgrade_target
         }
         
-        out_path = os.path.join(BASE_PATH, "visualizer", "construction_state.json")
+        out_path = self.construction_path
         try:
-            with open(out_path, 'w') as f:
-                json.dump(state, f)
+            write_json(out_path, state)
         except Exception:
             pass
 
     def ensure_next_upgrade_target(self):
-        """Ensures one house is targeted for the next upgrade"""
-        houses_path = os.path.join(BASE_PATH, "visualizer", "stargazers_houses.json")
-        if not os.path.exists(houses_path): return
-
-        try:
-            with open(houses_path, 'r') as f:
-                houses = json.load(f)
-            
-            # Check if one is already targeted
-            existing = next((h for h in houses if h.get('is_upgrade_target')), None)
-            if existing:
-                self.upgrade_target_user = existing.get('username')
+        """Ensures one house is targeted for the next upgrade (picked from the candidate index; nothing is written)"""
+        if self.candidates is None:
+            try:
+                with open(self.houses_path, 'r') as f:
+                    self.index_city(json.load(f))
+            except (OSError, ValueError):
                 return
+        if self.upgrade_target in self.candidates: return
+        rng = self.city_rng(self.terraces, "upgrade_target")
+        self.upgrade_target = self.candidates.pick(rng)
+        if self.upgrade_target is not None:
+            log.info("Next Upgrade Target selected: entity %s", self.upgrade_target)
 
-            # Pick new target (exclude trees, git posts, and already terraced houses)
-            candidates = [h for h in houses if h.get('obstacle') != 'tree' and h.get('type') != 'git_post' and not h.get('has_terrace')]
-            if candidates:
-                target = random.choice(candidates)
-                target['is_upgrade_target'] = True
-                self.upgrade_target_user = target.get('username')
-                
-                # Save just the metadata update
-                with open(houses_path, 'w') as f:
-                    json.dump(houses, f, indent=4)
-                print(f"Next Upgrade Target selected: {self.upgrade_target_user}")
-                
-        except Exception as e:
-            print(f"Error ensuring upgrade target: {e}")
+    def monitor_tick(self):
+        """One second of idle/active accounting"""
+        idle = self.get_idle()
+        if idle < self.idle_threshold_sec:
+            self.active_seconds += 1
+        else:
+            self.idle_seconds += 1
+        
+        # Update world state logic less frequently? 
+        # Doing it every second is overkill but harmless for check.
+        # Writing only happens on change.
+        self.update_world_state()
+        
+        # Update Construction State (Next Plot)
+        self.update_construction_state()
+
+    def setup_jobs(self):
+        """Registers the periodic jobs (monitor every second, save and github polls at the configured intervals)"""
+        self.scheduler.add("monitor", self.monitor_job, interval=1, delay=1)
+        self.scheduler.add("save", self.save_job, interval=self.save_interval_sec, delay=self.save_interval_sec)
+        # Startup state must be loaded before the first poll (same deadline, registered first)
+        self.scheduler.add("github_init", self.github_init)
+        self.scheduler.add("github", self.github_job, interval=self.github_poll_sec, threaded=True)
 
-    def monitor_loop(self):
+    def monitor_job(self):
         """Checks idle status every second"""
-        while self.running:
-            idle = get_idle_duration()
-            if idle < self.idle_threshold_sec:
-                self.active_seconds += 1
-            else:
-                self.idle_seconds += 1
-            
-            # Update world state logic less frequently? 
-            # Doing it every second is overkill but harmless for check.
-            # Writing only happens on change.
-            self.update_world_state()
-            
-            # Update Construction State (Next Plot)
-            self.update_construction_state()
-            
-            time.sleep(1)
+        with METRICS.timer("monitor_tick"):
+            self.monitor_tick()
+        METRICS.record_thread_cpu("scheduler")
 
-    def save_loop(self):
-        while self.running:
-            time.sleep(self.save_interval_sec)
-            self.save_data()
+    def save_job(self):
+        self.save_data()
+        self.write_metrics()
 
-    def github_loop(self):
-        """Checks github stats every 5 minutes (300s)"""
-        # Initial wait to let other things load? No, check immediately.
-        # But we need to load 'last_total_commits' from file if possible first.
-        # It's done in save_data... wait, __init__ triggers separate threads.
-        # We need to load initial state.
-        
-        # Load initial
+    def save_now(self):
+        """Saves as soon as possible, on the scheduler thread like every other city write (safe from any thread)"""
+        self.scheduler.add("save_now", self.save_job)
+
+    def load_commit_state(self):
+        """Loads the last known commit totals from the activity log"""
         if os.path.exists(self.filename):
             try:
                 with open(self.filename, 'r') as f:
@@ -594,17 +984,16 @@ class DataCollector:
                     self.last_total_commits = d.get('total_commits', 0)
                     self.progress_commits = d.get('progress_commits', 0)
             except: pass
-            
-        print(f"Github Monitor started. Target: {self.GITHUB_USERNAME}")
-        
-        # Initial Check: Create one if none exist
-        houses_path = os.path.join(BASE_PATH, "visualizer", "stargazers_houses.json")
+
+    def ensure_git_foundation(self):
+        """Initial Check: Create the first Git Post if none exist"""
+        houses_path = self.houses_path
         try:
              with open(houses_path, 'r') as f:
                 h_data = json.load(f)
                 git_posts = [h for h in h_data if h.get('type') == 'git_post']
                 if not git_posts:
-                    print("No Git Posts found. Creating the First Foundation...")
+                    log.info("No Git Posts found. Creating the First Foundation...")
                     h_data.append({
                         "type": "git_post",
                         "login": "Git Foundation",
@@ -613,59 +1002,100 @@ class DataCollector:
                         "color": "#f05032",
                         "has_terrace": True
                     })
+                    self.index_city(h_data)
                     # Save immediately to establish base
                     # But we also need to recalculate coords.
                     # Use self.recalculate_and_save
-                    roads_path = os.path.join(BASE_PATH, "visualizer", "roads.json")
-                    self.recalculate_and_save(h_data, houses_path, roads_path)
+                    self.recalculate_and_save(h_data, houses_path, self.roads_path, appended_from=len(h_data) - 1)
         except Exception as e:
-            print(f"Error checking initial git posts: {e}")
+            log.error("Error checking initial git posts: %s", e)
+
+    def fetch_github(self):
+        with METRICS.timer("github_fetch"):
+            return self.fetch_contributions(self.GITHUB_USERNAME)
+
+    def github_tick(self):
+        """Polls the contribution count once and converts new commits into progress"""
+        self.apply_contributions(self.fetch_github())
 
-        while self.running:
-            current = get_github_contributions(self.GITHUB_USERNAME)
-            if current is not None:
-                print(f"[Github] Contributions: {current} (Last: {self.last_total_commits})")
+    def github_job(self):
+        """Runs on a worker thread (network). The result is applied back on the scheduler thread."""
+        current = self.fetch_github()
+        if current is not None:
+            self.scheduler.add("github_apply", lambda: self.apply_contributions(current))
+
+    def apply_contributions(self, current):
+        """Converts a new contribution total into Git Post progress"""
+        if current is not None and self.github_rebaseline:
+            self.github_rebaseline = False
+            self.last_total_commits = current
+            log.info("Github username changed. New baseline: %s", current)
+            return
+        if current is not None:
+            log.debug("[Github] Contributions: %s (Last: %s)", current, self.last_total_commits)
+            
+            if current > self.last_total_commits:
+                diff = current - self.last_total_commits
+                # Sanity check: if diff is huge (e.g. first run of year), restrict?
+                # User said "count 5 commits". If we jump from 0 to 1000, we get 200 houses.
+                # That might be intended. But if self.last_total_commits was 0 (fresh install), 
+                # we shouldn't spam 200 houses unless the user wants it.
+                # However, typical usage logic implies capturing *new* activity.
+                # If this is the FIRST run ever, last_total_commits might be 0.
+                # If current is 500, diff is 500.
+                # We should probably initialize last_total_commits to current on FIRST run,
+                # UNLESS we want to backfill.
+                # "check the profile, after the last created house how many commited"
+                # If 0 houses, we created one.
+                # So we should probably start counting from NOW.
                 
-                if current > self.last_total_commits:
-                    diff = current - self.last_total_commits
-                    # Sanity check: if diff is huge (e.g. first run of year), restrict?
-                    # User said "count 5 commits". If we jump from 0 to 1000, we get 200 houses.
-                    # That might be intended. But if self.last_total_commits was 0 (fresh install), 
-                    # we shouldn't spam 200 houses unless the user wants it.
-                    # However, typical usage logic implies capturing *new* activity.
-                    # If this is the FIRST run ever, last_total_commits might be 0.
-                    # If current is 500, diff is 500.
-                    # We should probably initialize last_total_commits to current on FIRST run,
-                    # UNLESS we want to backfill.
-                    # "check the profile, after the last created house how many commited"
-                    # If 0 houses, we created one.
-                    # So we should probably start counting from NOW.
-                    
-                    if self.last_total_commits == 0 and diff > 100:
-                        # First sync, likely. Set baseline.
-                        self.last_total_commits = current
-                        print("Initialized Github Baseline.")
-                        diff = 0
-                    
-                    if diff > 0:
-                        self.progress_commits += diff
-                        self.last_total_commits = current
-                        self.check_rewards() # Trigger generation
-                        
-            time.sleep(180) # Check every 3 minutes (180s)
-
-    def stop(self):
+                if self.last_total_commits == 0 and diff > 100:
+                    # First sync, likely. Set baseline.
+                    self.last_total_commits = current
+                    log.info("Initialized Github Baseline.")
+                    diff = 0
+                
+                if diff > 0:
+                    self.progress_commits += diff
+                    self.last_total_commits = current
+                    self.check_rewards() # Trigger generation
+
+    def github_init(self):
+        """Loads the last known commit totals and makes sure the first Git Post exists"""
+        self.load_commit_state()
+        log.info("Github Monitor started. Target: %s", self.GITHUB_USERNAME)
+        self.ensure_git_foundation()
+
+    def write_metrics(self, path=None):
+        """Writes the diagnostics snapshot (defaults to metrics.json next to the activity log)"""
+        path = path or os.path.join(os.path.dirname(self.filename), "metrics.json")
+        METRICS.gauge("city_entities", self.cached_house_count)
+        try:
+            return METRICS.write(path)
+        except Exception as e:
+            log.error("Error writing metrics: %s", e, extra=rate_limited(600, "metrics_error"))
+            return None
+
+    def stop(self, flush=True):
+        """Stops the scheduler and hooks, then flushes the pending minute of stats"""
         self.running = False
-        self.keyboard_listener.stop()
-        self.mouse_listener.stop()
+        if self.settings_watcher: self.settings_watcher.stop()
+        self.scheduler.stop()
+        if self.keyboard_listener: self.keyboard_listener.stop()
+        if self.mouse_listener: self.mouse_listener.stop()
+        if flush:
+            self.save_data()
+        if self.layout: self.layout.close()
 
 if __name__ == "__main__":
+    from log_setup import setup_logging, load_log_levels
+    level, module_levels = load_log_levels(settings_path())
+    setup_logging("collector", level, module_levels)
     collector = DataCollector()
     try:
         # Keep main thread alive
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        print("Stopping...")
-        collector.save_data() 
+        log.info("Stopping...")
         collector.stop()
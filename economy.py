@@ -0,0 +1,185 @@
+"""
+City economy: how activity totals turn into city entities.
+
+    houses   = total_active_seconds // threshold_house
+    trees    = total_idle_seconds   // threshold_tree
+    terraces = total_keys           // threshold_upgrade
+
+check_rewards() applies this incrementally (progress counters). When a
+threshold changes, requantize() recomputes what the whole history is worth
+under the new thresholds and brings the city there with the smallest change:
+
+- Missing houses / trees are appended (they land on the outer ring, like
+  normal rewards); surplus ones are removed newest-first, so the established
+  center of the city doesn't move.
+- Terraces are added to random plain houses (the current upgrade target
+  first) or removed newest-first.
+- The owner and Git Posts are never touched (commits have their own counter).
+
+Everything is a couple of linear passes over the entity list, so a 100k city
+requantizes in milliseconds; the caller then saves the layout once.
+
+Entities carry a stable integer "id" (assign_ids). The houses that can still
+get a terrace are kept in an UpgradeCandidates index, and the next upgrade
+target is remembered by id instead of as a flag on the entity.
+"""
+import random
+
+KINDS = ("houses", "trees", "terraces")
+
+
+def expected_counts(totals, settings):
+    """Entity counts (and leftover progress) the activity totals are worth under `settings`"""
+    active = int(totals.get("total_active_seconds", 0))
+    idle = int(totals.get("total_idle_seconds", 0))
+    keys = int(totals.get("total_keys", 0))
+    counts = {
+        "houses": active // settings.threshold_house,
+        "trees": idle // settings.threshold_tree,
+        "terraces": keys // settings.threshold_upgrade
+    }
+    progress = {
+        "active": active % settings.threshold_house,
+        "idle": idle % settings.threshold_tree,
+        "keys": keys % settings.threshold_upgrade
+    }
+    return counts, progress
+
+
+def is_tree(ent):
+    return ent.get('obstacle') == 'tree'
+
+
+def is_git_post(ent):
+    return ent.get('type') == 'git_post'
+
+
+def is_upgrade_candidate(ent):
+    """Plain house without a terrace (the owner counts; trees and Git Posts don't)"""
+    return not is_tree(ent) and not is_git_post(ent) and not ent.get('has_terrace')
+
+
+def assign_ids(entities, next_id=None):
+    """Gives every entity without an "id" the next free one. Returns the next free id."""
+    if next_id is None:
+        next_id = max((ent['id'] for ent in entities if 'id' in ent), default=-1) + 1
+    for ent in entities:
+        if 'id' not in ent:
+            ent['id'] = next_id
+            next_id += 1
+    return next_id
+
+
+class UpgradeCandidates:
+    """
+    Indexable set of the ids of upgrade candidates: add / discard / random
+    pick are O(1) (a list plus an id -> position map; removal swaps the last
+    item into the hole).
+    """
+    def __init__(self, ids=()):
+        self.items = []
+        self.pos = {}
+        for ent_id in ids:
+            self.add(ent_id)
+
+    @classmethod
+    def from_entities(cls, entities):
+        return cls(ent['id'] for ent in entities if is_upgrade_candidate(ent))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, ent_id):
+        return ent_id in self.pos
+
+    def add(self, ent_id):
+        if ent_id not in self.pos:
+            self.pos[ent_id] = len(self.items)
+            self.items.append(ent_id)
+
+    def discard(self, ent_id):
+        i = self.pos.pop(ent_id, None)
+        if i is None:
+            return
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.pos[last] = i
+
+    def pick(self, rng=random):
+        """A random candidate id, or None if there are none"""
+        return rng.choice(self.items) if self.items else None
+
+
+def count_entities(entities):
+    """Current activity-driven counts. Index 0 is the owner and isn't counted as a house."""
+    houses = trees = terraces = 0
+    for i, ent in enumerate(entities):
+        if is_tree(ent):
+            trees += 1
+        elif is_git_post(ent):
+            continue
+        else:
+            if i > 0:
+                houses += 1
+            if ent.get('has_terrace'):
+                terraces += 1
+    return {"houses": houses, "trees": trees, "terraces": terraces}
+
+
+def requantize(entities, expected, new_house, rng=random, target=None):
+    """
+    Returns (entities, diff): a new list whose counts match `expected`, and the
+    applied diff {kind: +added / -removed}. Entities that survive are the same
+    dict objects, in the same order.
+
+    new_house: callable returning a raw activity house (see check_rewards).
+    target: id of the current upgrade target (gets the first new terrace).
+    """
+    if not entities:
+        return entities, {k: 0 for k in KINDS}
+    before = count_entities(entities)
+    diff = {k: expected[k] - before[k] for k in KINDS}
+
+    # 1. Drop surplus houses / trees, newest first
+    drop = set()
+    need = {"houses": max(0, -diff["houses"]), "trees": max(0, -diff["trees"])}
+    for i in range(len(entities) - 1, 0, -1):
+        if not need["houses"] and not need["trees"]:
+            break
+        ent = entities[i]
+        if is_tree(ent):
+            if need["trees"]:
+                need["trees"] -= 1
+                drop.add(i)
+        elif not is_git_post(ent) and need["houses"]:
+            need["houses"] -= 1
+            drop.add(i)
+    result = [ent for i, ent in enumerate(entities) if i not in drop] if drop else list(entities)
+
+    # 2. Append missing ones (recalculate_and_save gives them coordinates)
+    for _ in range(max(0, diff["houses"])):
+        result.append(new_house())
+    for _ in range(max(0, diff["trees"])):
+        result.append({"type": "tree", "x": 0, "y": 0, "obstacle": "tree"})
+
+    # 3. Terraces, counted again: dropped houses may have taken some along
+    terrace_diff = expected["terraces"] - count_entities(result)["terraces"]
+    if terrace_diff > 0:
+        plain = [ent for ent in result if is_upgrade_candidate(ent)]
+        targets = [ent for ent in plain if target is not None and ent.get('id') == target]
+        rest = [ent for ent in plain if target is None or ent.get('id') != target]
+        take = min(terrace_diff, len(plain))
+        targets = (targets + rng.sample(rest, max(0, take - len(targets))))[:take]
+        for ent in targets:
+            ent['has_terrace'] = True
+    elif terrace_diff < 0:
+        for ent in reversed(result):
+            if terrace_diff == 0:
+                break
+            if not is_tree(ent) and not is_git_post(ent) and ent.get('has_terrace'):
+                ent['has_terrace'] = False
+                terrace_diff += 1
+
+    after = count_entities(result)
+    return result, {k: after[k] - before[k] for k in KINDS}
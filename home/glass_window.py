@@ -87,10 +87,12 @@ def set_dwm_attributes(hwnd):
 
 # ----------------- Glass App ----------------- #
 
-import json
 import os
+import logging
 from datetime import datetime
 
+log = logging.getLogger(__name__)
+
 # ... (Previous imports kept)
 
 # ----------------- Glass App ----------------- #
@@ -194,50 +196,23 @@ class GlassApp(tk.Tk):
         if not answer:
             return
 
-        if getattr(sys, 'frozen', False):
-            script_dir = os.path.dirname(sys.executable)
-            # If "home" folder structure is maintained in dist/ then:
-            # But the user might want user_inputs.json in the root or 'home' subdir.
-            # Let's verify where 'user_inputs.json' normally lives. It seems to be in 'home/'.
-            # If we want it to persist, it should probably be in the root of the install or a 'data' folder.
-            # Let's put it in the same folder as the exe for simplicity, or constructing a path to 'home' if it exists.
-            
-            # Check if 'home' dir exists next to exe
-            possible_home = os.path.join(script_dir, 'home')
-            if os.path.exists(possible_home):
-                filename = os.path.join(possible_home, "user_inputs.json")
-            else:
-                # Fallback to root
-                filename = os.path.join(script_dir, "user_inputs.json")
-        else:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            filename = os.path.join(script_dir, "user_inputs.json")
-        
-        # Load existing data
-        data = []
-        if os.path.exists(filename):
-            try:
-                with open(filename, 'r') as f:
-                    data = json.load(f)
-                    if not isinstance(data, list):
-                        data = []
-            except (json.JSONDecodeError, IOError):
-                data = []
-        
-        # Append new answer
+        # Append-only notes log (notes_store.py lives in the project root)
+        from notes_store import append_note
         entry_record = {
             "question": "What are you gonna do?",
             "answer": answer,
             "timestamp": datetime.now().isoformat()
         }
-        data.append(entry_record)
-        
-        # Save back to file
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=4)
+            append_note(entry_record)
+        except Exception as e:
+            log.error("Error saving: %s", e)
+        # The note is saved; keep the search index snapshot in step
+        try:
+            from notes_index import update_index
+            update_index()
         except Exception as e:
-            print(f"Error saving: {e}")
+            log.error("Error updating the search index: %s", e)
             
         # Close the app
         self.destroy()
@@ -279,5 +254,9 @@ class GlassApp(tk.Tk):
         self.geometry(f"+{x}+{y}")
 
 if __name__ == "__main__":
+    # log_setup lives in the project root
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from log_setup import setup_logging
+    setup_logging("glass")
     app = GlassApp()
     app.mainloop()
@@ -2,7 +2,7 @@ const canvas = document.getElementById('wall');
 const ctx = canvas.getContext('2d');
 
 let notes = [];
-let previousDataStr = "";
+let notesCursor = 0; // Byte offset into the notes log (user_inputs.jsonl) we have read up to
 
 // Camera
 let camera = { x: 0, y: 0, zoom: 1 };
@@ -26,11 +26,36 @@ const COLORS = [
     '#ddd6fe'  // Purple
 ];
 
+// Rendering: only notes and threads meeting the viewport are drawn (looked
+// up in the spatial grids), each note as one drawImage of its cached card
+const CARD_MARGIN = 40;      // Room around a card for its shadow and tape
+const CARD_CACHE_MAX = 600;  // Card canvases kept (least recently drawn go first)
+const VIEW_MARGIN = 60;      // World units drawn past the screen edge (hover scale, rotation)
+const DOT_SPACING = 40;
+const WRAP_CACHE_MAX = 5000;
+const noteGrid = new SpatialGrid();    // note index -> its rectangle
+const threadGrid = new SpatialGrid();  // i -> bounding box of the thread from note i to i + 1
+const cardCache = new Map();           // note -> true, in drawing order (oldest first)
+const wrapCache = new Map();           // font|width|text -> wrapped lines
+// Shared formatter (toLocaleString builds one per call)
+const DATE_FORMAT = new Intl.DateTimeFormat([], {
+    month: 'short', day: 'numeric',
+    hour: '2-digit', minute: '2-digit'
+});
+let dotPattern = null;
+let frameStats = { drawn: 0, ms: 0 };
+let scheduler = null;    // FrameScheduler (../visualizer/frame_scheduler.js): draws on demand
+let wallEasing = false;  // A hover scale hasn't settled yet
+
 // --- Initialization ---
 function resize() {
     canvas.width = window.innerWidth;
     canvas.height = window.innerHeight;
-    draw();
+    requestRender();
+}
+
+function requestRender() {
+    if (scheduler) scheduler.invalidate();
 }
 window.addEventListener('resize', resize);
 resize();
@@ -45,6 +70,7 @@ canvas.addEventListener('mousedown', e => {
 });
 
 window.addEventListener('mouseup', e => {
+    if (!isDragging) return;
     isDragging = false;
     canvas.style.cursor = 'grab';
     
@@ -63,6 +89,7 @@ window.addEventListener('mousemove', e => {
         camera.x += e.movementX;
         camera.y += e.movementY;
     }
+    requestRender(); // Moved, or hover may change
 });
 
 canvas.addEventListener('wheel', e => {
@@ -87,6 +114,7 @@ canvas.addEventListener('wheel', e => {
     // Adjust camera to keep world point under mouse
     camera.x = mouseX - wx * newZoom;
     camera.y = mouseY - wy * newZoom;
+    requestRender();
 }, { passive: false });
 
 function handleNoteClick(screenX, screenY) {
@@ -94,11 +122,10 @@ function handleNoteClick(screenX, screenY) {
     const wx = (screenX - camera.x) / camera.zoom;
     const wy = (screenY - camera.y) / camera.zoom;
     
-    // Reverse Check (Top notes first)
-    // Actually our array is chronological, so later notes are drawn on top usually?
-    // Let's check all.
-    for (let i = notes.length - 1; i >= 0; i--) {
-        const n = notes[i];
+    // Reverse Check (Top notes first): later notes are drawn on top
+    const under = noteGrid.query(wx, wy, wx, wy);
+    for (let k = under.length - 1; k >= 0; k--) {
+        const n = notes[under[k]];
         // Simple AABB
         if (wx > n.x && wx < n.x + n.w &&
             wy > n.y && wy < n.y + n.h) {
@@ -118,67 +145,180 @@ function handleNoteClick(screenX, screenY) {
                 n.w = BASE_WIDTH;
                 n.h = BASE_HEIGHT;
             }
+            placeNote(under[k]);
+            requestRender();
             return; // Click handled
         }
     }
 }
 
+// --- Search ---
+// Api.search ranks the whole log (notes_index.py); hit ids are wall indices.
+// Enter / Shift+Enter step through the hits, Escape clears.
+const SEARCH_LIMIT = 100;
+const searchInput = document.getElementById('search-input');
+const searchCount = document.getElementById('search-count');
+let searchHits = [];          // wall indices, best first
+let searchHitSet = new Set();
+let searchTerms = new Set();  // index terms that matched, for highlighting words
+let searchPos = -1;
+let searchVersion = 0;        // Bumped per search (cards of hits carry its highlights)
+let searchTimer = null;
+
+searchInput.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(runSearch, 150);
+});
+
+searchInput.addEventListener('keydown', e => {
+    if (e.key === 'Enter') {
+        e.preventDefault();
+        jumpToHit(searchPos + (e.shiftKey ? -1 : 1));
+    } else if (e.key === 'Escape') {
+        searchInput.value = '';
+        runSearch();
+        searchInput.blur();
+    }
+});
+
+window.addEventListener('keydown', e => {
+    if ((e.ctrlKey || e.metaKey) && e.key === 'f') {
+        e.preventDefault();
+        searchInput.focus();
+        searchInput.select();
+    }
+});
+
+async function runSearch() {
+    const query = searchInput.value;
+    let result = { terms: [], hits: [] };
+    if (query.trim()) {
+        if (window.pywebview && window.pywebview.api && window.pywebview.api.search) {
+            result = await window.pywebview.api.search(query, SEARCH_LIMIT);
+        } else {
+            result = searchLoaded(query, SEARCH_LIMIT);
+        }
+        if (query !== searchInput.value) return; // typed on meanwhile
+    }
+    searchHits = result.hits.map(h => h.id).filter(id => id < notes.length);
+    searchHitSet = new Set(searchHits);
+    searchTerms = new Set(result.terms);
+    searchVersion++;
+    searchPos = -1;
+    if (!query.trim()) searchCount.textContent = '';
+    else if (!searchHits.length) searchCount.textContent = 'No matches';
+    else jumpToHit(0);
+    requestRender();
+}
+
+function jumpToHit(i) {
+    if (!searchHits.length) return;
+    searchPos = (i + searchHits.length) % searchHits.length;
+    const n = notes[searchHits[searchPos]];
+    camera.x = canvas.width / 2 - (n.x + n.w / 2) * camera.zoom;
+    camera.y = canvas.height / 2 - (n.y + n.h / 2) * camera.zoom;
+    searchCount.textContent = `${searchPos + 1} / ${searchHits.length}`;
+    requestRender();
+}
+
+// Same tokens as notes_index.py
+function noteTokens(text) {
+    return text.toLowerCase().match(/\d{4}-\d{2}(?:-\d{2})?|[\p{L}\p{N}_]+/gu) || [];
+}
+
+// Fallback without the Python API: scan the loaded notes, newest first
+function searchLoaded(query, limit) {
+    const q = query.toLowerCase();
+    const words = q.match(/\d{4}-[\d-]*|[\p{L}\p{N}_]+/gu) || [];
+    const typing = !/\s$/.test(q);
+    const terms = new Set();
+    const hits = [];
+    for (let i = notes.length - 1; i >= 0 && hits.length < limit; i--) {
+        const n = notes[i];
+        if (!n.tokens) n.tokens = noteTokens(n.text).concat(n.stamp ? [n.stamp.slice(0, 10), n.stamp.slice(0, 7)] : []);
+        const found = [];
+        const all = words.every((w, k) => {
+            const prefix = (typing && k === words.length - 1) || q.includes(w + '*');
+            const match = n.tokens.filter(t => prefix ? t.startsWith(w) : t === w);
+            found.push(...match);
+            return match.length > 0;
+        });
+        if (all) {
+            hits.push({ id: i });
+            found.forEach(t => terms.add(t));
+        }
+    }
+    return { terms: [...terms], hits };
+}
+
 // --- Data Fetching ---
+// Only records added since notesCursor come back; they are appended to the
+// wall and existing notes are left alone.
 async function fetchData() {
     try {
-        let rawData = [];
+        let batch;
         
         // Use pywebview API if available
-        if (window.pywebview && window.pywebview.api) {
-            rawData = await window.pywebview.api.get_data();
+        if (window.pywebview && window.pywebview.api && window.pywebview.api.get_since) {
+            batch = await window.pywebview.api.get_since(notesCursor);
         } else {
             // Fallback for standard browser/server (or if API not ready yet)
-            const res = await fetch('user_inputs.json?t=' + Date.now());
-            if (!res.ok) return;
-            rawData = await res.json();
+            batch = await fetchLogSince(notesCursor);
         }
+        if (!batch) return;
 
-        const jsonStr = JSON.stringify(rawData);
-
-        if (jsonStr !== previousDataStr) {
-            processNotes(rawData);
-            previousDataStr = jsonStr;
-        }
+        if (batch.reset) resetWall();
+        if (batch.notes.length) appendNotes(batch.notes);
+        notesCursor = batch.cursor;
+        if ((batch.reset || batch.notes.length) && searchInput.value.trim()) runSearch();
     } catch (e) { 
         console.error("Data fetch error:", e); 
     }
 }
 
-function processNotes(data) {
-    // Sort by timestamp
-    const sorted = [...data].sort((a, b) => {
-        const t1 = a.timestamp ? new Date(a.timestamp).getTime() : 0;
-        const t2 = b.timestamp ? new Date(b.timestamp).getTime() : 0;
-        return t1 - t2;
+// Same contract as Api.get_since, reading user_inputs.jsonl over HTTP
+// (revalidated: an unchanged log is a 304 and its ETag says nothing's new)
+let logETag = null;
+async function fetchLogSince(cursor) {
+    const res = await fetch('user_inputs.jsonl', { cache: 'no-cache' });
+    if (!res.ok) return null;
+    const tag = res.headers.get('ETag');
+    if (tag && tag === logETag) return { cursor, notes: [], reset: false };
+    logETag = tag;
+    const bytes = new Uint8Array(await res.arrayBuffer());
+    const reset = cursor > bytes.length || (cursor > 0 && bytes[cursor - 1] !== 10);
+    const start = reset ? 0 : cursor;
+    // Complete lines only: a line without its newline is still being written
+    const end = bytes.lastIndexOf(10) + 1;
+    if (end <= start) return { cursor: start, notes: [], reset };
+    const text = new TextDecoder().decode(bytes.subarray(start, end));
+    const notes = [];
+    text.split('\n').forEach(line => {
+        if (!line.trim()) return;
+        try { notes.push(JSON.parse(line)); } catch (e) { console.warn("Skipping unreadable note"); }
     });
+    return { cursor: end, notes, reset };
+}
 
-    // Reuse existing notes to preserve state (expanded, rotation) if ID matches?
-    // We don't have IDs. We'll map by index or content hash. 
-    // For simplicity, we rebuild but try to match properties if index matches.
-    
-    notes = sorted.map((item, index) => {
-        const existing = notes[index];
+function appendNotes(items) {
+    // The log is chronological: new records go after the existing notes
+    items.forEach(item => {
+        const index = notes.length;
         const colorIdx = index % COLORS.length;
         
         let text = "";
         let dateTime = "";
+        let stamp = "";
         
         if (typeof item === 'string') {
             text = item;
         } else {
             text = item.answer || item.question || JSON.stringify(item);
             if (item.timestamp) {
-                const d = new Date(item.timestamp);
+                stamp = String(item.timestamp);
                 // Full Date Time
-                dateTime = d.toLocaleString([], {
-                    month: 'short', day: 'numeric', 
-                    hour: '2-digit', minute:'2-digit'
-                });
+                const d = new Date(item.timestamp);
+                if (!isNaN(d)) dateTime = DATE_FORMAT.format(d);
             }
         }
         
@@ -190,28 +330,65 @@ function processNotes(data) {
         const x = 80 + col * (BASE_WIDTH + PADDING); // More left margin
         const y = 80 + row * (BASE_HEIGHT + PADDING);
 
-        const n = {
+        notes.push({
             x, y,
-            w: existing ? existing.w : BASE_WIDTH,
-            h: existing ? existing.h : BASE_HEIGHT,
+            w: BASE_WIDTH,
+            h: BASE_HEIGHT,
             color: COLORS[colorIdx],
             text: text,
             dateTime: dateTime,
-            rotation: existing ? existing.rotation : (Math.random() - 0.5) * 8,
-            expanded: existing ? existing.expanded : false,
-            anim: existing ? existing.anim : { scale: 1.0, lift: 0, blur: 15, offset: 8 }
-        };
-        return n;
+            stamp: stamp,
+            rotation: (Math.random() - 0.5) * 8,
+            expanded: false,
+            anim: { scale: 1.0 },
+            card: null,     // Cached card canvas (see noteCard)
+            cardKey: ''
+        });
+        placeNote(index);
     });
+    requestRender();
+}
+
+function resetWall() {
+    notes = [];
+    noteGrid.clear();
+    threadGrid.clear();
+    cardCache.clear();
+    requestRender();
+}
+
+// Keeps the spatial grids in step with a note's rectangle (and its threads)
+function placeNote(index) {
+    const n = notes[index];
+    noteGrid.insert(index, n.x, n.y, n.x + n.w, n.y + n.h);
+    if (index > 0) placeThread(index - 1);
+    if (index < notes.length - 1) placeThread(index);
+}
+
+// Thread from note i to i + 1: pin points (top center) and the droop below them
+function threadPoints(i) {
+    const a = notes[i], b = notes[i + 1];
+    return [a.x + a.w / 2, a.y + 10, b.x + b.w / 2, b.y + 10];
+}
+
+function placeThread(i) {
+    const [p1x, p1y, p2x, p2y] = threadPoints(i);
+    threadGrid.insert(i, Math.min(p1x, p2x), Math.min(p1y, p2y),
+        Math.max(p1x, p2x), (p1y + p2y) / 2 + 50);
 }
 
-function wrapText(text, maxWidth) {
+// Memoized on font, width and text: a note's lines are measured once
+function wrapText(text, maxWidth, c = ctx) {
+    const key = c.font + '|' + maxWidth + '|' + text;
+    const cached = wrapCache.get(key);
+    if (cached) return cached;
+
     const words = text.split(' ');
     let lines = [];
     let curLine = words[0];
 
     for (let i = 1; i < words.length; i++) {
-        const width = ctx.measureText(curLine + " " + words[i]).width;
+        const width = c.measureText(curLine + " " + words[i]).width;
         if (width < maxWidth) {
             curLine += " " + words[i];
         } else {
@@ -220,166 +397,198 @@ function wrapText(text, maxWidth) {
         }
     }
     lines.push(curLine);
+    if (wrapCache.size >= WRAP_CACHE_MAX) wrapCache.delete(wrapCache.keys().next().value);
+    wrapCache.set(key, lines);
     return lines;
 }
 
 // --- Rendering ---
 function draw() {
+    const t0 = performance.now();
+
     // Clear
     ctx.setTransform(1, 0, 0, 1, 0, 0);
     ctx.fillStyle = "#1e1e24"; // Charcoal Dark
     ctx.fillRect(0, 0, canvas.width, canvas.height);
 
-    // Dynamic BG: Dot Grid
-    ctx.fillStyle = "#2b2b36";
-    const spacing = 40 * camera.zoom;
-    const ox = camera.x % spacing;
-    const oy = camera.y % spacing;
-    
-    for (let x = ox; x < canvas.width; x += spacing) {
-        for (let y = oy; y < canvas.height; y += spacing) {
-            ctx.beginPath();
-            ctx.arc(x, y, 2 * camera.zoom, 0, Math.PI * 2);
-            ctx.fill();
-        }
-    }
+    // Dynamic BG: Dot Grid, one pattern fill moved and scaled with the camera
+    if (!dotPattern) dotPattern = makeDotPattern();
+    const half = DOT_SPACING / 2 * camera.zoom;
+    dotPattern.setTransform(new DOMMatrix([camera.zoom, 0, 0, camera.zoom, camera.x - half, camera.y - half]));
+    ctx.fillStyle = dotPattern;
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
 
     ctx.setTransform(camera.zoom, 0, 0, camera.zoom, camera.x, camera.y);
 
+    // Visible world box
+    const x0 = -camera.x / camera.zoom - VIEW_MARGIN;
+    const y0 = -camera.y / camera.zoom - VIEW_MARGIN;
+    const x1 = (canvas.width - camera.x) / camera.zoom + VIEW_MARGIN;
+    const y1 = (canvas.height - camera.y) / camera.zoom + VIEW_MARGIN;
+
     // --- Connections (Threads) ---
-    if (notes.length > 1) {
+    const threads = threadGrid.query(x0, y0, x1, y1);
+    if (threads.length) {
         ctx.strokeStyle = "rgba(220, 220, 220, 0.4)"; // White thread
         ctx.lineWidth = 2;
-        ctx.setLineDash([5, 5]); // Dashed connection? Or solid for "Real"?
-        // User asked for "Real lines". Solid string looks better.
-        ctx.setLineDash([]);
+        ctx.setLineDash([]); // "Real lines": a solid string looks better
         ctx.beginPath();
-        
-        for (let i = 0; i < notes.length - 1; i++) {
-            const curr = notes[i];
-            const next = notes[i+1];
-            
-            // Pin Point (Top Center)
-            const p1 = { x: curr.x + curr.w/2, y: curr.y + 10 };
-            const p2 = { x: next.x + next.w/2, y: next.y + 10 };
-            
-            // Draw curve (slack string)
-            ctx.moveTo(p1.x, p1.y);
-            // Control point hangs down
-            const midX = (p1.x + p2.x) / 2;
-            const midY = (p1.y + p2.y) / 2 + 50; // Droop
-            ctx.quadraticCurveTo(midX, midY, p2.x, p2.y);
-        }
+        threads.forEach(i => {
+            const [p1x, p1y, p2x, p2y] = threadPoints(i);
+            ctx.moveTo(p1x, p1y);
+            // Draw curve (slack string): control point hangs down
+            ctx.quadraticCurveTo((p1x + p2x) / 2, (p1y + p2y) / 2 + 50, p2x, p2y);
+        });
         ctx.stroke();
     }
 
     // --- Notes ---
-    ctx.font = "20px 'Kalam', cursive";
-    ctx.textAlign = "center";
-    ctx.textBaseline = "middle";
-
-    notes.forEach(note => {
-        // Hover Anim Logic
-        const wx = (lastMouse.x - camera.x) / camera.zoom;
-        const wy = (lastMouse.y - camera.y) / camera.zoom;
-        
-        let targetScale = 1.0;
-        let targetBlur = 10;
-        let targetOffset = 5;
-        let zIndex = 0; // Fake z-index via array order, but scale helps visually
-
-        if (wx > note.x && wx < note.x + note.w &&
-            wy > note.y && wy < note.y + note.h) {
-            targetScale = 1.05;
-            targetBlur = 25;
-            targetOffset = 15;
-            zIndex = 1;
-        }
-        
-        // Lerp
-        const f = 0.2;
-        note.anim.scale += (targetScale - note.anim.scale) * f;
-        note.anim.blur += (targetBlur - note.anim.blur) * f;
-        note.anim.offset += (targetOffset - note.anim.offset) * f;
+    const visible = noteGrid.query(x0, y0, x1, y1);
+    wallEasing = false;
+    const wx = (lastMouse.x - camera.x) / camera.zoom;
+    const wy = (lastMouse.y - camera.y) / camera.zoom;
+    visible.forEach(index => drawNote(notes[index], index, wx, wy));
 
-        ctx.save();
-        
-        // Transform
-        const cx = note.x + note.w / 2;
-        const cy = note.y + note.h / 2;
-        
-        ctx.translate(cx, cy);
-        ctx.rotate(note.rotation * Math.PI / 180);
-        ctx.scale(note.anim.scale, note.anim.scale);
-
-        // Shadow
-        ctx.shadowColor = "rgba(0,0,0,0.6)";
-        ctx.shadowBlur = note.anim.blur;
-        ctx.shadowOffsetX = note.anim.offset;
-        ctx.shadowOffsetY = note.anim.offset;
-
-        // Note Body
-        ctx.fillStyle = note.color;
-        ctx.fillRect(-note.w/2, -note.h/2, note.w, note.h);
-        
-        // Reset Shadow for content
-        ctx.shadowColor = "transparent";
-
-        // Tape/Pin (Top Center)
-        ctx.fillStyle = "rgba(255,255,255,0.3)";
-        ctx.fillRect(-15, -note.h/2 - 5, 30, 20); // Tape
-        // Pin Head
-        ctx.fillStyle = "#e74c3c";
-        ctx.beginPath(); ctx.arc(0, -note.h/2 + 5, 4, 0, Math.PI*2); ctx.fill();
-
-        // Content
-        ctx.fillStyle = "#1e293b";
-        
-        // Date/Time (Bottom Right now? Or Top?)
-        // User said "leave some gaps add a date and time"
-        // Let's put date at bottom right distinctively.
-        if (note.dateTime) {
-            ctx.font = "14px 'Kalam', cursive";
-            ctx.textAlign = "right";
-            ctx.fillStyle = "#4b5563";
-            ctx.fillText(note.dateTime, note.w/2 - 10, note.h/2 - 15);
-        }
+    frameStats = { drawn: visible.length, ms: performance.now() - t0 };
+}
 
-        // Main Text (Wrap)
-        ctx.font = "24px 'Kalam', cursive";
-        ctx.textAlign = "center";
-        ctx.fillStyle = "#1e293b";
-        
-        let displayLines = wrapText(note.text, note.w - 40);
-        
-        // Truncate if not expanded
-        if (!note.expanded && displayLines.length > 4) {
-             displayLines = displayLines.slice(0, 3);
-             displayLines.push("... (Click to read)");
-        }
-        
-        // Calc startY to center
-        const lh = 30;
-        const totalH = displayLines.length * lh;
-        let startY = -totalH / 2;
-        
-        // Offset up slightly to make room for date
-        startY -= 10;
+function makeDotPattern() {
+    const tile = document.createElement('canvas');
+    tile.width = tile.height = DOT_SPACING;
+    const t = tile.getContext('2d');
+    t.fillStyle = "#2b2b36";
+    t.beginPath();
+    t.arc(DOT_SPACING / 2, DOT_SPACING / 2, 2, 0, Math.PI * 2);
+    t.fill();
+    return ctx.createPattern(tile, 'repeat');
+}
 
-        displayLines.forEach((line, i) => {
-            ctx.fillText(line, 0, startY + i * lh);
-        });
+function drawNote(note, index, wx, wy) {
+    // Hover Anim Logic: the scale eases, the card (shadow) switches
+    const hovered = wx > note.x && wx < note.x + note.w &&
+        wy > note.y && wy < note.y + note.h;
+    const targetScale = hovered ? 1.05 : 1.0;
+    note.anim.scale += (targetScale - note.anim.scale) * 0.2; // Lerp
+    if (Math.abs(targetScale - note.anim.scale) > 0.001) wallEasing = true;
+
+    const card = noteCard(note, index, hovered);
+
+    ctx.save();
+    ctx.translate(note.x + note.w / 2, note.y + note.h / 2);
+    ctx.rotate(note.rotation * Math.PI / 180);
+    ctx.scale(note.anim.scale, note.anim.scale);
+    ctx.drawImage(card, -note.w / 2 - CARD_MARGIN, -note.h / 2 - CARD_MARGIN);
+
+    // Search hit outline (the current one stronger)
+    if (searchHitSet.has(index)) {
+        const current = searchHits[searchPos] === index;
+        ctx.strokeStyle = current ? "#f97316" : "#38bdf8";
+        ctx.lineWidth = current ? 6 : 3;
+        ctx.strokeRect(-note.w/2 - 4, -note.h/2 - 4, note.w + 8, note.h + 8);
+    }
+    ctx.restore();
+}
 
-        ctx.restore();
+// The note's card rasterized into its own canvas; redrawn only when its
+// size, hover state or search highlight changes. Past CARD_CACHE_MAX the
+// canvas of the least recently drawn note is reused.
+function noteCard(note, index, hovered) {
+    const hit = searchHitSet.has(index);
+    const key = `${note.w}x${note.h}|${hovered ? 1 : 0}|${hit ? searchVersion : 0}`;
+    cardCache.delete(note);
+    cardCache.set(note, true);
+    if (note.card && note.cardKey === key) return note.card;
+
+    let card = note.card;
+    if (!card && cardCache.size > CARD_CACHE_MAX) {
+        const oldest = cardCache.keys().next().value;
+        cardCache.delete(oldest);
+        card = oldest.card;
+        oldest.card = null;
+    }
+    note.card = card || document.createElement('canvas');
+    note.cardKey = key;
+    renderCard(note.card, note, hovered, hit);
+    return note.card;
+}
+
+function renderCard(card, note, hovered, hit) {
+    card.width = note.w + CARD_MARGIN * 2; // (also clears it)
+    card.height = note.h + CARD_MARGIN * 2;
+    const c = card.getContext('2d');
+    c.translate(card.width / 2, card.height / 2);
+
+    // Shadow
+    c.shadowColor = "rgba(0,0,0,0.6)";
+    c.shadowBlur = hovered ? 25 : 10;
+    c.shadowOffsetX = c.shadowOffsetY = hovered ? 15 : 5;
+
+    // Note Body
+    c.fillStyle = note.color;
+    c.fillRect(-note.w/2, -note.h/2, note.w, note.h);
+
+    // Reset Shadow for content
+    c.shadowColor = "transparent";
+
+    // Tape/Pin (Top Center)
+    c.fillStyle = "rgba(255,255,255,0.3)";
+    c.fillRect(-15, -note.h/2 - 5, 30, 20); // Tape
+    // Pin Head
+    c.fillStyle = "#e74c3c";
+    c.beginPath(); c.arc(0, -note.h/2 + 5, 4, 0, Math.PI*2); c.fill();
+
+    c.textBaseline = "middle";
+
+    // Date/Time at the bottom right
+    if (note.dateTime) {
+        c.font = "14px 'Kalam', cursive";
+        c.textAlign = "right";
+        c.fillStyle = "#4b5563";
+        c.fillText(note.dateTime, note.w/2 - 10, note.h/2 - 15);
+    }
+
+    // Main Text (Wrap)
+    c.font = "24px 'Kalam', cursive";
+    c.textAlign = "center";
+    c.fillStyle = "#1e293b";
+
+    let displayLines = wrapText(note.text, note.w - 40, c);
+
+    // Truncate if not expanded
+    if (!note.expanded && displayLines.length > 4) {
+        displayLines = displayLines.slice(0, 3);
+        displayLines.push("... (Click to read)");
+    }
+
+    // Calc startY to center, offset up slightly to make room for date
+    const lh = 30;
+    const startY = -displayLines.length * lh / 2 - 10;
+
+    displayLines.forEach((line, i) => {
+        if (hit) highlightWords(c, line, startY + i * lh);
+        c.fillText(line, 0, startY + i * lh);
     });
 }
 
-function animate() {
-    draw();
-    requestAnimationFrame(animate);
+// Marker behind the words of a centered line that matched the search
+function highlightWords(c, line, y) {
+    const words = line.split(' ');
+    const space = c.measureText(' ').width;
+    let x = -c.measureText(line).width / 2;
+    c.save();
+    c.fillStyle = "rgba(249, 115, 22, 0.35)";
+    words.forEach(word => {
+        const w = c.measureText(word).width;
+        if (noteTokens(word).some(t => searchTerms.has(t))) c.fillRect(x - 2, y - 14, w + 4, 28);
+        x += w + space;
+    });
+    c.restore();
 }
 
-// Start
-fetchData();
-setInterval(fetchData, 2000);
-animate();
+// Start (perf.html fills the wall with generated notes instead)
+if (!window.WALL_DEMO_NOTES) {
+    fetchData();
+    setInterval(fetchData, 2000);
+}
+// Nothing on the wall moves by itself: frames follow input, new notes and hover easing
+scheduler = new FrameScheduler(() => draw(), { isAnimating: () => wallEasing });
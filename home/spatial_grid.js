@@ -0,0 +1,65 @@
+// Uniform bucket grid over axis-aligned world rectangles, for the wall's
+// viewport queries: query() returns only the ids whose rectangles meet the
+// box, so drawing and hit tests cost O(visible), not O(notes).
+class SpatialGrid {
+    constructor(cell = 512) {
+        this.cell = cell;
+        this.buckets = new Map(); // cell key -> Set of ids
+        this.rects = new Map();   // id -> [x0, y0, x1, y1]
+    }
+
+    static key(cx, cy) {
+        return (cx + 32768) * 65536 + (cy + 32768);
+    }
+
+    get size() { return this.rects.size; }
+
+    clear() {
+        this.buckets.clear();
+        this.rects.clear();
+    }
+
+    forCells(x0, y0, x1, y1, fn) {
+        const c = this.cell;
+        const cx1 = Math.floor(x1 / c), cy1 = Math.floor(y1 / c);
+        for (let cx = Math.floor(x0 / c); cx <= cx1; cx++) {
+            for (let cy = Math.floor(y0 / c); cy <= cy1; cy++) fn(SpatialGrid.key(cx, cy));
+        }
+    }
+
+    insert(id, x0, y0, x1, y1) {
+        if (this.rects.has(id)) this.remove(id);
+        this.rects.set(id, [x0, y0, x1, y1]);
+        this.forCells(x0, y0, x1, y1, k => {
+            let bucket = this.buckets.get(k);
+            if (!bucket) this.buckets.set(k, bucket = new Set());
+            bucket.add(id);
+        });
+    }
+
+    remove(id) {
+        const r = this.rects.get(id);
+        if (!r) return;
+        this.rects.delete(id);
+        this.forCells(r[0], r[1], r[2], r[3], k => {
+            const bucket = this.buckets.get(k);
+            if (!bucket) return;
+            bucket.delete(id);
+            if (!bucket.size) this.buckets.delete(k);
+        });
+    }
+
+    // Ids whose rectangles intersect the box, ascending
+    query(x0, y0, x1, y1) {
+        const found = new Set();
+        this.forCells(x0, y0, x1, y1, k => {
+            const bucket = this.buckets.get(k);
+            if (!bucket) return;
+            for (const id of bucket) {
+                const r = this.rects.get(id);
+                if (r[0] <= x1 && r[2] >= x0 && r[1] <= y1 && r[3] >= y0) found.add(id);
+            }
+        });
+        return Array.from(found).sort((a, b) => a - b);
+    }
+}
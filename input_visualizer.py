@@ -1,46 +1,54 @@
 import os
 import sys
 import threading
+import logging
 import time
 
+log = logging.getLogger(__name__)
+
 try:
     import webview
 except ImportError:
-    print("pywebview is not installed. Please run: pip install pywebview")
+    log.critical("pywebview is not installed. Please run: pip install pywebview")
     sys.exit(1)
 
-import json
+from notes_store import NotesLog, export_json
+from notes_index import NotesIndex
+from local_server import start_app_server
 
 class Api:
-    def get_data(self):
-        # Path to user_inputs.json in home/ directory
-        # Persistence: MUST be in valid write location.
-        if getattr(sys, 'frozen', False):
-            # In frozen mode, data should be in the directory of the executable, 
-            # NOT in _MEIPASS (which is temporary).
-            # We follow the same logic as glass_window fallback: root of exe or home/ inside it if present.
-            base_dir = os.path.dirname(sys.executable)
-            possible_home = os.path.join(base_dir, 'home')
-            if os.path.exists(possible_home):
-                cpath = possible_home
-            else:
-                cpath = base_dir
-            # Filename is just user_inputs.json in that cpath
-            json_file = os.path.join(cpath, 'user_inputs.json')
-        else:
-            cpath = os.path.dirname(os.path.abspath(__file__))
-            json_file = os.path.join(cpath, 'home', 'user_inputs.json')
-        
-        if not os.path.exists(json_file):
-            return []
-            
+    """Bridge for home/script.js. The notes live in an append-only log (notes_store.py)."""
+    def __init__(self):
+        self.notes = NotesLog()
+        self.index = None   # NotesIndex, loaded on the first search
+        self.index_lock = threading.Lock()
+
+    def get_since(self, cursor=0, limit=None):
+        """Notes added after `cursor` (0 = from the start) and the cursor to ask with next time"""
         try:
-            with open(json_file, 'r') as f:
-                content = json.load(f)
-                return content
+            return self.notes.get_since(cursor, limit)
         except Exception as e:
-            print(f"Error reading JSON: {e}")
-            return []
+            log.error("Error reading notes: %s", e)
+            return {"cursor": cursor, "notes": [], "reset": False}
+
+    def search(self, query, limit=20):
+        """Best matches for `query` (see notes_index.py); hit ids are positions on the wall"""
+        try:
+            with self.index_lock:
+                if self.index is None:
+                    self.index = NotesIndex(self.notes.path)
+                return self.index.search(query, limit)
+        except Exception as e:
+            log.error("Error searching notes: %s", e)
+            return {"terms": [], "total": 0, "partial": False, "hits": []}
+
+    def export_notes(self):
+        """Rewrites user_inputs.json (the plain JSON array view) from the log; returns the note count"""
+        return export_json(self.notes.path)
+
+    def get_data(self):
+        """Every note (older pages polled this; get_since only sends what's new)"""
+        return self.get_since(0)["notes"]
 
 def main():
     # Calculate path to the new HTML file in home/
@@ -51,11 +59,16 @@ def main():
     html_file = os.path.join(cpath, 'home', 'index.html')
     
     if not os.path.exists(html_file):
-        print(f"File not found: {html_file}")
+        log.error("File not found: %s", html_file)
         return
         
-    file_url = f"file:///{html_file.replace(os.sep, '/')}"
-    print(f"Opening: {file_url}")
+    # Served over loopback HTTP (ETags, 304s, compression); file:/// if that fails
+    server = start_app_server()
+    if server:
+        file_url = server.url('home/index.html')
+    else:
+        file_url = f"file:///{html_file.replace(os.sep, '/')}"
+    log.info("Opening: %s", file_url)
     
     api = Api()
     
@@ -75,4 +88,6 @@ def main():
     webview.start(debug=False)
 
 if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging("stats")
     main()
@@ -0,0 +1,292 @@
+"""
+Loopback HTTP server for the webview pages (visualizer/ and home/).
+
+The windows open http://127.0.0.1:<port>/<token>/visualizer/index.html
+instead of a file:/// URL, so the pages' data polls (world.json,
+city_changes.json, user_inputs.jsonl, ...) can revalidate instead of
+cache-busting:
+
+- Every response carries a strong ETag (a hash of the content, plus the
+  content coding) and Cache-Control: no-cache, so the page always asks and
+  the answer to an unchanged file is a bodyless 304.
+- A file is read, hashed and compressed once per version (mtime, size); a
+  304 costs one stat() and a dict lookup.
+- Text assets (JSON, JS, CSS, HTML) go out with Content-Encoding: br when
+  the brotli module is installed and the page accepts it, gzip otherwise.
+
+Only 127.0.0.1 is bound, and paths must start with a random per-process
+token, so other local processes can't guess their way to the notes.
+"""
+import os
+import sys
+import gzip
+import hashlib
+import logging
+import socket
+import secrets
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.json': 'application/json',
+    '.jsonl': 'application/x-ndjson',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.ico': 'image/x-icon',
+    '.bin': 'application/octet-stream',
+}
+COMPRESSIBLE = {'.html', '.js', '.css', '.json', '.jsonl', '.svg'}
+MIN_COMPRESS = 1024        # Smaller bodies go as they are
+CACHE_BYTES = 128 * 1024 * 1024
+
+
+class Asset:
+    """One version of a file: its bytes, their hash, and the compressed copies made so far"""
+    def __init__(self, key, body):
+        self.key = key
+        self.body = body
+        self.tag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.encoded = {}
+        self.lock = threading.Lock()
+
+    def etag(self, coding):
+        return f'"{self.tag}-{coding}"' if coding else f'"{self.tag}"'
+
+    def payload(self, coding):
+        if not coding:
+            return self.body
+        with self.lock:
+            data = self.encoded.get(coding)
+            if data is None:
+                if coding == 'br':
+                    data = brotli.compress(self.body, quality=5)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6, mtime=0)
+                self.encoded[coding] = data
+            return data
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(d) for d in self.encoded.values())
+
+
+class AssetCache:
+    """Assets by path, checked against stat() on every request; least recently served dropped past max_bytes"""
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.assets = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def stat_key(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, path):
+        """The file's current Asset. Raises OSError (missing, unreadable)."""
+        key = self.stat_key(path)
+        with self.lock:
+            asset = self.assets.get(path)
+            if asset is not None and asset.key == key:
+                self.assets.move_to_end(path)
+                return asset
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        asset = Asset(key, body)
+        # Written to while we read it: serve what we got, but don't keep it
+        if self.stat_key(path) != key:
+            return asset
+        with self.lock:
+            self.assets[path] = asset
+            self.assets.move_to_end(path)
+            total = sum(a.size for a in self.assets.values())
+            while total > self.max_bytes and len(self.assets) > 1:
+                _, old = self.assets.popitem(last=False)
+                total -= old.size
+        return asset
+
+
+def accepted_coding(header):
+    """'br', 'gzip' or None for an Accept-Encoding header"""
+    offered = {}
+    for part in (header or "").split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    if brotli is not None and offered.get('br', 0) > 0:
+        return 'br'
+    if offered.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def etag_matches(header, etag):
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "BitVille"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes: don't let the body wait for an ACK
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def serve(self, send_body):
+        assets = self.server.assets
+        path = assets.resolve(unquote(urlsplit(self.path).path))
+        if path is None:
+            return self.send_empty(HTTPStatus.NOT_FOUND)
+        try:
+            asset = assets.cache.get(path)
+        except OSError:
+            return self.send_empty(HTTPStatus.NOT_FOUND)
+
+        ext = os.path.splitext(path)[1].lower()
+        compressible = ext in COMPRESSIBLE
+        coding = None
+        if compressible and len(asset.body) >= MIN_COMPRESS:
+            coding = accepted_coding(self.headers.get('Accept-Encoding'))
+        etag = asset.etag(coding)
+
+        headers = [('ETag', etag), ('Cache-Control', 'no-cache')]
+        if compressible:
+            headers.append(('Vary', 'Accept-Encoding'))
+        inm = self.headers.get('If-None-Match')
+        if inm and etag_matches(inm, etag):
+            assets.not_modified += 1
+            return self.send_empty(HTTPStatus.NOT_MODIFIED, headers)
+
+        body = asset.payload(coding)
+        assets.sent += 1
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', CONTENT_TYPES.get(ext, 'application/octet-stream'))
+        self.send_header('Content-Length', str(len(body)))
+        if coding:
+            self.send_header('Content-Encoding', coding)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_empty(self, status, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        log.debug("%s " + format, self.address_string(), *args)
+
+
+class AssetServer:
+    """
+    Serves mounts ({"visualizer": [dir, ...], "home": [...]}) under
+    /<token>/<mount>/...; a mount with several folders serves the first one
+    that has the file.
+    """
+    def __init__(self, mounts, host="127.0.0.1", port=0):
+        self.mounts = {name: [os.path.realpath(d) for d in dirs] for name, dirs in mounts.items()}
+        self.host = host
+        self.port = port
+        self.token = secrets.token_urlsafe(12)
+        self.cache = AssetCache()
+        self.httpd = None
+        self.thread = None
+        self.sent = 0
+        self.not_modified = 0
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), AssetHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.assets = self
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="asset-server", daemon=True)
+        self.thread.start()
+        log.info("Serving %s on http://%s:%d/", ", ".join(self.mounts), self.host, self.port)
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def url(self, rel_path):
+        return f"http://{self.host}:{self.port}/{self.token}/{rel_path.lstrip('/')}"
+
+    def resolve(self, url_path):
+        """Filesystem path for /<token>/<mount>/<rest>, or None"""
+        parts = url_path.split('/')
+        if len(parts) < 4 or parts[0] != '' or not secrets.compare_digest(parts[1], self.token):
+            return None
+        dirs = self.mounts.get(parts[2])
+        rest = parts[3:]
+        if not dirs or any(p in ('', '.', '..') or '\\' in p or ':' in p for p in rest):
+            return None
+        for d in dirs:
+            path = os.path.realpath(os.path.join(d, *rest))
+            if path.startswith(d + os.sep) and os.path.isfile(path):
+                return path
+        return None
+
+
+def app_mounts():
+    """visualizer/ and home/ as the windows see them: bundled assets, with the notes folder first for home/ when frozen"""
+    from notes_store import notes_dir
+    if getattr(sys, 'frozen', False):
+        base = sys._MEIPASS
+    else:
+        base = os.path.dirname(os.path.abspath(__file__))
+    home = [os.path.join(base, 'home')]
+    # notes_dir() falls back to the exe's own folder, which isn't ours to serve
+    if os.path.basename(notes_dir()) == 'home':
+        home.insert(0, notes_dir())
+    return {
+        'visualizer': [os.path.join(base, 'visualizer')],
+        'home': list(dict.fromkeys(home)),
+    }
+
+
+def start_app_server():
+    """A started AssetServer for the app's pages, or None if it can't listen (the caller falls back to file:///)"""
+    try:
+        return AssetServer(app_mounts()).start()
+    except OSError as e:
+        log.warning("Local asset server unavailable (%s); using file URLs", e)
+        return None
@@ -0,0 +1,172 @@
+"""
+Logging setup shared by every BitVille process (tray, visualizer, windows).
+
+Modules just do `log = logging.getLogger(__name__)`. setup_logging() installs:
+
+- A bounded queue handler on the root logger. Callers only enqueue (never
+  block on disk or on a stalled console). If the queue is full the record is
+  dropped and counted, so the monitor loop can never stall on logging.
+- A listener thread that writes JSON lines to a size-rotated file
+  (datas/logs/<name>.log) and, when a console is attached, a readable line to
+  stdout.
+- Per-module levels ("log_level" / "log_levels" in settings.json).
+- Rate limiting for hot-loop messages:
+
+      log.info("Stats saved", extra=rate_limited(600, "stats_saved"))
+
+  emits at most once per 600s; the next emitted record reports how many were
+  suppressed in between.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime
+
+from metrics import METRICS
+
+LOG_QUEUE_SIZE = 10000
+MAX_LOG_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_listener = None
+
+
+def default_log_dir():
+    # Frozen builds: next to the exe (sys._MEIPASS is a temp dir)
+    if getattr(sys, 'frozen', False):
+        base = os.path.dirname(sys.executable)
+    else:
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, 'datas', 'logs')
+
+
+def rate_limited(seconds, key=None):
+    """`extra` dict for a record that should be emitted at most once per `seconds`"""
+    extra = {"rate_limit": seconds}
+    if key:
+        extra["rate_key"] = key
+    return extra
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops records carrying `rate_limit` if the same key was emitted too recently"""
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.last = {}
+        self.suppressed = {}
+
+    def filter(self, record):
+        interval = getattr(record, 'rate_limit', None)
+        if not interval:
+            return True
+        key = getattr(record, 'rate_key', None) or (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            last = self.last.get(key)
+            if last is not None and now - last < interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return False
+            self.last[key] = now
+            skipped = self.suppressed.pop(key, 0)
+        if skipped:
+            record.suppressed = skipped
+            record.msg = f"{record.msg} (+{skipped} similar suppressed)"
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: drops (and counts) records when the queue is full"""
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            METRICS.inc("log_records_dropped")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields"""
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "rate_limit", "rate_key"}
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage()
+        }
+        for k, v in record.__dict__.items():
+            if k not in self.RESERVED and not k.startswith('_'):
+                entry[k] = v
+        return json.dumps(entry, default=str)
+
+
+def load_log_levels(settings_file):
+    """Reads ("log_level", {"module": "LEVEL"}) from settings.json, if present"""
+    try:
+        with open(settings_file, 'r') as f:
+            settings = json.load(f)
+        return settings.get("log_level", "INFO"), settings.get("log_levels", {})
+    except Exception:
+        return "INFO", {}
+
+
+def setup_logging(name="bitville", level="INFO", module_levels=None, log_dir=None, console=None):
+    """
+    Installs the queue-based logging pipeline for this process. Safe to call
+    more than once (later calls only update levels).
+
+    name:          log file name (one file per process: tray.log, visualizer.log...)
+    module_levels: {"data_collector": "DEBUG", "fetch_stargazers": "WARNING"}
+    console:       mirror to stdout. Default: only if a console is attached.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    for module, mod_level in (module_levels or {}).items():
+        logging.getLogger(module).setLevel(mod_level)
+
+    if _listener is not None:
+        return _listener
+
+    handlers = []
+    log_dir = log_dir or default_log_dir()
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, f"{name}.log"),
+            maxBytes=MAX_LOG_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    except OSError:
+        # Read-only install dir; fall back to console only
+        pass
+
+    # --noconsole builds have no stdout at all
+    if console is None:
+        console = sys.stdout is not None
+    if console and sys.stdout is not None:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s", "%H:%M:%S"))
+        handlers.append(stream_handler)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued on a normal exit
+    atexit.register(_listener.stop)
+    return _listener
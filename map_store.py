@@ -0,0 +1,289 @@
+"""
+Map persistence for the visualizer window (visualizer_app.Api).
+
+Files live in the writable data folder (data_dir(): datas/ next to the exe
+when frozen, datas/ in the project otherwise), never relative to the
+working directory.
+
+map.json layout:
+
+    {"format": "bitville-map", "version": 1, "min_reader": 1,
+     "entities": {"shapes": [["id", "x", "y"], ...],
+                  "rows": [[0, "h1", 3, 4], ...]},
+     ...any other top-level keys of the saved map...}
+
+- version is what wrote the file, min_reader the oldest reader that can use
+  it. A reader loads any file with min_reader <= its VERSION and ignores
+  keys it doesn't know, so additions bump version only; min_reader moves
+  only when an old reader would misread the file.
+- Entities are stored by shape: each distinct key list once, then one row
+  per entity (shape index, values). Entities of one kind share a shape, so
+  the keys aren't repeated per entity; key order and absent keys are kept.
+- Unversioned files (the old {"entities": [...]}, indent=4) still load. Older
+  builds saved ./map.json in the working directory; the first load moves it
+  to the data folder (migrate_legacy_map, the old file kept as map.json.bak).
+
+Saves write a temp file in the same folder, fsync it and os.replace() it
+over map.json, so a crash leaves either the old map or the new one.
+
+Maps too big for one pywebview call go through Transfers: the page pulls
+or pushes the JSON text in CHUNK_CHARS pieces under a transfer id
+(visualizer/map_client.js).
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+FORMAT = "bitville-map"
+VERSION = 1      # Written by this build
+MIN_READER = 1   # Oldest reader that can use what this build writes
+
+MAP_FILENAME = "map.json"
+ACTIVITY_LOG_FILENAME = "activity_log.json"
+HISTORY_FILENAME = "city_history.jsonl"  # city_history.py
+LEGACY_MAP_PATH = "map.json"  # Before data_dir(): relative to the working directory
+
+CHUNK_CHARS = 512 * 1024  # A multiple of 4: base64 chunks decode on their own
+TRANSFER_TTL = 120  # Seconds an unfinished transfer is kept
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+def data_dir():
+    """Writable datas/ folder: next to the exe when frozen (sys._MEIPASS is a temp dir), in the project otherwise"""
+    if getattr(sys, 'frozen', False):
+        base = os.path.dirname(sys.executable)
+    else:
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, 'datas')
+
+
+def map_path():
+    return os.path.join(data_dir(), MAP_FILENAME)
+
+
+def activity_log_path():
+    return os.path.join(data_dir(), ACTIVITY_LOG_FILENAME)
+
+
+def history_path():
+    return os.path.join(data_dir(), HISTORY_FILENAME)
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def encode_entities(entities):
+    """[{...}, ...] -> {"shapes": [[keys]], "rows": [[shape, *values]]}"""
+    shapes = {}
+    rows = []
+    for e in entities:
+        keys = tuple(e)
+        shape = shapes.get(keys)
+        if shape is None:
+            shape = shapes[keys] = len(shapes)
+        row = [shape]
+        row.extend(e.values())
+        rows.append(row)
+    return {"shapes": [list(k) for k in shapes], "rows": rows}
+
+
+def decode_entities(table):
+    shapes = table["shapes"]
+    return [dict(zip(shapes[row[0]], row[1:])) for row in table["rows"]]
+
+
+def encode_map(data):
+    """The map dict as map.json text (versioned header, compact entities)"""
+    doc = {"format": FORMAT, "version": VERSION, "min_reader": MIN_READER}
+    for key, value in data.items():
+        if key not in doc:
+            doc[key] = value
+    doc["entities"] = encode_entities(data.get("entities") or [])
+    return json.dumps(doc, separators=(',', ':'))
+
+
+def decode_map(text):
+    """map.json text -> the map dict ({"entities": [...], ...}). Raises MapFormatError."""
+    try:
+        doc = json.loads(text)
+    except ValueError as e:
+        raise MapFormatError(f"not JSON: {e}") from None
+    if not isinstance(doc, dict):
+        raise MapFormatError("not a map")
+    if "format" not in doc:
+        # Unversioned (before the header): the dict as it was saved
+        doc.setdefault("entities", [])
+        return doc
+    if doc["format"] != FORMAT:
+        raise MapFormatError(f"unknown format {doc['format']!r}")
+    if doc.get("min_reader", 1) > VERSION:
+        raise MapFormatError(f"map version {doc.get('version')} needs a newer reader (this one reads up to {VERSION})")
+
+    data = {k: v for k, v in doc.items() if k not in ("format", "version", "min_reader")}
+    entities = doc.get("entities")
+    try:
+        data["entities"] = decode_entities(entities) if isinstance(entities, dict) else (entities or [])
+    except (KeyError, IndexError, TypeError) as e:
+        raise MapFormatError(f"bad entity table: {e!r}") from None
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------------------
+
+def write_atomic(path, text):
+    """Replaces `path` with `text` in one step: temp file, fsync, os.replace"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def migrate_legacy_map():
+    """
+    Moves a map saved by older builds (./map.json) to map_path(), once: only
+    while map_path() doesn't exist. The old file is kept as map.json.bak.
+    Returns True if a map was moved.
+    """
+    path = map_path()
+    legacy = os.path.abspath(LEGACY_MAP_PATH)
+    if os.path.exists(path) or legacy == path or not os.path.isfile(legacy):
+        return False
+    try:
+        with open(legacy, 'r', encoding='utf-8') as f:
+            data = decode_map(f.read())
+        save_map(data, path)
+        os.replace(legacy, legacy + ".bak")
+    except (OSError, MapFormatError) as e:
+        log.error("Could not move the old map %s to %s: %s", legacy, path, e)
+        return False
+    log.info("Moved the old map %s to %s", legacy, path)
+    return True
+
+
+def read_map_text(path=None):
+    """map.json as text; an empty versioned map if there is none yet"""
+    if path is None:
+        migrate_legacy_map()
+    path = path or map_path()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return encode_map({"entities": []})
+
+
+def load_map(path=None):
+    return decode_map(read_map_text(path))
+
+
+def save_map(data, path=None):
+    """Saves the map dict; returns the number of bytes written"""
+    if not isinstance(data, dict):
+        raise MapFormatError("a map is a dict")
+    text = encode_map(data)
+    write_atomic(path or map_path(), text)
+    return len(text)
+
+
+def save_map_text(text, path=None):
+    """Saves map JSON text from the page (plain {"entities": [...]} or already encoded), re-encoded and checked"""
+    data = decode_map(text)
+    return save_map(data, path)
+
+
+# ---------------------------------------------------------------------------
+# Chunked transfers over the bridge
+# ---------------------------------------------------------------------------
+
+class Transfers:
+    """
+    Large texts crossing the pywebview bridge a chunk at a time.
+
+    Download: begin_read(text) -> {"id", "size", "chunks"}; then
+    read_chunk(id, i) for i in range(chunks); the transfer is dropped after
+    its last chunk. Upload: begin_write() -> id; write_chunk(id, i, text) in
+    order; finish_write(id) -> the whole text. Transfers idle for more than
+    TRANSFER_TTL seconds are dropped.
+    """
+    def __init__(self, chunk_chars=CHUNK_CHARS, ttl=TRANSFER_TTL):
+        self.chunk_chars = chunk_chars
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.reads = {}   # id -> [text, touched]
+        self.writes = {}  # id -> [parts, touched]
+
+    def expire(self, now):
+        for table in (self.reads, self.writes):
+            for tid in [t for t, entry in table.items() if now - entry[1] > self.ttl]:
+                log.warning("Dropping unfinished map transfer %s", tid)
+                del table[tid]
+
+    def begin_read(self, text):
+        tid = uuid.uuid4().hex
+        now = time.monotonic()
+        with self.lock:
+            self.expire(now)
+            self.reads[tid] = [text, now]
+        chunks = max(1, -(-len(text) // self.chunk_chars))
+        return {"id": tid, "size": len(text), "chunks": chunks}
+
+    def read_chunk(self, tid, index):
+        with self.lock:
+            entry = self.reads.get(tid)
+            if entry is None:
+                raise KeyError(f"unknown transfer {tid}")
+            text = entry[0]
+            start = index * self.chunk_chars
+            if index < 0 or (start >= len(text) and index > 0):
+                raise IndexError(f"chunk {index} out of range")
+            entry[1] = time.monotonic()
+            if start + self.chunk_chars >= len(text):
+                del self.reads[tid]
+        return text[start:start + self.chunk_chars]
+
+    def begin_write(self):
+        tid = uuid.uuid4().hex
+        now = time.monotonic()
+        with self.lock:
+            self.expire(now)
+            self.writes[tid] = [[], now]
+        return tid
+
+    def write_chunk(self, tid, index, text):
+        with self.lock:
+            entry = self.writes.get(tid)
+            if entry is None:
+                raise KeyError(f"unknown transfer {tid}")
+            if index != len(entry[0]):
+                raise IndexError(f"chunk {index} out of order (expected {len(entry[0])})")
+            entry[0].append(text)
+            entry[1] = time.monotonic()
+
+    def finish_write(self, tid):
+        with self.lock:
+            entry = self.writes.pop(tid, None)
+        if entry is None:
+            raise KeyError(f"unknown transfer {tid}")
+        return "".join(entry[0])
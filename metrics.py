@@ -0,0 +1,232 @@
+"""
+Lightweight instrumentation for the collector threads.
+
+- Timing histograms (monitor tick, save, reward recalculation, GitHub fetch...)
+- Counters (files written, bytes written...)
+- Gauges (per-thread CPU seconds, cache sizes...)
+- An on-demand sampling profiler that periodically grabs every thread's stack
+
+Everything is kept in memory and exposed as a plain dict via snapshot(), which
+the collector periodically writes to datas/metrics.json and the tray app can
+dump on demand (Diagnostics menu).
+"""
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# Bucket upper bounds in milliseconds (last bucket is +inf)
+DEFAULT_BUCKETS_MS = [0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class Histogram:
+    def __init__(self, buckets_ms=None):
+        self.buckets_ms = buckets_ms or DEFAULT_BUCKETS_MS
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def observe(self, ms):
+        self.count += 1
+        self.total += ms
+        self.last = ms
+        if self.min is None or ms < self.min: self.min = ms
+        if self.max is None or ms > self.max: self.max = ms
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def percentile(self, p):
+        """Approximate percentile (upper bound of the bucket it falls in)"""
+        if not self.count: return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self.max
+        return self.max
+
+    def to_dict(self):
+        labels = [f"<={b}ms" for b in self.buckets_ms] + ["inf"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "min_ms": self.min,
+            "max_ms": self.max,
+            "last_ms": self.last,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {label: c for label, c in zip(labels, self.counts) if c}
+        }
+
+
+class SamplingProfiler:
+    """Samples all thread stacks every `interval` seconds from a daemon thread"""
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.running = False
+        self.thread = None
+        self.samples = 0
+        self.started_at = None
+        self.self_counts = {}   # thread name -> Counter(top frame)
+        self.cum_counts = {}    # thread name -> Counter(any frame on stack)
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.samples = 0
+        self.started_at = time.time()
+        self.self_counts = {}
+        self.cum_counts = {}
+        self.thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+    def _loop(self):
+        me = threading.get_ident()
+        while self.running:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me: continue
+                name = names.get(ident, str(ident))
+                self_c = self.self_counts.setdefault(name, Counter())
+                cum_c = self.cum_counts.setdefault(name, Counter())
+                self_c[self._label(frame)] += 1
+                seen = set()
+                f = frame
+                while f is not None:
+                    label = self._label(f)
+                    if label not in seen:
+                        cum_c[label] += 1
+                        seen.add(label)
+                    f = f.f_back
+            self.samples += 1
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        # Aggregate per function, not per line
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def to_dict(self, top=15):
+        threads = {}
+        # Copy first: the sampler thread may add threads while we read
+        for name, self_c in list(self.self_counts.items()):
+            threads[name] = {
+                "self": Counter(dict(self_c)).most_common(top),
+                "cumulative": Counter(dict(self.cum_counts.get(name, {}))).most_common(top)
+            }
+        return {
+            "running": self.running,
+            "interval_sec": self.interval,
+            "samples": self.samples,
+            "duration_sec": round(time.time() - self.started_at, 1) if self.started_at else 0,
+            "threads": threads
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.histograms = {}
+        self.counters = Counter()
+        self.gauges = {}
+        self.profiler = SamplingProfiler()
+
+    # --- Recording ---
+    def observe(self, name, seconds):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(seconds * 1000.0)
+
+    @contextmanager
+    def timer(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timed(self, name):
+        """Decorator form of timer()"""
+        def wrap(func):
+            @functools.wraps(func)
+            def inner(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return inner
+        return wrap
+
+    def inc(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def record_thread_cpu(self, name):
+        """Call from inside a loop: stores that thread's CPU seconds so far"""
+        self.gauge(f"thread_cpu_sec.{name}", round(time.thread_time(), 3))
+
+    # --- Profiler ---
+    def profiler_running(self):
+        return self.profiler.running
+
+    def toggle_profiler(self):
+        if self.profiler.running:
+            self.profiler.stop()
+        else:
+            self.profiler.start()
+        return self.profiler.running
+
+    # --- Export ---
+    def snapshot(self):
+        with self.lock:
+            snap = {
+                "timestamp": datetime.now().isoformat(),
+                "uptime_sec": round(time.time() - self.started_at, 1),
+                "pid": os.getpid(),
+                "threads": [t.name for t in threading.enumerate()],
+                "timings": {name: h.to_dict() for name, h in self.histograms.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges)
+            }
+        snap["profiler"] = self.profiler.to_dict()
+        return snap
+
+    def write(self, path):
+        """Writes the snapshot to `path` (temp file + rename, so readers never see half a file)"""
+        data = json.dumps(self.snapshot(), indent=4)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+
+# Process-wide registry
+METRICS = Metrics()
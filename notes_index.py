@@ -0,0 +1,386 @@
+"""
+Full-text search over the notes log (user_inputs.jsonl).
+
+An inverted index from terms to the notes containing them: the words of a
+note's text plus its date ("2026-01-05") and month ("2026-01"). A note's id
+is its position in the log (the n-th readable record), which is also its
+index on the wall.
+
+    index = NotesIndex()
+    index.search("refactor pars")   # {"terms": [...], "total": 3, "partial": False,
+                                    #  "hits": [{"id": 41, "score": 2.7, "note": {...}}, ...]}
+
+Every query word has to match (AND). A word ending in "*", and the last word
+while it is still being typed (no trailing space), matches every term it is a
+prefix of. Hits are ranked by tf-idf, exact terms above prefix matches, ties
+newest first. When more than MAX_SCORED notes match, only the newest
+MAX_SCORED are looked at (partial=True), so a common word costs the same on
+any log size.
+
+Like NotesLog, the index covers the log up to a byte offset and catches up by
+reading only what was appended after it. It is persisted next to the log as
+user_inputs.idx. The note writer calls update_index() after each save. That
+costs a header read until the snapshot is SNAPSHOT_LAG bytes behind the log,
+and then it is rewritten.
+
+user_inputs.idx:
+    48-byte header  "BVNI", version, 0, 0 (u16), notes, terms (u32), log end (u64),
+                    log crc32 (u32), 0 (u32), terms blob size, postings (u64), all LE
+    notes * 8       log offset of each note (u64)
+    blob            the terms, sorted, "\\n"-separated (utf-8)
+    terms * 4       postings per term (u32)
+    postings * 4    note ids, term after term (u32, ascending)
+    postings        occurrences of the term in the note (u8, capped at 255)
+
+The crc covers the FINGERPRINT bytes before the log end, so a snapshot of a
+log that was replaced since is rebuilt instead of trusted.
+"""
+import os
+import re
+import sys
+import json
+import math
+import zlib
+import heapq
+import struct
+import logging
+from array import array
+from bisect import bisect_left, insort
+
+from notes_store import notes_path, migrate_legacy
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"BVNI"
+VERSION = 1
+HEADER = struct.Struct('<4sBBHIIQIIQQ')
+
+TOKEN_RE = re.compile(r"\d{4}-\d{2}(?:-\d{2})?|\w+")
+# Queries keep a half-typed date ("2026-0") in one piece so it works as a prefix
+QUERY_RE = re.compile(r"\d{4}-[\d-]*|\w+")
+
+MAX_SCORED = 4096
+PREFIX_TERMS = 64       # a short prefix expands to its most common terms only
+PREFIX_WEIGHT = 0.5
+SNAPSHOT_LAG = 64 * 1024
+FINGERPRINT = 4096
+TF_WEIGHT = [0.0] + [1.0 + math.log(tf) for tf in range(1, 256)]
+
+
+def index_path(path=None):
+    """user_inputs.idx next to the log"""
+    return os.path.splitext(path or notes_path())[0] + ".idx"
+
+
+def note_text(record):
+    """The text the wall shows for a record (appendNotes in home/script.js)"""
+    if isinstance(record, str):
+        return record
+    if isinstance(record, dict):
+        return record.get('answer') or record.get('question') or json.dumps(record)
+    return json.dumps(record)
+
+
+def note_terms(record):
+    """{term: occurrences} for one record"""
+    counts = {}
+    for term in TOKEN_RE.findall(note_text(record).lower()):
+        counts[term] = counts.get(term, 0) + 1
+    stamp = record.get('timestamp') if isinstance(record, dict) else None
+    if isinstance(stamp, str) and len(stamp) >= 10:
+        for term in (stamp[:10], stamp[:7]):
+            counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def parse_query(query):
+    """[word, is_prefix] pairs, without repeats"""
+    query = str(query or "").lower()
+    words = []
+    for m in QUERY_RE.finditer(query):
+        word = [m.group(), query[m.end():m.end() + 1] == "*"]
+        if word[0] not in (w[0] for w in words):
+            words.append(word)
+    if words and not query[-1:].isspace():
+        words[-1][1] = True
+    return words
+
+
+def log_fingerprint(path, end):
+    """crc32 of the FINGERPRINT bytes before `end` (None if the log is shorter)"""
+    length = min(end, FINGERPRINT)
+    try:
+        with open(path, 'rb') as f:
+            f.seek(end - length)
+            data = f.read(length)
+    except OSError:
+        return None
+    return zlib.crc32(data) if len(data) == length else None
+
+
+def _contains(ids, doc):
+    i = bisect_left(ids, doc)
+    return i < len(ids) and ids[i] == doc
+
+
+def _little_endian(column):
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+class NotesIndex:
+    def __init__(self, path=None):
+        self.path = path or notes_path()
+        self.index_file = index_path(self.path)
+        self.postings = {}          # term -> (array('I') note ids, bytearray occurrences)
+        self.terms = []             # sorted, for prefix lookups
+        self.new_terms = []         # added since self.terms was last sorted
+        self.offsets = array('Q')   # log offset of every note
+        self.end = 0                # offset just past the last indexed record
+        self.saved_end = 0
+        self.identity = None
+        self.fingerprint = None     # log_fingerprint(path, end) of the indexed log
+        self.load()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # --- Building ---
+    def clear(self):
+        self.postings, self.terms, self.new_terms = {}, [], []
+        self.offsets = array('Q')
+        self.end = self.saved_end = 0
+        self.fingerprint = 0
+
+    def add(self, record, offset):
+        doc = len(self.offsets)
+        self.offsets.append(offset)
+        for term, count in note_terms(record).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array('I'), bytearray())
+                self.new_terms.append(term)
+            entry[0].append(doc)
+            entry[1].append(min(count, 255))
+
+    def refresh(self):
+        """Indexes the records appended since the last call (starts over for a replaced log)"""
+        migrate_legacy(self.path)
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.clear()
+            return
+        identity = (st.st_dev, st.st_ino)
+        if self.end and (identity != self.identity or st.st_size < self.end) and \
+                log_fingerprint(self.path, self.end) != self.fingerprint:
+            log.info("Notes log replaced, rebuilding the search index")
+            self.clear()
+        self.identity = identity
+        if st.st_size > self.end:
+            with open(self.path, 'rb') as f:
+                f.seek(self.end)
+                data = f.read(st.st_size - self.end)
+            pos = 0
+            while True:
+                nl = data.find(b"\n", pos)
+                if nl < 0:
+                    break
+                line = data[pos:nl]
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        pass
+                    else:
+                        self.add(record, self.end + pos)
+                pos = nl + 1
+            self.end += pos
+            self.fingerprint = log_fingerprint(self.path, self.end)
+        if self.end - self.saved_end >= SNAPSHOT_LAG:
+            try:
+                self.save()
+            except OSError as e:
+                log.error("Could not save the search index: %s", e)
+
+    # --- Queries ---
+    def _sorted_terms(self):
+        if self.new_terms:
+            if len(self.new_terms) < 256:
+                for term in self.new_terms:
+                    insort(self.terms, term)
+            else:
+                self.terms = sorted(self.postings)
+            self.new_terms = []
+        return self.terms
+
+    def expand(self, prefix):
+        """Indexed terms starting with `prefix` (the PREFIX_TERMS most common ones)"""
+        terms = self._sorted_terms()
+        lo = bisect_left(terms, prefix)
+        hi = bisect_left(terms, prefix + "\U0010ffff", lo)
+        if hi - lo > PREFIX_TERMS:
+            return heapq.nlargest(PREFIX_TERMS, terms[lo:hi], key=lambda t: len(self.postings[t][0]))
+        return terms[lo:hi]
+
+    def _matches(self, groups):
+        """Ids of the (newest MAX_SCORED) notes matching every group; also whether older notes were left out"""
+        n = len(self.offsets)
+        sizes = [sum(len(self.postings[t][0]) for t in terms) for _, terms in groups]
+        order = sorted(range(len(groups)), key=sizes.__getitem__)
+        # Look at the newest notes first and widen only if too few of them match
+        window = n if sizes[order[0]] <= MAX_SCORED else MAX_SCORED
+        while True:
+            lo = max(0, n - window)
+            matches = None
+            for g in order:
+                postings = [self.postings[term][0] for term in groups[g][1]]
+                if matches is not None and len(matches) * 16 < sizes[g]:
+                    # Few candidates left: look each one up instead of reading long postings
+                    matches = {doc for doc in matches if any(_contains(ids, doc) for ids in postings)}
+                else:
+                    ids = set()
+                    for doc_ids in postings:
+                        ids.update(doc_ids[bisect_left(doc_ids, lo):])
+                    matches = ids if matches is None else matches & ids
+                if not matches:
+                    break
+            if lo == 0 or len(matches) >= MAX_SCORED:
+                break
+            window *= 4
+        if len(matches) > MAX_SCORED:
+            matches = set(heapq.nlargest(MAX_SCORED, matches))
+        return matches, lo > 0
+
+    def search(self, query, limit=20):
+        self.refresh()
+        empty = {"terms": [], "total": 0, "partial": False, "hits": []}
+        groups = []
+        for word, prefix in parse_query(query):
+            terms = self.expand(word) if prefix else [word] if word in self.postings else []
+            if not terms:
+                return empty
+            groups.append((word, terms))
+        if not groups:
+            return empty
+
+        matches, partial = self._matches(groups)
+        if not matches:
+            return empty
+        n = len(self.offsets)
+        low = min(matches)
+        scores = dict.fromkeys(matches, 0.0)
+        for word, terms in groups:
+            for term in terms:
+                ids, counts = self.postings[term]
+                weight = math.log(1 + n / len(ids)) * (1.0 if term == word else PREFIX_WEIGHT)
+                start = bisect_left(ids, low)
+                if len(scores) * 16 < len(ids) - start:
+                    for doc in scores:
+                        i = bisect_left(ids, doc, start)
+                        if i < len(ids) and ids[i] == doc:
+                            scores[doc] += weight * TF_WEIGHT[counts[i]]
+                    continue
+                for doc, count in zip(ids[start:], counts[start:]):
+                    if doc in scores:
+                        scores[doc] += weight * TF_WEIGHT[count]
+        best = heapq.nlargest(max(0, int(limit)), scores.items(), key=lambda item: (item[1], item[0]))
+        return {
+            "terms": sorted({term for _, terms in groups for term in terms}),
+            "total": len(matches),
+            "partial": partial,
+            "hits": [{"id": doc, "score": round(score, 3), "note": note}
+                     for (doc, score), note in zip(best, self.notes(doc for doc, _ in best))],
+        }
+
+    def notes(self, ids):
+        """The records of the given notes, read from the log"""
+        records = []
+        with open(self.path, 'rb') as f:
+            for doc in ids:
+                f.seek(self.offsets[doc])
+                records.append(json.loads(f.readline()))
+        return records
+
+    # --- Persistence ---
+    def save(self):
+        terms = self._sorted_terms()
+        counts = array('I', (len(self.postings[t][0]) for t in terms))
+        blob = "\n".join(terms).encode('utf-8')
+        fingerprint = log_fingerprint(self.path, self.end) or 0
+        tmp = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, 0, len(self.offsets), len(terms), self.end,
+                                fingerprint, 0, len(blob), sum(counts)))
+            f.write(_little_endian(self.offsets))
+            f.write(blob)
+            f.write(_little_endian(counts))
+            for term in terms:
+                f.write(_little_endian(self.postings[term][0]))
+            for term in terms:
+                f.write(self.postings[term][1])
+        os.replace(tmp, self.index_file)
+        self.saved_end = self.end
+        log.debug("Search index saved: %d notes, %d terms", len(self.offsets), len(terms))
+
+    def load(self):
+        """Reads the snapshot; False (index left empty) if it is missing, damaged or for another log"""
+        if sys.byteorder != "little":
+            return False
+        try:
+            with open(self.index_file, 'rb') as f:
+                data = f.read()
+            magic, version, _, _, n, n_terms, end, crc, _, blob_size, total = HEADER.unpack_from(data, 0)
+        except (OSError, struct.error):
+            return False
+        size = HEADER.size + n * 8 + blob_size + n_terms * 4 + total * 5
+        if magic != MAGIC or version != VERSION or len(data) < size or log_fingerprint(self.path, end) != crc:
+            return False
+        pos = HEADER.size
+        offsets = array('Q')
+        offsets.frombytes(data[pos:pos + n * 8])
+        pos += n * 8
+        terms = data[pos:pos + blob_size].decode('utf-8').split("\n") if n_terms else []
+        pos += blob_size
+        counts = array('I')
+        counts.frombytes(data[pos:pos + n_terms * 4])
+        pos += n_terms * 4
+        ids = array('I')
+        ids.frombytes(data[pos:pos + total * 4])
+        pos += total * 4
+        occurrences = bytearray(data[pos:pos + total])
+        postings = {}
+        start = 0
+        for term, count in zip(terms, counts):
+            stop = start + count
+            postings[term] = (ids[start:stop], occurrences[start:stop])
+            start = stop
+        self.postings, self.terms, self.new_terms = postings, terms, []
+        self.offsets, self.end, self.saved_end = offsets, end, end
+        self.fingerprint = crc
+        return True
+
+
+def update_index(path=None):
+    """
+    Keeps the snapshot close to the log; called by the note writer after
+    each save. Rewrites it only when it lags SNAPSHOT_LAG bytes behind.
+    """
+    path = path or notes_path()
+    try:
+        with open(index_path(path), 'rb') as f:
+            end = HEADER.unpack(f.read(HEADER.size))[6]
+    except (OSError, struct.error):
+        end = None
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    if end is not None and 0 <= size - end < SNAPSHOT_LAG:
+        return
+    index = NotesIndex(path)
+    index.refresh()
+    if index.saved_end != index.end:
+        index.save()
@@ -0,0 +1,273 @@
+"""
+Notes log for the Activity Feed: the answers saved by the glass window.
+
+home/user_inputs.jsonl holds one JSON record per line and is only ever
+appended to. Readers keep a cursor (the byte offset just past the last record
+they have) and ask for what came after it:
+
+    notes = NotesLog()
+    batch = notes.get_since(0)                # {"cursor": 1234, "notes": [...], "reset": False}
+    batch = notes.get_since(batch["cursor"])  # only the records added since
+
+NotesLog keeps an offset index (the start offset of every record seen), so a
+cursor is validated with a binary search and the records after it are read
+with one seek; nothing before the cursor is read or parsed again. A cursor
+that isn't a record boundary, or a log that was replaced underneath it, gets
+the whole log back with reset=True.
+
+A line without its trailing newline is a write in progress and is left for
+the next call.
+
+Writers (append_note) are safe across processes: each note is one O_APPEND
+write of one line, made under an advisory lock on <log>.lock (fcntl.flock /
+msvcrt.locking) and fsynced before the lock is released. A line torn by a
+crash is terminated by the next writer, so it can't swallow the next note;
+readers skip it.
+
+The legacy home/user_inputs.json (one JSON array) is imported into the log
+the first time the log is needed (once, under the lock) and is left in
+place. export_json() rewrites it from the log on demand, so it stays
+available as a plain JSON export.
+"""
+import os
+import sys
+import json
+import time
+import logging
+from bisect import bisect_left
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
+
+NOTES_FILENAME = "user_inputs.jsonl"
+LEGACY_FILENAME = "user_inputs.json"
+
+
+def notes_dir():
+    """Writable folder holding the notes: home/ next to the exe when frozen (if present), home/ in the project otherwise"""
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+        possible_home = os.path.join(base_dir, 'home')
+        return possible_home if os.path.exists(possible_home) else base_dir
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'home')
+
+
+def notes_path():
+    return os.path.join(notes_dir(), NOTES_FILENAME)
+
+
+class NotesLock:
+    """Exclusive advisory lock on <log>.lock for the duration of a `with` block (blocks until free)"""
+    def __init__(self, path, timeout=30):
+        self.lock_path = path + ".lock"
+        self.timeout = timeout
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.lock_path, 'a+b')
+        if fcntl:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_EX)
+            return self
+        # msvcrt locks a byte range from the current position: always byte 0
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self.f.seek(0)
+                msvcrt.locking(self.f.fileno(), msvcrt.LK_NBLCK, 1)
+                return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.f.close()
+                    raise
+                time.sleep(0.02)
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+            else:
+                self.f.seek(0)
+                msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.f.close()
+
+
+def _write_synced(path, text):
+    """Writes a whole file atomically: temp file, fsync, rename"""
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _legacy_path(path):
+    return os.path.join(os.path.dirname(path), LEGACY_FILENAME)
+
+
+def _needs_migration(path):
+    return not os.path.exists(path) and os.path.exists(_legacy_path(path))
+
+
+def _migrate_locked(path):
+    """migrate_legacy() body; the caller holds the NotesLock"""
+    if not _needs_migration(path):
+        return 0
+    legacy = _legacy_path(path)
+    try:
+        with open(legacy, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+    except (OSError, ValueError) as e:
+        log.error("Could not read legacy notes %s: %s", legacy, e)
+        return 0
+    if not isinstance(records, list):
+        records = []
+    records.sort(key=lambda r: r.get('timestamp', '') if isinstance(r, dict) else '')
+    _write_synced(path, "".join(json.dumps(record) + "\n" for record in records))
+    log.info("Imported %d notes from %s", len(records), legacy)
+    return len(records)
+
+
+def migrate_legacy(path):
+    """Imports the legacy JSON array next to `path` into a new log (oldest first). Returns the records imported."""
+    if not _needs_migration(path):
+        return 0
+    with NotesLock(path):
+        return _migrate_locked(path)
+
+
+def append_note(record, path=None):
+    """
+    Appends one record to the log: O(1) (nothing existing is read or
+    rewritten), durable once it returns, safe with several writers.
+    """
+    path = path or notes_path()
+    line = (json.dumps(record) + "\n").encode('utf-8')
+    with NotesLock(path):
+        _migrate_locked(path)
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            # A torn last line (crash mid-write) gets its newline first
+            size = os.lseek(fd, 0, os.SEEK_END)
+            if size:
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    line = b"\n" + line
+            # O_APPEND: every write lands at the end, wherever the position is
+            while line:
+                line = line[os.write(fd, line):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def export_json(path=None, out=None):
+    """Writes the log as the legacy JSON array (user_inputs.json by default), atomically. Returns the number of notes."""
+    path = path or notes_path()
+    out = out or _legacy_path(path)
+    records = NotesLog(path).get_since(0)["notes"]
+    _write_synced(out, json.dumps(records, indent=4))
+    return len(records)
+
+
+class NotesLog:
+    def __init__(self, path=None):
+        self.path = path or notes_path()
+        self.offsets = []   # start offset of every indexed record
+        self.end = 0        # offset just past the last indexed record
+        self.identity = None
+
+    def __len__(self):
+        self.refresh()
+        return len(self.offsets)
+
+    def refresh(self):
+        """Indexes records appended since the last call (re-indexes a replaced log)"""
+        migrate_legacy(self.path)
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.offsets, self.end, self.identity = [], 0, None
+            return
+        identity = (st.st_dev, st.st_ino)
+        if identity != self.identity or st.st_size < self.end:
+            self.offsets, self.end, self.identity = [], 0, identity
+        if st.st_size == self.end:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.end)
+            data = f.read(st.st_size - self.end)
+        pos = 0
+        while True:
+            nl = data.find(b"\n", pos)
+            if nl < 0:
+                break
+            if nl > pos:
+                self.offsets.append(self.end + pos)
+            pos = nl + 1
+        self.end += pos
+
+    def is_boundary(self, cursor):
+        if cursor == self.end:
+            return True
+        i = bisect_left(self.offsets, cursor)
+        return i < len(self.offsets) and self.offsets[i] == cursor
+
+    def read(self, start, stop):
+        """Records stored between two record boundaries"""
+        if stop <= start:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(stop - start)
+        records = []
+        offset = start  # Of each line, as refresh() indexes them
+        for line in data.split(b"\n"):
+            line_start = offset
+            offset += len(line) + 1
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                log.warning("Skipping unreadable note at offset %d", line_start)
+        return records
+
+    def get_since(self, cursor=0, limit=None):
+        """
+        Records after `cursor` as {"cursor", "notes", "reset"}. With `limit`,
+        at most that many (the returned cursor then points at the next one).
+        """
+        self.refresh()
+        try:
+            cursor = int(cursor or 0)
+        except (TypeError, ValueError):
+            cursor = -1
+        reset = not self.is_boundary(cursor)
+        start = 0 if reset else cursor
+        stop = self.end
+        if limit is not None:
+            i = bisect_left(self.offsets, start) + max(0, int(limit))
+            if i < len(self.offsets):
+                stop = self.offsets[i]
+        return {"cursor": stop, "notes": self.read(start, stop), "reset": reset}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Activity Feed notes log")
+    parser.add_argument("--export", nargs="?", const="", metavar="FILE",
+                        help="Write the notes as a JSON array (default: user_inputs.json next to the log)")
+    args = parser.parse_args()
+    if args.export is not None:
+        count = export_json(out=args.export or None)
+        print(f"Exported {count} notes")
+    else:
+        parser.print_help()
@@ -0,0 +1,195 @@
+"""
+Single-threaded scheduler for the collector's periodic jobs.
+
+Replaces the one-thread-per-loop design (monitor / saver / github threads that
+each sleep in a loop). One thread sleeps until the earliest deadline and runs
+whatever is due:
+
+- Drift-free: a job's next deadline is its previous deadline + interval, not
+  "now + interval", so a slow tick doesn't push every later tick back. If a job
+  falls more than one interval behind, the missed runs are skipped (counted in
+  METRICS as scheduler.missed.<job>) instead of being run back-to-back.
+- Jobs can be added, removed or re-timed at runtime (e.g. on settings change).
+- stop() wakes the thread immediately, so shutdown doesn't wait for a sleep.
+- threaded=True jobs (network calls) are handed to a short-lived worker thread
+  so they can't delay the other jobs. A job never overlaps with itself.
+
+Without start(), nothing runs on its own: call run_due() to drive the jobs
+manually (the simulator does this with a simulated clock). Threaded jobs then
+run inline.
+"""
+import time
+import heapq
+import logging
+import threading
+
+from metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, name, func, interval, next_run, threaded, order):
+        self.name = name
+        self.func = func
+        self.interval = interval      # None = one-shot
+        self.next_run = next_run
+        self.threaded = threaded
+        self.order = order            # tie-breaker for equal deadlines (registration order)
+        self.version = 0              # bumped on reschedule/cancel; stale heap entries are skipped
+        self.cancelled = False
+        self.running = False
+        self.runs = 0
+
+
+class Scheduler:
+    def __init__(self, clock=time.monotonic, name="scheduler"):
+        self.clock = clock
+        self.name = name
+        self.cond = threading.Condition()
+        self.jobs = {}
+        self.heap = []
+        self.order = 0
+        self.thread = None
+        self.running = False
+        self.wakeups = 0
+
+    # --- Job management ---
+    def _push(self, job):
+        heapq.heappush(self.heap, (job.next_run, job.order, job.version, job))
+
+    def add(self, name, func, interval=None, delay=0.0, threaded=False):
+        """Registers func to run after `delay` seconds, then every `interval` seconds (None = once)"""
+        with self.cond:
+            old = self.jobs.get(name)
+            if old:
+                old.cancelled = True
+                old.version += 1
+            self.order += 1
+            job = Job(name, func, interval, self.clock() + delay, threaded, self.order)
+            self.jobs[name] = job
+            self._push(job)
+            self.cond.notify()
+            return job
+
+    def remove(self, name):
+        with self.cond:
+            job = self.jobs.pop(name, None)
+            if job:
+                job.cancelled = True
+                job.version += 1
+                self.cond.notify()
+            return job is not None
+
+    def reschedule(self, name, interval, delay=None):
+        """Changes a job's interval. The next run is `delay` from now (default: one new interval)"""
+        with self.cond:
+            job = self.jobs.get(name)
+            if not job:
+                return False
+            job.interval = interval
+            job.next_run = self.clock() + (interval if delay is None else delay)
+            job.version += 1
+            self._push(job)
+            self.cond.notify()
+            return True
+
+    def has_job(self, name):
+        return name in self.jobs
+
+    # --- Execution ---
+    def _pop_due(self, now):
+        """Pops the next due job (or None). Caller holds the lock."""
+        while self.heap:
+            next_run, _, version, job = self.heap[0]
+            if job.cancelled or version != job.version:
+                heapq.heappop(self.heap)
+                continue
+            if next_run > now:
+                return None
+            heapq.heappop(self.heap)
+            if job.interval is None:
+                job.cancelled = True
+                self.jobs.pop(job.name, None)
+            else:
+                # Drift-free: advance from the deadline, skipping whole missed intervals
+                job.next_run += job.interval
+                if job.next_run <= now:
+                    missed = int((now - job.next_run) // job.interval) + 1
+                    job.next_run += missed * job.interval
+                    METRICS.inc(f"scheduler.missed.{job.name}", missed)
+                self._push(job)
+            return job
+        return None
+
+    def _run(self, job, inline):
+        if job.running:
+            # Previous run (threaded) still going; don't overlap
+            METRICS.inc(f"scheduler.skipped.{job.name}")
+            return
+        if job.threaded and not inline:
+            job.running = True
+            threading.Thread(target=self._call, args=(job,), name=f"job-{job.name}", daemon=True).start()
+        else:
+            job.running = True
+            self._call(job)
+
+    def _call(self, job):
+        try:
+            job.func()
+        except Exception:
+            log.exception("Scheduled job %s failed", job.name)
+        finally:
+            job.runs += 1
+            job.running = False
+
+    def run_due(self, now=None):
+        """Runs every job that is due at `now` (default: the clock). Returns how many ran."""
+        now = self.clock() if now is None else now
+        inline = not self.running
+        count = 0
+        while True:
+            with self.cond:
+                job = self._pop_due(now)
+            if job is None:
+                return count
+            self._run(job, inline)
+            count += 1
+
+    def _seconds_until_next(self):
+        while self.heap:
+            next_run, _, version, job = self.heap[0]
+            if job.cancelled or version != job.version:
+                heapq.heappop(self.heap)
+                continue
+            return max(0.0, next_run - self.clock())
+        return None
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                if not self.running:
+                    return
+                timeout = self._seconds_until_next()
+                if timeout is None or timeout > 0:
+                    self.cond.wait(timeout)
+                if not self.running:
+                    return
+                self.wakeups += 1
+            self.run_due()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stops the loop promptly. A job that is mid-run is allowed to finish (up to `timeout`)."""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
@@ -0,0 +1,278 @@
+"""
+Settings service: typed/validated settings, a stable writable location, and a
+file watcher so the running collector picks up changes without a restart.
+
+- settings_path(): next to the exe when frozen (sys._MEIPASS is a temp dir that
+  is wiped on exit), the project root otherwise. A frozen build seeds it from
+  the bundled copy on first run.
+- Settings.from_dict(): validates and converts types, raises SettingsError.
+- save_settings(): validates, then writes atomically (temp file + rename) so
+  the watcher never reads half a file.
+- SettingsWatcher: inotify on Linux (a thread blocked in select, zero wakeups
+  while nothing changes), otherwise an mtime/size poll job on the collector's
+  scheduler.
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import select
+import struct
+import ctypes
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+SETTINGS_FILENAME = 'settings.json'
+POLL_INTERVAL_SEC = 2
+
+
+class SettingsError(ValueError):
+    pass
+
+
+def settings_path():
+    """Stable, writable settings.json location"""
+    if getattr(sys, 'frozen', False):
+        path = os.path.join(os.path.dirname(sys.executable), SETTINGS_FILENAME)
+        bundled = os.path.join(sys._MEIPASS, SETTINGS_FILENAME)
+        if not os.path.exists(path) and os.path.exists(bundled):
+            try:
+                shutil.copyfile(bundled, path)
+            except OSError:
+                pass
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), SETTINGS_FILENAME)
+
+
+class Settings:
+    # name: (type, default, minimum)
+    FIELDS = {
+        "github_username": (str, "Addressmehari", None),
+        "git_post_threshold": (int, 10, 1),
+        "threshold_house": (int, 300, 1),
+        "threshold_tree": (int, 300, 1),
+        "threshold_upgrade": (int, 1000, 1),
+        "save_interval_sec": (int, 60, 5),
+        "github_poll_sec": (int, 180, 60),
+        "layout_mode": (str, "stable", None),
+        "ambient_fps": (int, 10, 0),
+    }
+    CHOICES = {
+        "layout_mode": ("stable", "compact"),
+    }
+    USERNAME_RE = re.compile(r'^[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})$')
+
+    def __init__(self, **values):
+        for name, (_, default, _) in self.FIELDS.items():
+            setattr(self, name, values.get(name, default))
+        # Keys we don't own (log_level, log_levels...) are kept as-is
+        self.extra = {k: v for k, v in values.items() if k not in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, raw):
+        """Validated Settings from a raw dict; missing keys get defaults"""
+        if not isinstance(raw, dict):
+            raise SettingsError("Settings must be a JSON object")
+        values = dict(raw)
+        errors = []
+        for name, (typ, default, minimum) in cls.FIELDS.items():
+            if name not in raw:
+                values[name] = default
+                continue
+            try:
+                value = typ(raw[name])
+                if typ is str:
+                    value = value.strip()
+            except (TypeError, ValueError):
+                errors.append(f"{name}: expected {typ.__name__}, got {raw[name]!r}")
+                continue
+            if minimum is not None and value < minimum:
+                errors.append(f"{name}: must be at least {minimum}")
+                continue
+            values[name] = value
+        for name, choices in cls.CHOICES.items():
+            if values.get(name) not in choices:
+                errors.append(f"{name}: must be one of {', '.join(choices)}")
+        username = values.get("github_username", "")
+        if isinstance(username, str) and not cls.USERNAME_RE.match(username):
+            errors.append(f"github_username: {username!r} is not a valid GitHub username")
+        if errors:
+            raise SettingsError("; ".join(errors))
+        return cls(**values)
+
+    def to_dict(self):
+        data = dict(self.extra)
+        for name in self.FIELDS:
+            data[name] = getattr(self, name)
+        return data
+
+    def __eq__(self, other):
+        return isinstance(other, Settings) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Settings({self.to_dict()})"
+
+
+def load_settings(path=None):
+    """Settings from disk. Falls back to defaults if the file is missing or invalid."""
+    path = path or settings_path()
+    if not os.path.exists(path):
+        return Settings()
+    try:
+        with open(path, 'r') as f:
+            return Settings.from_dict(json.load(f))
+    except (SettingsError, ValueError, OSError) as e:
+        log.warning("Invalid settings file %s (%s), using defaults", path, e)
+        return Settings()
+
+
+def save_settings(raw, path=None):
+    """Validates `raw` and writes it atomically. Unknown keys already in the file are preserved."""
+    path = path or settings_path()
+    existing = {}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                existing = json.load(f)
+        except (ValueError, OSError):
+            existing = {}
+    merged = dict(existing) if isinstance(existing, dict) else {}
+    merged.update(raw)
+    settings = Settings.from_dict(merged)
+
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(settings.to_dict(), f, indent=4)
+    os.replace(tmp, path)
+    return settings
+
+# -------------------------------------------------------------------------
+# File Watching
+# -------------------------------------------------------------------------
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class SettingsWatcher:
+    """
+    Calls on_change(settings) when settings.json changes to a new, valid value.
+    Reloads are funneled through the scheduler (as a one-shot "settings_reload"
+    job), so bursts of write events collapse into one reload and the callback
+    runs on the scheduler thread, like every other collector job.
+    """
+    def __init__(self, path, scheduler, on_change, current=None):
+        self.path = os.path.abspath(path)
+        self.scheduler = scheduler
+        self.on_change = on_change
+        self.current = current or load_settings(self.path)
+        self.backend = None
+        self.thread = None
+        self.stop_pipe = None
+        self.last_stat = self._stat()
+
+    def start(self, use_inotify=True):
+        libc = _load_libc() if use_inotify else None
+        fd = -1
+        if libc:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                # Watch the directory: atomic saves replace the file (new inode)
+                mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+                if libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), mask) < 0:
+                    os.close(fd)
+                    fd = -1
+        if fd >= 0:
+            self.backend = "inotify"
+            self.stop_pipe = os.pipe()
+            self.thread = threading.Thread(target=self._inotify_loop, args=(fd,), name="settings-watcher", daemon=True)
+            self.thread.start()
+        else:
+            self.backend = "poll"
+            self.scheduler.add("settings_poll", self._poll, interval=POLL_INTERVAL_SEC, delay=POLL_INTERVAL_SEC)
+        log.info("Watching %s (%s)", self.path, self.backend)
+
+    def stop(self):
+        if self.backend == "poll":
+            self.scheduler.remove("settings_poll")
+        elif self.stop_pipe:
+            os.write(self.stop_pipe[1], b'x')
+            if self.thread:
+                self.thread.join(timeout=1)
+        self.backend = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _poll(self):
+        stat = self._stat()
+        if stat != self.last_stat:
+            self.last_stat = stat
+            self.reload()
+
+    def _inotify_loop(self, fd):
+        name = os.path.basename(self.path).encode()
+        wake_r = self.stop_pipe[0]
+        try:
+            while True:
+                ready, _, _ = select.select([fd, wake_r], [], [])
+                if wake_r in ready:
+                    return
+                try:
+                    buf = os.read(fd, 4096)
+                except BlockingIOError:
+                    continue
+                offset = 0
+                touched = False
+                while offset + INOTIFY_EVENT.size <= len(buf):
+                    _, _, _, length = INOTIFY_EVENT.unpack_from(buf, offset)
+                    start = offset + INOTIFY_EVENT.size
+                    if buf[start:start + length].rstrip(b'\0') == name:
+                        touched = True
+                    offset = start + length
+                if touched:
+                    # Debounce: editors emit several events per save
+                    self.scheduler.add("settings_reload", self.reload, delay=0.2)
+        finally:
+            os.close(fd)
+            for p in self.stop_pipe:
+                os.close(p)
+            self.stop_pipe = None
+
+    def reload(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                new = Settings.from_dict(json.load(f))
+        except (SettingsError, ValueError, OSError) as e:
+            log.warning("Ignoring settings change: %s", e)
+            return
+        if new == self.current:
+            return
+        old, self.current = self.current, new
+        log.info("Settings changed, applying")
+        self.on_change(new, old)
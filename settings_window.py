@@ -3,21 +3,23 @@ import sys
 from tkinter import ttk, messagebox
 import json
 import os
+import logging
+
+from settings_service import settings_path, load_settings, save_settings, SettingsError
+import map_store
+
+log = logging.getLogger(__name__)
 
 class SettingsWindow(tk.Tk):
     def __init__(self):
         super().__init__()
         
         self.title("Stats Tracker Settings")
-        self.geometry("400x450")
+        self.geometry("400x530")
         self.configure(bg="#1e1e24")
         
-        # Paths
-        if getattr(sys, 'frozen', False):
-            base_path = sys._MEIPASS
-        else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
-        self.settings_file = os.path.join(base_path, 'settings.json')
+        # Paths (stable and writable, also in frozen builds)
+        self.settings_file = settings_path()
         
         # Load Data
         self.data = self.load_data()
@@ -44,6 +46,10 @@ class SettingsWindow(tk.Tk):
         self.create_field(container, "Active Seconds (House)", "threshold_house")
         self.create_field(container, "Idle Seconds (Tree)", "threshold_tree")
         self.create_field(container, "Key Presses (Upgrade)", "threshold_upgrade")
+        tk.Label(container, text="--- Intervals ---", bg="#1e1e24", fg="#666").pack(pady=10)
+        self.create_field(container, "Save Every (sec)", "save_interval_sec")
+        self.create_field(container, "Github Poll (sec)", "github_poll_sec")
+        self.create_field(container, "Idle Animation FPS", "ambient_fps")
         
         # Save Button
         btn_frame = tk.Frame(self, bg="#1e1e24")
@@ -60,20 +66,7 @@ class SettingsWindow(tk.Tk):
         reset_btn.pack(side='right', expand=True, padx=10, ipadx=10, ipady=5)
         
     def load_data(self):
-        defaults = {
-            "github_username": "Addressmehari",
-            "git_post_threshold": 10,
-            "threshold_house": 300,
-            "threshold_tree": 300,
-            "threshold_upgrade": 1000
-        }
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return defaults
-        return defaults
+        return load_settings(self.settings_file).to_dict()
 
     def create_field(self, parent, label_text, key):
         frame = tk.Frame(parent, bg="#1e1e24")
@@ -105,7 +98,7 @@ class SettingsWindow(tk.Tk):
             else:
                 base_dir = os.path.dirname(os.path.abspath(__file__))
             v_dir = os.path.join(base_dir, 'visualizer')
-            d_dir = os.path.join(base_dir, 'datas')
+            d_dir = map_store.data_dir()  # Where the collector writes, not the bundle
             
             # Reset Files
             files = {
@@ -124,31 +117,48 @@ class SettingsWindow(tk.Tk):
                 os.makedirs(os.path.dirname(path), exist_ok=True)
                 with open(path, 'w') as f:
                     json.dump(content, f, indent=4)
+
+            # Derived from the city; rebuilt on the next layout change.
+            # The history goes too, or the time-lapse replays the erased city.
+            for path in (os.path.join(v_dir, 'occupancy.bin'), map_store.history_path()):
+                if os.path.exists(path):
+                    os.remove(path)
+
+            # An open map reloads on a newer "reload" change. A running collector
+            # numbers its next change after this one (record_change re-reads the
+            # seq) and starts the history over from its next save (HistoryLog
+            # replays the file again when it isn't the size it left it at).
+            changes = os.path.join(v_dir, 'city_changes.json')
+            try:
+                with open(changes, 'r') as f:
+                    seq = int(json.load(f).get("seq", 0)) + 1
+            except (OSError, ValueError, TypeError, AttributeError):
+                seq = 1
+            with open(changes, 'w') as f:
+                json.dump({"seq": seq, "changes": [{"seq": seq, "reload": True}]}, f)
                     
             messagebox.showinfo("Reset Complete", "All data has been erased.\n\nPlease EXT and RESTART the tracker app from the system tray for changes to take absolute effect.")
             
         except Exception as e:
+            log.error("Failed to reset data: %s", e)
             messagebox.showerror("Error", f"Failed to reset data: {e}")
 
     def save_settings(self):
-        new_data = {}
         try:
-            new_data["github_username"] = self.vars["github_username"].get().strip()
-            new_data["git_post_threshold"] = int(self.vars["git_post_threshold"].get())
-            new_data["threshold_house"] = int(self.vars["threshold_house"].get())
-            new_data["threshold_tree"] = int(self.vars["threshold_tree"].get())
-            new_data["threshold_upgrade"] = int(self.vars["threshold_upgrade"].get())
-            
-            with open(self.settings_file, 'w') as f:
-                json.dump(new_data, f, indent=4)
+            new_data = {key: var.get() for key, var in self.vars.items()}
+            # Validates and writes atomically; the running tracker picks it up live
+            save_settings(new_data, self.settings_file)
                 
-            messagebox.showinfo("Success", "Settings saved!\nPlease restart the tracker for changes to take effect.")
+            messagebox.showinfo("Success", "Settings saved!\nChanges are applied to the running tracker automatically.")
             self.destroy()
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid numbers for thresholds.")
+        except SettingsError as e:
+            messagebox.showerror("Error", f"Invalid settings:\n{e}")
         except Exception as e:
+            log.error("Failed to save settings: %s", e)
             messagebox.showerror("Error", str(e))
 
 if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging("settings")
     app = SettingsWindow()
     app.mainloop()
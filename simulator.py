@@ -0,0 +1,359 @@
+"""
+Headless simulation driver for the DataCollector.
+
+Replays an activity trace (keys / clicks / idle gaps / commits) through a
+headless collector at accelerated speed. The real clock, the Windows idle API
+and the GitHub scraper are swapped for fakes, and the city files are written
+into a throwaway working directory so the real city is never touched.
+
+Trace format (JSON lines, or a JSON array), sorted by "t" (seconds from start):
+    {"t": 32400, "type": "key", "n": 3}
+    {"t": 32401, "type": "click", "n": 1}
+    {"t": 40000, "type": "commit", "n": 2}
+    {"t": 43200, "type": "idle", "n": 3600}
+
+Idle time is simply the gap between input events (exactly like the OS idle
+timer). Explicit "idle" records are accepted for readability and only mark
+the gap.
+
+Usage:
+    python simulator.py --days 7
+    python simulator.py --days 30 --speed 0 --out sim_report.json
+    python simulator.py --trace recorded.jsonl --speed 1000
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import logging
+import contextlib
+from datetime import datetime, timedelta
+
+from data_collector import DataCollector
+from metrics import METRICS
+from scheduler import Scheduler
+
+SECONDS_PER_DAY = 86400
+
+@contextlib.contextmanager
+def quiet_logs():
+    """Mutes the collector's INFO chatter (rewards, saves) while replaying"""
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+# -------------------------------------------------------------------------
+# Fakes
+# -------------------------------------------------------------------------
+class SimClock:
+    """Simulated wall clock. t is seconds since the start of the simulation."""
+    def __init__(self, start=None):
+        self.start = start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.t = 0
+
+    def now(self):
+        return self.start + timedelta(seconds=self.t)
+
+    def advance(self, seconds=1):
+        self.t += seconds
+
+
+class FakeIdle:
+    """Stands in for get_idle_duration(): seconds since the last replayed input"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.last_input = None
+
+    def touch(self):
+        self.last_input = self.clock.t
+
+    def __call__(self):
+        if self.last_input is None:
+            return float(self.clock.t + SECONDS_PER_DAY)
+        return float(self.clock.t - self.last_input)
+
+
+class FakeGithub:
+    """Stands in for get_github_contributions(): a running commit total"""
+    def __init__(self, total=0):
+        self.total = total
+        self.calls = 0
+
+    def __call__(self, username):
+        self.calls += 1
+        return self.total
+
+# -------------------------------------------------------------------------
+# Traces
+# -------------------------------------------------------------------------
+def synthetic_trace(days, seed=None):
+    """
+    Yields a plausible workday pattern: morning + afternoon + evening sessions
+    with short breaks, a keystroke burst every active second and a handful of
+    commits per day.
+    """
+    rng = random.Random(seed)
+    sessions = [(9.0, 12.0), (13.0, 17.5), (20.0, 21.0)]
+
+    for day in range(days):
+        day_start = day * SECONDS_PER_DAY
+        events = []
+
+        for start_h, end_h in sessions:
+            # Jitter session bounds by up to 20 minutes
+            s = int(start_h * 3600) + rng.randint(-1200, 1200)
+            e = int(end_h * 3600) + rng.randint(-1200, 1200)
+            t = s
+            while t < e:
+                # Occasional coffee break (5-15 min)
+                if rng.random() < 0.0005:
+                    t += rng.randint(300, 900)
+                    continue
+                events.append({"t": day_start + t, "type": "key", "n": rng.randint(1, 5)})
+                if rng.random() < 0.1:
+                    events.append({"t": day_start + t, "type": "click", "n": 1})
+                t += 1
+
+        for _ in range(rng.randint(2, 15)):
+            start_h, end_h = rng.choice(sessions)
+            t = rng.randint(int(start_h * 3600), int(end_h * 3600))
+            events.append({"t": day_start + t, "type": "commit", "n": 1})
+
+        events.sort(key=lambda ev: ev["t"])
+        for ev in events:
+            yield ev
+
+
+def load_trace(path):
+    """Yields events from a recorded trace (JSON lines or a JSON array)"""
+    with open(path, 'r') as f:
+        head = f.read(1)
+        f.seek(0)
+        if head == '[':
+            for ev in json.load(f):
+                yield ev
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def dump_trace(events, path):
+    with open(path, 'w') as f:
+        for ev in events:
+            f.write(json.dumps(ev) + "\n")
+
+# -------------------------------------------------------------------------
+# Driver
+# -------------------------------------------------------------------------
+def count_city(houses_path):
+    """Per-kind entity counts of the current city snapshot"""
+    try:
+        with open(houses_path, 'r') as f:
+            houses = json.load(f)
+    except Exception:
+        return {"total": 0, "houses": 0, "trees": 0, "git_posts": 0, "terraces": 0}
+    trees = sum(1 for h in houses if h.get('obstacle') == 'tree')
+    git_posts = sum(1 for h in houses if h.get('type') == 'git_post')
+    terraces = sum(1 for h in houses if h.get('has_terrace') and h.get('type') != 'git_post')
+    return {
+        "total": len(houses),
+        "houses": len(houses) - trees - git_posts,
+        "trees": trees,
+        "git_posts": git_posts,
+        "terraces": terraces
+    }
+
+
+def setup_workdir(workdir, username, settings=None):
+    """Creates an isolated city (owner only) and settings file for the run"""
+    os.makedirs(os.path.join(workdir, "visualizer"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "datas"), exist_ok=True)
+
+    with open(os.path.join(workdir, "visualizer", "stargazers_houses.json"), 'w') as f:
+        json.dump([{"type": "owner", "login": username}], f)
+    with open(os.path.join(workdir, "visualizer", "world.json"), 'w') as f:
+        json.dump({"weather": "none", "timeOfDay": "day"}, f)
+    if settings:
+        with open(os.path.join(workdir, "settings.json"), 'w') as f:
+            json.dump(settings, f)
+
+
+def run_simulation(trace, days=None, speed=1000, workdir=None, settings=None,
+                   sample_every=3600, username="SimUser", verbose=False):
+    """
+    Replays `trace` through a headless DataCollector.
+
+    days:   simulated duration. If None, runs until the trace is exhausted.
+    speed:  simulated seconds per real second (1000 = 1000x). 0 = unthrottled.
+    Returns a report dict with throughput and the city growth curve.
+    """
+    own_workdir = workdir is None
+    if own_workdir:
+        workdir = tempfile.mkdtemp(prefix="bitville_sim_")
+    setup_workdir(workdir, username, settings)
+
+    clock = SimClock()
+    idle = FakeIdle(clock)
+    github = FakeGithub()
+    notifications = []
+
+    mute = contextlib.nullcontext if verbose else quiet_logs
+    with mute():
+        collector = DataCollector(
+            filename=os.path.join(workdir, "datas", "activity_log.json"),
+            on_reward=lambda title, msg: notifications.append(title),
+            base_path=workdir,
+            clock=clock.now,
+            idle_source=idle,
+            github_source=github,
+            headless=True,
+            # Jobs are due in simulated seconds
+            scheduler=Scheduler(clock=lambda: clock.t)
+        )
+        seed = [{"type": "owner", "login": username}]
+        collector.recalculate_and_save(seed, collector.houses_path, collector.roads_path)
+        collector.ensure_next_upgrade_target()
+        # Startup jobs (github_init + first poll)
+        collector.scheduler.run_due()
+
+    end_t = days * SECONDS_PER_DAY if days else None
+    events = iter(trace)
+    pending = next(events, None)
+
+    growth = []
+    wall_start = time.perf_counter()
+
+    with mute():
+        while True:
+            t = clock.t
+            if end_t is not None and t >= end_t:
+                break
+            if end_t is None and pending is None and t % collector.save_interval_sec == 0:
+                # Trace exhausted and the last minute has been flushed
+                break
+
+            # 1. Feed this second's input events
+            while pending is not None and pending["t"] <= t:
+                kind = pending.get("type")
+                n = int(pending.get("n", 1))
+                if kind == "key":
+                    collector.key_presses += n
+                    idle.touch()
+                elif kind == "click":
+                    collector.mouse_clicks += n
+                    idle.touch()
+                elif kind == "commit":
+                    github.total += n
+                pending = next(events, None)
+
+            # 2. Run whatever the collector's scheduler has due this second
+            clock.advance(1)
+            collector.scheduler.run_due()
+
+            if clock.t % sample_every == 0:
+                point = count_city(collector.houses_path)
+                point["t_hours"] = clock.t / 3600.0
+                growth.append(point)
+
+            # 3. Pace to the requested speed
+            if speed:
+                ahead = clock.t / float(speed) - (time.perf_counter() - wall_start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    wall = time.perf_counter() - wall_start
+    sim_days = clock.t / float(SECONDS_PER_DAY)
+    final = count_city(collector.houses_path)
+
+    report = {
+        "simulated_seconds": clock.t,
+        "simulated_days": sim_days,
+        "wall_seconds": wall,
+        "sim_days_per_sec": sim_days / wall if wall > 0 else 0.0,
+        "effective_speed": clock.t / wall if wall > 0 else 0.0,
+        "requested_speed": speed,
+        "notifications": len(notifications),
+        "github_polls": github.calls,
+        "final_city": final,
+        "growth": growth,
+        "metrics": METRICS.snapshot(),
+        "workdir": None if own_workdir else workdir
+    }
+
+    if own_workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_report(report):
+    print("--- Simulation Report ---")
+    print(f"Simulated: {report['simulated_days']:.2f} days in {report['wall_seconds']:.2f}s wall")
+    print(f"Throughput: {report['sim_days_per_sec']:.4f} sim days/s ({report['effective_speed']:.0f}x real time, requested {report['requested_speed'] or 'max'})")
+    print(f"Notifications: {report['notifications']} | Github polls: {report['github_polls']}")
+    final = report['final_city']
+    print(f"Final City: {final['total']} entities ({final['houses']} houses, {final['trees']} trees, {final['git_posts']} git posts, {final['terraces']} terraces)")
+
+    growth = report['growth']
+    if growth:
+        print(f"{'Hour':>8} | {'Total':>7} | {'Houses':>7} | {'Trees':>7} | {'Git':>5} | {'Terr.':>5}")
+        print("-" * 54)
+        # Keep the printed curve short; the full curve is in the JSON report
+        step = max(1, len(growth) // 24)
+        for p in growth[::step]:
+            print(f"{p['t_hours']:>8.0f} | {p['total']:>7} | {p['houses']:>7} | {p['trees']:>7} | {p['git_posts']:>5} | {p['terraces']:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless BitVille collector simulation")
+    parser.add_argument("--days", type=float, default=None, help="Simulated days (default: 1 for synthetic traces, full trace otherwise)")
+    parser.add_argument("--speed", type=float, default=1000, help="Simulated seconds per real second, 0 = as fast as possible")
+    parser.add_argument("--trace", help="Recorded trace (JSON lines or JSON array)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the synthetic trace")
+    parser.add_argument("--dump-trace", help="Write the synthetic trace to this file and exit")
+    parser.add_argument("--workdir", help="Keep the simulated city in this directory")
+    parser.add_argument("--sample", type=int, default=3600, help="Growth curve sampling interval (sim seconds)")
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="Show collector output")
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.trace:
+        trace = load_trace(args.trace)
+        days = args.days
+    else:
+        days = args.days or 1
+        trace = synthetic_trace(int(-(-days // 1)), seed=args.seed)
+
+    if args.dump_trace:
+        dump_trace(trace, args.dump_trace)
+        print(f"Trace written to {args.dump_trace}")
+        return
+
+    report = run_simulation(
+        trace,
+        days=days,
+        speed=args.speed,
+        workdir=args.workdir,
+        sample_every=args.sample,
+        verbose=args.verbose
+    )
+    print_report(report)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import threading
 import sys
 import os
 import subprocess
+import logging
+from datetime import datetime
 
 import ctypes
 
@@ -15,6 +17,11 @@ except Exception:
     pass
 
 from data_collector import DataCollector
+from metrics import METRICS
+from log_setup import setup_logging, load_log_levels
+from settings_service import settings_path
+
+log = logging.getLogger(__name__)
 
 def create_image():
     # Create high-res image for anti-aliasing
@@ -104,11 +111,10 @@ class SystemTrayTracker:
              self.icon.notify(msg, title)
 
     def on_quit(self, icon, item):
-        print("Stopping collector...")
-        self.collector.save_data()
+        log.info("Stopping collector...")
+        # Stops the scheduler promptly and flushes the pending stats
         self.collector.stop()
         icon.stop()
-        os._exit(0) # Force exit to kill threads
 
     def open_map(self):
         # Open visualizer_app
@@ -142,6 +148,19 @@ class SystemTrayTracker:
             script_path = os.path.join(os.getcwd(), 'home', 'glass_window.py')
             subprocess.Popen([sys.executable, script_path])
 
+    def dump_diagnostics(self):
+        # Snapshot of loop timings, I/O counters and (if running) profiler samples
+        name = f"diagnostics-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        path = self.collector.write_metrics(os.path.join(os.path.dirname(os.path.abspath(self.collector.filename)), name))
+        if path and self.icon:
+            self.icon.notify(f"Snapshot saved to {path}", "Diagnostics")
+
+    def toggle_profiler(self):
+        running = METRICS.toggle_profiler()
+        if not running:
+            # Stopping the profiler dumps what it collected
+            self.dump_diagnostics()
+
     def run(self):
         # Create the icon
         image = create_image()
@@ -152,7 +171,11 @@ class SystemTrayTracker:
             pystray.MenuItem("Settings", self.open_settings),
             pystray.MenuItem("Open Input", self.open_glass),
             pystray.Menu.SEPARATOR,
-            pystray.MenuItem("Save Now", lambda: self.collector.save_data()),
+            pystray.MenuItem("Save Now", lambda: self.collector.save_now()),
+            pystray.MenuItem("Diagnostics", pystray.Menu(
+                pystray.MenuItem("Dump Snapshot", self.dump_diagnostics),
+                pystray.MenuItem("Sampling Profiler", self.toggle_profiler, checked=lambda item: METRICS.profiler_running())
+            )),
             pystray.MenuItem("Exit", self.on_quit)
         )
         
@@ -165,6 +188,11 @@ class SystemTrayTracker:
         self.icon.run()
 
 if __name__ == "__main__":
+    # One log file per process role: tray.log, visualizer.log, stats.log...
+    role = sys.argv[1].lstrip('-') if len(sys.argv) > 1 else "tray"
+    level, module_levels = load_log_levels(settings_path())
+    setup_logging(role, level, module_levels)
+
     if len(sys.argv) > 1:
         if sys.argv[1] == '--visualizer':
             import visualizer_app
@@ -0,0 +1,26 @@
+"""
+Deterministic randomness for city generation.
+
+Every random choice the city makes (entity order, names, terraces, upgrade
+targets) draws from a random.Random seeded by the username plus the index of
+the event it belongs to, never from the global `random` state. The same
+activity history therefore always builds the same city, and a generated
+layout can be cached under a key derived from its inputs.
+
+    rng = city_rng("octocat", 41, "house_name")   # 41st entity's name
+
+`purpose` keeps independent choices for the same event (a house's name and
+the next upgrade target, say) from sharing one stream.
+"""
+import hashlib
+import random
+
+
+def derive_seed(username, index, purpose="city"):
+    """64-bit seed for (username, index, purpose); stable across runs and Python versions"""
+    key = f"{purpose}\x00{username}\x00{index}".encode("utf-8")
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big")
+
+
+def city_rng(username, index, purpose="city"):
+    return random.Random(derive_seed(username, index, purpose))
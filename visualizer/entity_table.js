@@ -0,0 +1,107 @@
+// Binary entity table (see entity_table.py): typed columns instead of JSON
+// text. Numeric columns are viewed in place over the buffer (no copy);
+// string columns keep one decoded string per distinct value.
+class EntityTable {
+    static KIND = { BOOL: 1, INT32: 2, FLOAT64: 3, STRING: 4, JSON: 5 };
+    static HEADER_SIZE = 16;
+
+    constructor(rows, columns) {
+        this.rows = rows;
+        this.columns = columns; // [{ name, kind, present (Uint8Array bitmap or null), values }]
+    }
+
+    static fromBuffer(buffer) {
+        const view = new DataView(buffer);
+        const bytes = new Uint8Array(buffer);
+        const magic = String.fromCharCode(...bytes.subarray(0, 4));
+        if (magic !== 'BVET' || view.getUint8(4) !== 1) throw new Error('Unknown entity table format');
+        const ncols = view.getUint16(6, true);
+        const rows = view.getUint32(8, true);
+        const pad = n => n + (-n & 7);
+        const utf8 = new TextDecoder();
+        const K = EntityTable.KIND;
+
+        const columns = [];
+        let pos = EntityTable.HEADER_SIZE;
+        for (let c = 0; c < ncols; c++) {
+            const kind = view.getUint8(pos);
+            const flags = view.getUint8(pos + 1);
+            const nameLen = view.getUint16(pos + 2, true);
+            const bodyLen = view.getUint32(pos + 4, true);
+            pos += 8;
+            const name = utf8.decode(bytes.subarray(pos, pos + nameLen));
+            pos = pad(pos + nameLen);
+            let present = null;
+            if (flags & 1) {
+                present = bytes.subarray(pos, pos + ((rows + 7) >> 3));
+                pos = pad(pos + ((rows + 7) >> 3));
+            }
+            const body = pos;
+            pos += bodyLen;
+
+            let values;
+            if (kind === K.BOOL) values = new Uint8Array(buffer, body, rows);
+            else if (kind === K.INT32) values = new Int32Array(buffer, body, rows);
+            else if (kind === K.FLOAT64) values = new Float64Array(buffer, body, rows);
+            else if (kind === K.STRING || kind === K.JSON) {
+                const count = view.getUint32(body, true);
+                const indexes = new Uint32Array(buffer, body + 8, rows);
+                const offsetsAt = pad(body + 8 + rows * 4);
+                const offsets = new Uint32Array(buffer, offsetsAt, count + 1);
+                const blob = offsetsAt + (count + 1) * 4;
+                // One decode for the whole blob; byte offsets are char offsets if it's ASCII
+                const all = utf8.decode(bytes.subarray(blob, blob + offsets[count]));
+                const ascii = all.length === offsets[count];
+                const words = new Array(count);
+                for (let k = 0; k < count; k++) {
+                    const text = ascii ? all.slice(offsets[k], offsets[k + 1]) :
+                        utf8.decode(bytes.subarray(blob + offsets[k], blob + offsets[k + 1]));
+                    words[k] = kind === K.JSON ? JSON.parse(text) : text;
+                }
+                values = { indexes, words };
+            } else {
+                throw new Error(`Unknown column kind ${kind} (${name})`);
+            }
+            columns.push({ name, kind, present, values });
+        }
+        return new EntityTable(rows, columns);
+    }
+
+    // Bytes from base64 pieces, each a whole number of 4-char groups
+    static fromBase64(chunks, size) {
+        const bytes = new Uint8Array(size);
+        let at = 0;
+        for (const chunk of chunks) {
+            const bin = atob(chunk);
+            for (let i = 0; i < bin.length; i++) bytes[at++] = bin.charCodeAt(i);
+        }
+        return EntityTable.fromBuffer(bytes.buffer);
+    }
+
+    column(name) {
+        return this.columns.find(c => c.name === name) || null;
+    }
+
+    // Plain objects, as JSON.parse would have given them (built row by row,
+    // so rows with the same keys share one object shape)
+    toObjects() {
+        const K = EntityTable.KIND;
+        const getters = this.columns.map(({ kind, values }) => {
+            if (kind === K.STRING || kind === K.JSON) return i => values.words[values.indexes[i]];
+            if (kind === K.BOOL) return i => values[i] !== 0;
+            return i => values[i];
+        });
+        const out = new Array(this.rows);
+        const cols = this.columns;
+        for (let i = 0; i < this.rows; i++) {
+            const o = {};
+            for (let c = 0; c < cols.length; c++) {
+                const present = cols[c].present;
+                if (present && !(present[i >> 3] >> (i & 7) & 1)) continue;
+                o[cols[c].name] = getters[c](i);
+            }
+            out[i] = o;
+        }
+        return out;
+    }
+}
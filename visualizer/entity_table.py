@@ -0,0 +1,183 @@
+"""
+Binary entity table: a list of flat dicts (the city's houses, trees and
+posts) as typed columns, for the visualizer bridge instead of JSON text.
+
+Layout (little-endian, every array starts on an 8-byte boundary so the page
+can view it in place with Int32Array/Float64Array; entity_table.js):
+
+    header   "BVET", version (u8), 0 (u8), columns (u16), rows (u32), 0 (u32)
+    per column:
+        kind (u8), flags (u8), name length (u16), body length (u32), name, pad
+        [presence bitmap, rows bits, if flags & HAS_ABSENT], pad
+        body, pad
+
+Column kinds (one array slot per row; absent rows hold 0):
+    BOOL     u8[rows]
+    INT32    i32[rows]
+    FLOAT64  f64[rows]
+    STRING   u32 count, pad, u32[rows] indexes into a dictionary,
+             u32[count + 1] UTF-8 offsets, UTF-8 blob
+    JSON     as STRING, each dictionary entry a JSON text (None, lists,
+             mixed types)
+
+A column's kind is the narrowest that holds all of its values. Columns come
+in first-seen key order; decoded dicts list their keys in that order.
+"""
+import json
+import struct
+from array import array
+from itertools import chain
+
+MAGIC = b"BVET"
+VERSION = 1
+HEADER = struct.Struct('<4sBBHII')
+COLUMN = struct.Struct('<BBHI')
+
+BOOL, INT32, FLOAT64, STRING, JSON = 1, 2, 3, 4, 5
+HAS_ABSENT = 1
+
+_MISSING = object()
+_INT32_MIN, _INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+class EntityTableError(ValueError):
+    pass
+
+
+def _pad(buf):
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def _kind(values, has_absent):
+    kinds = set(map(type, values))
+    present = [v for v in values if v is not _MISSING] if has_absent else values
+    kinds.discard(object)
+    if kinds == {bool}:
+        return BOOL
+    if kinds == {int}:
+        if _INT32_MIN <= min(present) and max(present) <= _INT32_MAX:
+            return INT32
+        return FLOAT64 if all(abs(v) <= 2 ** 53 for v in present) else JSON
+    if kinds and kinds <= {int, float}:
+        return FLOAT64
+    if kinds == {str}:
+        return STRING
+    return JSON
+
+
+def _dictionary(texts):
+    """(indexes u32[rows], offsets u32[count + 1], blob) for the texts, each distinct one stored once"""
+    lookup = {}
+    indexes = array('I', [lookup.setdefault(t, len(lookup)) for t in texts])
+    offsets = array('I', [0])
+    blob = bytearray()
+    for t in lookup:
+        blob.extend(t.encode('utf-8'))
+        offsets.append(len(blob))
+    return len(lookup), indexes, offsets, blob
+
+
+def encode(entities):
+    """The entity dicts as BVET bytes"""
+    names = dict.fromkeys(chain.from_iterable(entities))
+    rows = len(entities)
+    out = bytearray(HEADER.pack(MAGIC, VERSION, 0, len(names), rows, 0))
+
+    for name in names:
+        values = [e.get(name, _MISSING) for e in entities]
+        absent = [i for i, v in enumerate(values) if v is _MISSING] if _MISSING in values else None
+        kind = _kind(values, absent)
+
+        body = bytearray()
+        if kind in (BOOL, INT32, FLOAT64):
+            typecode = {BOOL: 'B', INT32: 'i', FLOAT64: 'd'}[kind]
+            body.extend(array(typecode, [0 if v is _MISSING else v for v in values]).tobytes())
+        else:
+            if kind == STRING:
+                texts = ["" if v is _MISSING else v for v in values]
+            else:
+                texts = ["null" if v is _MISSING else json.dumps(v, separators=(',', ':')) for v in values]
+            count, indexes, offsets, blob = _dictionary(texts)
+            body.extend(struct.pack('<I', count))
+            _pad(body)
+            body.extend(indexes.tobytes())
+            _pad(body)
+            body.extend(offsets.tobytes())
+            body.extend(blob)
+        _pad(body)
+
+        encoded_name = name.encode('utf-8')
+        out.extend(COLUMN.pack(kind, HAS_ABSENT if absent else 0, len(encoded_name), len(body)))
+        out.extend(encoded_name)
+        _pad(out)
+        if absent:
+            bitmap = bytearray(b"\xff" * ((rows + 7) // 8))
+            for i in absent:
+                bitmap[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+            out.extend(bitmap)
+            _pad(out)
+        out.extend(body)
+    return bytes(out)
+
+
+def decode(data):
+    """BVET bytes -> the entity dicts. Raises EntityTableError."""
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise EntityTableError("truncated header")
+    magic, version, _, ncols, rows, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise EntityTableError(f"unknown entity table format {bytes(magic)!r} v{version}")
+
+    entities = [{} for _ in range(rows)]
+    pos = HEADER.size
+    try:
+        for _ in range(ncols):
+            kind, flags, name_len, body_len = COLUMN.unpack_from(data, pos)
+            pos += COLUMN.size
+            name = bytes(data[pos:pos + name_len]).decode('utf-8')
+            pos += name_len + (-(pos + name_len) % 8)
+            present = None
+            if flags & HAS_ABSENT:
+                nbytes = (rows + 7) // 8
+                bitmap = bytes(data[pos:pos + nbytes])
+                present = [bitmap[i >> 3] >> (i & 7) & 1 for i in range(rows)]
+                pos += nbytes + (-nbytes % 8)
+            body = data[pos:pos + body_len]
+            pos += body_len
+
+            if kind in (BOOL, INT32, FLOAT64):
+                typecode = {BOOL: 'B', INT32: 'i', FLOAT64: 'd'}[kind]
+                values = array(typecode)
+                values.frombytes(bytes(body[:rows * values.itemsize]))
+                if kind == BOOL:
+                    values = [bool(v) for v in values]
+            elif kind in (STRING, JSON):
+                count = struct.unpack_from('<I', body)[0]
+                at = 8
+                indexes = array('I')
+                indexes.frombytes(bytes(body[at:at + rows * 4]))
+                at += rows * 4
+                at += -at % 8
+                offsets = array('I')
+                offsets.frombytes(bytes(body[at:at + (count + 1) * 4]))
+                blob = bytes(body[at + (count + 1) * 4:])
+                words = [blob[offsets[k]:offsets[k + 1]].decode('utf-8') for k in range(count)]
+                if kind == JSON:
+                    words = [json.loads(w) for w in words]
+                values = [words[k] for k in indexes]
+            else:
+                raise EntityTableError(f"unknown column kind {kind} ({name})")
+
+            if present is None:
+                for e, v in zip(entities, values):
+                    e[name] = v
+            else:
+                for e, v, p in zip(entities, values, present):
+                    if p:
+                        e[name] = v
+    except (struct.error, IndexError, ValueError) as e:
+        if isinstance(e, EntityTableError):
+            raise
+        raise EntityTableError(f"corrupt entity table: {e}") from None
+    return entities
@@ -1,9 +1,18 @@
 import json
 import hashlib
+import itertools
 import math
 import os
 import random
 import sys
+import logging
+from array import array
+
+from road_network import RoadNetwork
+from occupancy import OccupancyGrid, HOUSE, TREE, OWNER
+from city_seed import city_rng
+
+log = logging.getLogger(__name__)
 
 def string_to_color(s):
     hash_object = hashlib.md5(s.encode())
@@ -16,23 +25,62 @@ def string_to_pseudo_random(s):
     nums = [int(hex_dig[i], 16) % 4 for i in range(5)]
     return nums
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 def load_activity_metrics():
+    # map_store lives in the project root
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)
+    import map_store
     try:
-        # Determine path to activity_log.json (parent directory of this script)
-        # script_dir = visualizer/
-        # file = ../activity_log.json
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        path = os.path.join(base_dir, "activity_log.json")
-        
-        if os.path.exists(path):
-            with open(path, 'r') as f:
-                return json.load(f)
-        else:
-            print(f"Activity Log not found at {path}, using defaults.")
+        # Where the collector writes it (next to the exe when frozen); older builds: under / in the project root
+        paths = (map_store.activity_log_path(), os.path.join(ROOT_DIR, "datas", "activity_log.json"),
+                 os.path.join(ROOT_DIR, "activity_log.json"))
+        for path in dict.fromkeys(paths):
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    return json.load(f)
+        log.warning("Activity Log not found in %s, using defaults.", map_store.data_dir())
     except Exception as e:
-        print(f"Error loading activity log: {e}")
+        log.error("Error loading activity log: %s", e)
     return {}
 
+# "Grand Cross" Layout
+# Hierarchy of spaces:
+# 1. House-to-House: 2 units (Dense)
+# 2. Block-to-Block: 4 units (Street)
+# 3. Quadrant-to-Quadrant: 12 units (Main Avenue)
+
+HOUSE_GAP = 2
+STREET_GAP = 2 # Reduced from 4 to be closer
+MAIN_AVENUE_WIDTH = 6
+
+CLUSTER_ROWS = 4
+CLUSTER_COLS = 4
+HOUSES_PER_BLOCK = CLUSTER_ROWS * CLUSTER_COLS
+
+# Calculate Block Size
+BLOCK_WIDTH = (CLUSTER_COLS - 1) * HOUSE_GAP
+BLOCK_HEIGHT = (CLUSTER_ROWS - 1) * HOUSE_GAP
+
+# Stride (How much space one block takes including its street)
+BLOCK_STRIDE_X = BLOCK_WIDTH + STREET_GAP
+BLOCK_STRIDE_Y = BLOCK_HEIGHT + STREET_GAP
+
+# We distribute blocks into 4 Quadrants symmetrically
+# 0: NE (+x, -y), 1: NW (-x, -y), 2: SW (-x, +y), 3: SE (+x, +y)
+QUADRANTS = [
+    (1, -1),  # NE
+    (-1, -1), # NW
+    (-1, 1),  # SW
+    (1, 1)    # SE
+]
+
+def get_r_coord(idx):
+    """Road line position of block index idx along one axis"""
+    if idx == 0: return 0
+    return 2 + idx * 8
+
 def generate_city_slots(limit):
     slots = []
     facing_dir = []
@@ -43,46 +91,16 @@ def generate_city_slots(limit):
     
     # If limit is 1, we are done
     if limit <= 1:
-        return slots, facing_dir, []
+        return slots, facing_dir, RoadNetwork()
         
     # Generate remaining slots
     limit_remaining = limit - 1
     
-    # "Grand Cross" Layout
-    # Hierarchy of spaces:
-    # 1. House-to-House: 2 units (Dense)
-    # 2. Block-to-Block: 4 units (Street)
-    # 3. Quadrant-to-Quadrant: 12 units (Main Avenue)
-    
-    HOUSE_GAP = 2
-    STREET_GAP = 2 # Reduced from 4 to be closer
-    MAIN_AVENUE_WIDTH = 6
-    
-    CLUSTER_ROWS = 4
-    CLUSTER_COLS = 4
-    HOUSES_PER_BLOCK = CLUSTER_ROWS * CLUSTER_COLS
-    
-    # Calculate Block Size
-    BLOCK_WIDTH = (CLUSTER_COLS - 1) * HOUSE_GAP
-    BLOCK_HEIGHT = (CLUSTER_ROWS - 1) * HOUSE_GAP
-    
-    # Stride (How much space one block takes including its street)
-    BLOCK_STRIDE_X = BLOCK_WIDTH + STREET_GAP
-    BLOCK_STRIDE_Y = BLOCK_HEIGHT + STREET_GAP
-    
     # Number of houses needed
     total_blocks = math.ceil(limit / HOUSES_PER_BLOCK)
     
-    # We distribute blocks into 4 Quadrants symmetrically
-    # 0: NE (+x, -y), 1: NW (-x, -y), 2: SW (-x, +y), 3: SE (+x, +y)
-    
     # Quadrant Multipliers
-    quadrants = [
-        (1, -1),  # NE
-        (-1, -1), # NW
-        (-1, 1),  # SW
-        (1, 1)    # SE
-    ]
+    quadrants = QUADRANTS
     
     # Generate abstract block positions for ONE quadrant
     abstract_block_positions = []
@@ -95,7 +113,7 @@ def generate_city_slots(limit):
         
     # Generate Houses
     houses_placed = 0
-    road_tiles = set()
+    road_net = RoadNetwork()
     
     # Loop over abstract positions (0,0), (1,0)...
     for bx, by in abstract_block_positions:
@@ -137,10 +155,6 @@ def generate_city_slots(limit):
                 houses_placed += 1
             
             # --- Road Generation for this Block ---
-            def get_r_coord(idx):
-                if idx == 0: return 0
-                return 2 + idx * 8
-            
             rx_in = get_r_coord(bx) * qx
             rx_out = get_r_coord(bx + 1) * qx
             ry_in = get_r_coord(by) * qy
@@ -152,56 +166,174 @@ def generate_city_slots(limit):
             ey = int(max(ry_in, ry_out))
             
             # Add Horizontal Segments
-            for x in range(sx, ex + 1):
-                road_tiles.add((x, int(ry_in)))
-                road_tiles.add((x, int(ry_out)))
+            road_net.add_h(int(ry_in), sx, ex)
+            road_net.add_h(int(ry_out), sx, ex)
                 
             # Add Vertical Segments
-            for y in range(sy, ey + 1):
-                road_tiles.add((int(rx_in), y))
-                road_tiles.add((int(rx_out), y))
+            road_net.add_v(int(rx_in), sy, ey)
+            road_net.add_v(int(rx_out), sy, ey)
                 
     if slots:
-        # --- Central House Adjustment (Post-Process) ---
-        for i in range(-2, 3):
-             if (0, i) in road_tiles: road_tiles.remove((0, i))
-             if (i, 0) in road_tiles: road_tiles.remove((i, 0))
-             
-        # Add Ring Road around Central House
-        ring_min = -2
-        ring_max = 2
-        for x in range(ring_min, ring_max + 1):
-            road_tiles.add((x, ring_min))
-            road_tiles.add((x, ring_max))
-        for y in range(ring_min, ring_max + 1):
-            road_tiles.add((ring_min, y))
-            road_tiles.add((ring_max, y))
+        add_central_ring(road_net)
                 
-    return slots, facing_dir, list(road_tiles)
+    return slots, facing_dir, road_net.normalize()
 
-def generate_city(username="User"):
-    # 1. Load Activity Data
-    metrics = load_activity_metrics()
-    total_keys = metrics.get('total_keys', 0)
-    active_sec = metrics.get('total_active_seconds', 0)
-    idle_sec = metrics.get('total_idle_seconds', 0)
+def add_central_ring(road_net):
+    """Central House Adjustment (Post-Process): clears the cross at the center and rings the owner's house"""
+    for i in range(-2, 3):
+         road_net.remove_tile(0, i)
+         road_net.remove_tile(i, 0)
+         
+    # Add Ring Road around Central House
+    ring_min = -2
+    ring_max = 2
+    road_net.add_h(ring_min, ring_min, ring_max)
+    road_net.add_h(ring_max, ring_min, ring_max)
+    road_net.add_v(ring_min, ring_min, ring_max)
+    road_net.add_v(ring_max, ring_min, ring_max)
+
+# Facing codes used by the array form
+FACINGS = ("down", "left", "right")
+
+# Bump when the slot algorithm changes (the layout cache keys on it)
+LAYOUT_VERSION = 1
+
+def layout_key():
+    """Fingerprint of everything the slot layout depends on; cached layouts are only valid for this key"""
+    params = (LAYOUT_VERSION, HOUSE_GAP, STREET_GAP, MAIN_AVENUE_WIDTH, CLUSTER_ROWS, CLUSTER_COLS,
+              QUADRANTS, [get_r_coord(i) for i in range(4)])
+    return hashlib.md5(repr(params).encode()).digest()
+
+# Per-quadrant house offsets inside a block (same order as the scalar loop)
+BLOCK_OFFSETS = [
+    ([(i % CLUSTER_COLS) * HOUSE_GAP * qx for i in range(HOUSES_PER_BLOCK)],
+     [(i // CLUSTER_COLS) * HOUSE_GAP * qy for i in range(HOUSES_PER_BLOCK)])
+    for qx, qy in QUADRANTS
+]
+
+def iter_layout_blocks():
+    """(bx, by, q_idx) of every block in placement order: diagonal layers outwards, all quadrants each"""
+    layer = 0
+    while True:
+        for bx in range(layer + 1):
+            for q_idx in range(len(QUADRANTS)):
+                yield bx, layer - bx, q_idx
+        layer += 1
+
+def new_layout():
+    """Empty layout in array form: only the owner's slot"""
+    return array('d', [0.0]), array('d', [0.0]), bytearray([0]), array('i')
+
+def extend_layout(xs, ys, facings, blocks, count):
+    """
+    Grows a layout in array form by whole blocks until it has at least
+    `count` slots. xs / ys: array('d'); facings: bytearray of FACINGS
+    indices; blocks: array('i'), 4 per block (rx_in, rx_out, ry_in, ry_out,
+    the block's road rectangle).
+    """
+    start = len(blocks) // 4
+    todo = max(0, math.ceil((count - len(xs)) / HOUSES_PER_BLOCK))
+    for bx, by, q_idx in itertools.islice(iter_layout_blocks(), start, start + todo):
+        qx, qy = QUADRANTS[q_idx]
+        block_start_x = (MAIN_AVENUE_WIDTH / 2) * qx + (bx * BLOCK_STRIDE_X * qx)
+        block_start_y = (MAIN_AVENUE_WIDTH / 2) * qy + (by * BLOCK_STRIDE_Y * qy)
+        off_x, off_y = BLOCK_OFFSETS[q_idx]
+        block_xs = [block_start_x + o for o in off_x]
+        xs.extend(block_xs)
+        ys.extend([block_start_y + o for o in off_y])
+        # Face the vertical axis: 1 = left, 2 = right
+        facings.extend([1 if x > 0 else 2 for x in block_xs])
+        blocks.extend((get_r_coord(bx) * qx, get_r_coord(bx + 1) * qx,
+                       get_r_coord(by) * qy, get_r_coord(by + 1) * qy))
+
+def layout_roads(blocks, limit):
+    """RoadNetwork of a layout with `limit` slots (the blocks it uses plus the central ring)"""
+    road_net = RoadNetwork()
+    if limit <= 1:
+        return road_net
+    n_blocks = math.ceil((limit - 1) / HOUSES_PER_BLOCK)
+    for i in range(0, n_blocks * 4, 4):
+        rx_in, rx_out, ry_in, ry_out = blocks[i:i + 4]
+        road_net.add_h(ry_in, rx_in, rx_out)
+        road_net.add_h(ry_out, rx_in, rx_out)
+        road_net.add_v(rx_in, ry_in, ry_out)
+        road_net.add_v(rx_out, ry_in, ry_out)
+    add_central_ring(road_net)
+    return road_net.normalize()
+
+def generate_city_slot_arrays(limit):
+    """
+    generate_city_slots() for bulk work: the same slots as parallel arrays
+    xs / ys (array('d')) and facings (bytearray of FACINGS indices), plus the
+    RoadNetwork. Whole blocks are filled at a time instead of house by house.
+    """
+    xs, ys, facings, blocks = new_layout()
+    extend_layout(xs, ys, facings, blocks, limit)
+    return xs[:max(limit, 1)], ys[:max(limit, 1)], facings[:max(limit, 1)], layout_roads(blocks, limit)
+
+# Cyberpunk / Sci-Fi Name Generator
+SCI_FI_FORMATS = [
+    "Sector-{code}",
+    "Unit {code}",
+    "{concept} Outpost",
+    "{concept} Station",
+    "{concept} Node",
+    "Block {num}",
+    "Zone {code}"
+]
+
+CONCEPTS = ["Alpha", "Beta", "Gamma", "Delta", "Nexus", "Zero", "Void", "Flux", "Core", "Neon", "Cyber", "Null", "Stack", "Heap", "Root"]
+CODE_CHARS = ['A','B','X','Z','7','9']
+
+def activity_house_name(i, rng=random):
+    # Pick format
+    fmt = SCI_FI_FORMATS[i % len(SCI_FI_FORMATS)]
     
-    # Rules:
-    # - 300 active seconds = 1 Activity House
-    # - 300 idle seconds = 1 Activity Tree
-    # - 1000 words (5000 keys) = 1 Upgrade (Terrace)
+    # Data
+    code = f"{rng.choice(CODE_CHARS)}-{rng.randint(10,99)}"
+    num = rng.randint(1, 999)
+    concept = CONCEPTS[i % len(CONCEPTS)]
     
-    activity_houses_count = int(active_sec // 300)
-    activity_trees_count = int(idle_sec // 300)
+    # The simple modulo cycles, so names repeat
+    return fmt.format(code=code, num=num, concept=concept)
+
+def activity_counts(settings=None):
+    """(houses, trees, terraces) the activity log is worth under the settings.json thresholds"""
+    # settings_service / economy live in the project root
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)
+    from settings_service import load_settings
+    import economy
+
+    metrics = load_activity_metrics()
+    settings = settings or load_settings()
     
-    # 1 word = 5 keys (Standard)
-    words_typed = total_keys / 5
-    upgrades_count = int(words_typed // 1000)
+    # Same rules as the live collector (settings.json thresholds):
+    # - threshold_house active seconds = 1 Activity House
+    # - threshold_tree idle seconds = 1 Activity Tree
+    # - threshold_upgrade keys = 1 Upgrade (Terrace)
+    counts, _ = economy.expected_counts(metrics, settings)
     
-    print(f"--- Activity Integration ---")
-    print(f"Active: {active_sec}s -> {activity_houses_count} Houses")
-    print(f"Idle: {idle_sec}s -> {activity_trees_count} Trees")
-    print(f"Words: {int(words_typed)} -> {upgrades_count} Upgrades")
+    log.info("--- Activity Integration ---")
+    log.info("Active: %ss -> %d Houses", metrics.get('total_active_seconds', 0), counts["houses"])
+    log.info("Idle: %ss -> %d Trees", metrics.get('total_idle_seconds', 0), counts["trees"])
+    log.info("Keys: %d -> %d Upgrades", metrics.get('total_keys', 0), counts["terraces"])
+    return counts["houses"], counts["trees"], counts["terraces"]
+
+def generation_rng(username, houses, trees, seed=None):
+    """
+    The one RNG a whole generation run draws from: derived from the username
+    and the entity count (see city_seed.py) unless an explicit seed is given.
+    """
+    if seed is not None:
+        return random.Random(seed)
+    return city_rng(username, 1 + houses + trees, "generate_city")
+
+def generate_city(username="User", settings=None, seed=None):
+    """Scalar reference implementation (one dict per entity). See generate_city_bulk()."""
+    # 1. Load Activity Data
+    activity_houses_count, activity_trees_count, upgrades_count = activity_counts(settings)
+    rng = generation_rng(username, activity_houses_count, activity_trees_count, seed)
     
     # 2. Prepare Entity List
     entities = []
@@ -210,35 +342,8 @@ def generate_city(username="User"):
     entities.append({ "type": "owner", "login": username })
     
     # B. Activity Houses
-    # B. Activity Houses
-    # Cyberpunk / Sci-Fi Name Generator
-    sci_fi_formats = [
-        "Sector-{code}",
-        "Unit {code}",
-        "{concept} Outpost",
-        "{concept} Station",
-        "{concept} Node",
-        "Block {num}",
-        "Zone {code}"
-    ]
-    
-    concepts = ["Alpha", "Beta", "Gamma", "Delta", "Nexus", "Zero", "Void", "Flux", "Core", "Neon", "Cyber", "Null", "Stack", "Heap", "Root"]
-    
     for i in range(activity_houses_count):
-        # Pick format
-        fmt = sci_fi_formats[i % len(sci_fi_formats)]
-        
-        # Data
-        code = f"{random.choice(['A','B','X','Z','7','9'])}-{random.randint(10,99)}"
-        num = random.randint(1, 999)
-        concept = concepts[i % len(concepts)]
-        
-        name = fmt.format(code=code, num=num, concept=concept)
-        
-        # Add slight variation if duplicate index logic creates collision?
-        # The simple modulo above cycles.
-        
-        entities.append({ "type": "activity_house", "login": name })
+        entities.append({ "type": "activity_house", "login": activity_house_name(i, rng) })
         
     # C. Activity Trees
     for _ in range(activity_trees_count):
@@ -248,7 +353,7 @@ def generate_city(username="User"):
     # We keep owner at index 0. We shuffle the rest to mix trees and houses.
     center_entity = entities[0]
     mixable_entities = entities[1:]
-    random.shuffle(mixable_entities)
+    rng.shuffle(mixable_entities)
     final_entities = [center_entity] + mixable_entities
     
     # 4. Generate Slots
@@ -271,7 +376,9 @@ def generate_city(username="User"):
             processed_houses.append({
                 "x": slot_x,
                 "y": slot_y,
-                "obstacle": "tree"
+                "obstacle": "tree",
+                "slot": i,
+                "id": i
             })
         else:
             # It's a house (Owner or Activity)
@@ -293,14 +400,16 @@ def generate_city(username="User"):
                 "wallStyle": attrs[4],
                 "username": u_name,
                 "facing": facing,
-                "has_terrace": False # Default state for base
+                "has_terrace": False, # Default state for base
+                "slot": i,
+                "id": i
             }
             
             processed_houses.append(house)
             houses_eligible_for_upgrade.append(house)
 
     # 5. Apply Upgrades based on Typing Activity
-    random.shuffle(houses_eligible_for_upgrade)
+    rng.shuffle(houses_eligible_for_upgrade)
     
     upgrades_applied = 0
     for h in houses_eligible_for_upgrade:
@@ -309,24 +418,108 @@ def generate_city(username="User"):
         h['has_terrace'] = True
         upgrades_applied += 1
         
-    print(f"Applied {upgrades_applied} Terrace Upgrades from typing activity.")
+    log.info("Applied %d Terrace Upgrades from typing activity.", upgrades_applied)
 
     # 6. Save Files
     with open("stargazers_houses.json", "w") as f:
         json.dump(processed_houses, f, indent=4)
         
-    road_data = [{"x": int(r[0]), "y": int(r[1])} for r in roads]
     with open("roads.json", "w") as f:
-        json.dump(road_data, f, indent=4)
+        json.dump(roads.to_dict(), f)
+
+    OccupancyGrid.from_city(processed_houses, roads).save("occupancy.bin")
         
-    print(f"Successfully generated {len(processed_houses)} entities and {len(road_data)} road tiles.")
+    log.info("Successfully generated %d entities and %d road segments.", len(processed_houses), roads.segment_count())
+
+def generate_city_bulk(username="User", settings=None, seed=None):
+    """
+    Same city as generate_city() (identical output for the same inputs: it
+    makes the same random calls in the same order), built for large totals:
+
+    - entities are ints (house index / -1 for a tree), not dicts
+    - each distinct name is hashed once; color and styles come from the same
+      md5 digest, and the JSON fragment for the name is cached
+    - slots come from generate_city_slot_arrays()
+    - the snapshot is streamed to disk in one pass, one entity per line
+    """
+    houses_count, trees_count, upgrades_count = activity_counts(settings)
+    rng = generation_rng(username, houses_count, trees_count, seed)
+
+    # 1. Names (same random calls as the scalar path)
+    names = [activity_house_name(i, rng) for i in range(houses_count)]
+
+    # 2. Randomize placement: shuffling ints permutes exactly like shuffling the dicts
+    order = list(range(houses_count)) + [-1] * trees_count
+    rng.shuffle(order)
+    limit = len(order) + 1
+
+    # 3. Slots
+    xs, ys, facings, roads = generate_city_slot_arrays(limit)
+
+    # 4. Upgrades: eligible = owner + houses, in placement order
+    eligible = [0] + [i + 1 for i, e in enumerate(order) if e >= 0]
+    rng.shuffle(eligible)
+    terrace = bytearray(limit)
+    for pos in eligible[:upgrades_count]:
+        terrace[pos] = 1
+    log.info("Applied %d Terrace Upgrades from typing activity.", min(upgrades_count, len(eligible)))
+
+    # 5. Stream the snapshot
+    fragments = {}
+    def house_fragment(name):
+        frag = fragments.get(name)
+        if frag is None:
+            hex_dig = hashlib.md5(name.encode()).hexdigest()
+            styles = [int(hex_dig[i], 16) % 4 for i in range(5)]
+            frag = (f'"color": "#{hex_dig[:6]}", "roofStyle": {styles[0]}, "doorStyle": {styles[1]}, '
+                    f'"windowStyle": {styles[2]}, "chimneyStyle": {styles[3]}, "wallStyle": {styles[4]}, '
+                    f'"username": {json.dumps(name)}')
+            fragments[name] = frag
+        return frag
+
+    kinds = bytearray(limit)
+    with open("stargazers_houses.json", "w") as f:
+        f.write("[\n")
+        lines = []
+        for i in range(limit):
+            e = order[i - 1] if i else None
+            x, y = (xs[i], ys[i]) if i else (0, 0)
+            if e == -1:
+                kinds[i] = TREE
+                lines.append(f'{{"x": {x!r}, "y": {y!r}, "obstacle": "tree", "slot": {i}, "id": {i}}}')
+            else:
+                kinds[i] = OWNER if i == 0 else HOUSE
+                name = username if i == 0 else names[e]
+                lines.append(f'{{"x": {x!r}, "y": {y!r}, {house_fragment(name)}, "facing": "{FACINGS[facings[i]]}", '
+                             f'"has_terrace": {"true" if terrace[i] else "false"}, "slot": {i}, "id": {i}}}')
+            if len(lines) >= 10000:
+                f.write(",\n".join(lines))
+                f.write(",\n" if i < limit - 1 else "")
+                lines = []
+        f.write(",\n".join(lines))
+        f.write("\n]\n")
+
+    with open("roads.json", "w") as f:
+        json.dump(roads.to_dict(), f)
+
+    grid = OccupancyGrid()
+    grid.mark_roads(roads)
+    grid.mark_many(xs, ys, kinds)
+    grid.save("occupancy.bin")
+
+    log.info("Successfully generated %d entities (%d distinct names) and %d road segments.", limit, len(fragments), roads.segment_count())
 
 def main():
+    # log_setup lives in the project root
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from log_setup import setup_logging
+    setup_logging("fetch_stargazers")
+
     username = "SystemUser"
     if len(sys.argv) > 1:
         username = sys.argv[1]
     
-    generate_city(username)
+    generate_city_bulk(username)
 
 if __name__ == "__main__":
     main()
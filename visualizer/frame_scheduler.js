@@ -0,0 +1,144 @@
+// Render-on-demand loop for the city map and the notes wall.
+//
+// Nothing is drawn unless something asks for a frame:
+//   - invalidate(): input, new data, a resize. One frame, as soon as possible.
+//   - isAnimating(): checked after each frame; while it is true (a hover
+//     easing in, say) frames follow at the display rate.
+//   - hasAmbient(): idle motion (tree sway, clouds, smoke, rain). It is
+//     drawn at ambientFps (0 = frozen) instead of the display rate.
+// Nothing is drawn while document.hidden; a frame follows when the page
+// shows again.
+//
+// draw(steps, now) gets the number of 60 Hz simulation ticks since the last
+// frame (at least 1, capped), so per-tick motion keeps its speed at any
+// frame rate.
+//
+// F2, or ?stats in the page URL, shows frames drawn and their cost.
+class FrameScheduler {
+    static TICK_MS = 1000 / 60;
+    static MAX_STEPS = 30;
+
+    constructor(draw, { isAnimating = () => false, hasAmbient = () => false, ambientFps = 10 } = {}) {
+        this.draw = draw;
+        this.isAnimating = isAnimating;
+        this.hasAmbient = hasAmbient;
+        this.ambientFps = ambientFps;
+        this.rafId = 0;
+        this.timerId = 0;
+        this.lastTime = 0;
+        this.mode = 'idle';
+        this.stats = {
+            frames: 0, drawMs: 0,              // since start
+            windowFrames: 0, windowMs: 0, windowMax: 0,
+            visibleMs: 0, visibleSince: performance.now()
+        };
+        this.overlay = null;
+        this.frame = this.frame.bind(this);
+
+        document.addEventListener('visibilitychange', () => {
+            const now = performance.now();
+            if (document.hidden) {
+                this.stats.visibleMs += now - this.stats.visibleSince;
+                cancelAnimationFrame(this.rafId);
+                clearTimeout(this.timerId);
+                this.rafId = this.timerId = 0;
+                this.mode = 'hidden';
+            } else {
+                this.stats.visibleSince = now;
+                this.lastTime = 0;
+                this.invalidate();
+            }
+        });
+        window.addEventListener('keydown', e => {
+            if (e.key === 'F2') this.showStats(!this.overlay);
+        });
+        if (new URLSearchParams(location.search).has('stats')) this.showStats(true);
+        this.invalidate();
+    }
+
+    setAmbientFps(fps) {
+        if (fps === this.ambientFps) return;
+        this.ambientFps = fps;
+        this.invalidate();
+    }
+
+    invalidate() {
+        clearTimeout(this.timerId);
+        this.timerId = 0;
+        this.request();
+    }
+
+    request() {
+        if (!this.rafId && !document.hidden) this.rafId = requestAnimationFrame(this.frame);
+    }
+
+    frame(now) {
+        this.rafId = 0;
+        if (document.hidden) return;
+        const steps = this.lastTime ?
+            Math.min(FrameScheduler.MAX_STEPS, Math.max(1, Math.round((now - this.lastTime) / FrameScheduler.TICK_MS))) : 1;
+        this.lastTime = now;
+
+        const t0 = performance.now();
+        this.draw(steps, now);
+        const ms = performance.now() - t0;
+        const s = this.stats;
+        s.frames++;
+        s.drawMs += ms;
+        s.windowFrames++;
+        s.windowMs += ms;
+        s.windowMax = Math.max(s.windowMax, ms);
+
+        // Next frame: right away while something moves, later for ambient motion
+        if (this.isAnimating()) {
+            this.mode = 'active';
+            this.request();
+        } else if (this.ambientFps > 0 && this.hasAmbient()) {
+            this.mode = 'ambient';
+            if (!this.rafId && !this.timerId) {
+                this.timerId = setTimeout(() => {
+                    this.timerId = 0;
+                    this.request();
+                }, Math.max(0, 1000 / this.ambientFps - ms));
+            }
+        } else {
+            this.mode = 'idle';
+            this.lastTime = 0; // The next frame (after input) is one step
+        }
+    }
+
+    showStats(show) {
+        if (show && !this.overlay) {
+            this.overlay = document.createElement('div');
+            Object.assign(this.overlay.style, {
+                position: 'fixed', left: '12px', top: '12px', zIndex: 1000,
+                padding: '6px 10px', borderRadius: '6px', pointerEvents: 'none',
+                background: 'rgba(0, 0, 0, 0.65)', color: '#e5e7eb',
+                font: '12px monospace', whiteSpace: 'pre'
+            });
+            document.body.appendChild(this.overlay);
+            this.overlayTimer = setInterval(() => this.updateStats(), 1000);
+            this.updateStats();
+        } else if (!show && this.overlay) {
+            clearInterval(this.overlayTimer);
+            this.overlay.remove();
+            this.overlay = null;
+        }
+    }
+
+    updateStats() {
+        const s = this.stats;
+        const visibleMs = s.visibleMs + (document.hidden ? 0 : performance.now() - s.visibleSince);
+        const continuous = visibleMs / FrameScheduler.TICK_MS; // Frames a 60 fps loop would have drawn
+        const saved = continuous > 0 ? Math.max(0, 100 * (1 - s.frames / continuous)) : 0;
+        this.overlay.textContent =
+            `${this.mode}: ${s.windowFrames} frames/s (ambient ${this.ambientFps} fps)\n` +
+            `frame ${(s.windowFrames ? s.windowMs / s.windowFrames : 0).toFixed(2)} ms avg, ` +
+            `${s.windowMax.toFixed(2)} ms max\n` +
+            `${s.frames} frames drawn vs ${Math.round(continuous)} at 60 fps (-${saved.toFixed(0)}%), ` +
+            `${(s.drawMs / 1000).toFixed(1)} s drawing`;
+        s.windowFrames = 0;
+        s.windowMs = 0;
+        s.windowMax = 0;
+    }
+}
@@ -0,0 +1,165 @@
+"""
+Persistent cache of the slot layout (layout_cache.bin next to occupancy.bin).
+
+The layout is deterministic and only ever grows: the first n slots of a
+larger layout are the layout for n. The cache keeps the largest layout built
+so far, in whole blocks, answers any smaller n by slicing and extends block
+by block (from where it stopped) when a larger n is asked for.
+
+layout_cache.bin:
+    32-byte header  "BVLC", version, 0, 0 (u16), slot count, block count (i32 LE),
+                    layout key (16 bytes, see fetch_stargazers.layout_key)
+    slots * 8       x (f64 LE)
+    slots * 8       y (f64 LE)
+    blocks * 16     rx_in, rx_out, ry_in, ry_out (i32 LE)
+    slots           facing (index into FACINGS)
+
+load() maps the file and the arrays are memoryviews into the mapping (only
+the header is read at startup). A file written for other layout constants
+has a different key and is rebuilt.
+"""
+import os
+import sys
+import math
+import mmap
+import struct
+import logging
+from array import array
+
+from fetch_stargazers import FACINGS, HOUSES_PER_BLOCK, layout_key, new_layout, extend_layout, layout_roads
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"BVLC"
+VERSION = 1
+HEADER = struct.Struct('<4sBBHii16s')
+
+# Extend by at least this factor so a city growing one house at a time
+# doesn't rewrite the cache on every new block
+GROWTH = 1.5
+
+
+def _copy(column, n, typecode):
+    """The first n items of an array / mapped memoryview as a new array (one memcpy)"""
+    out = array(typecode)
+    with memoryview(column) as view:
+        out.frombytes(view[:n].cast('B'))
+    return out
+
+
+class LayoutCache:
+    def __init__(self, path=None):
+        self.path = path
+        self.key = layout_key()
+        self.mapping = None
+        self.views = []
+        # Last road network built: (limit, RoadNetwork); callers get copies
+        self.last_roads = None
+        if not (path and self.load()):
+            self.xs, self.ys, self.facings, self.blocks = new_layout()
+
+    def __len__(self):
+        return len(self.xs)
+
+    # --- Queries ---
+    def ensure(self, limit):
+        """Makes sure the first `limit` slots are computed (extends and saves if needed)"""
+        if limit <= len(self.xs):
+            return
+        self._writable()
+        extend_layout(self.xs, self.ys, self.facings, self.blocks, max(limit, int(len(self.xs) * GROWTH)))
+        if self.path:
+            self.save()
+
+    def roads(self, limit):
+        """RoadNetwork for `limit` slots (rebuilt only when the number of blocks changes)"""
+        self.ensure(limit)
+        n_blocks = math.ceil((limit - 1) / HOUSES_PER_BLOCK) if limit > 1 else 0
+        if self.last_roads is None or self.last_roads[0] != n_blocks:
+            self.last_roads = (n_blocks, layout_roads(self.blocks, limit))
+        return self.last_roads[1].copy()
+
+    def slot(self, index):
+        self.ensure(index + 1)
+        return (self.xs[index], self.ys[index]) if index else (0, 0)
+
+    def arrays(self, limit):
+        """Same as generate_city_slot_arrays(limit), copied out of the cache (no views into the mapping escape)"""
+        self.ensure(limit)
+        n = max(limit, 1)
+        return (_copy(self.xs, n, 'd'), _copy(self.ys, n, 'd'), bytearray(self.facings[:n]),
+                self.roads(limit))
+
+    def slots(self, limit):
+        """Same as generate_city_slots(limit), sliced from the cache"""
+        self.ensure(limit)
+        n = max(limit, 1)
+        slots = [(0, 0)]
+        slots.extend(zip(self.xs[1:n], self.ys[1:n]))
+        facings = [FACINGS[f] for f in self.facings[:n]]
+        return slots, facings, self.roads(limit)
+
+    # --- Persistence ---
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, 0, len(self.xs), len(self.blocks) // 4, self.key))
+            for column in (self.xs, self.ys, self.blocks):
+                if sys.byteorder != "little":
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                f.write(column)
+            f.write(self.facings)
+        os.replace(tmp, self.path)
+        log.debug("Layout cache saved: %d slots", len(self.xs))
+
+    def load(self):
+        """Maps the cache file; False if it is missing, damaged or for other layout constants"""
+        # Mapped columns are read as native numbers
+        if sys.byteorder != "little":
+            return False
+        try:
+            with open(self.path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            magic, version, _, _, n, n_blocks, key = HEADER.unpack_from(mapping, 0)
+        except struct.error:
+            mapping.close()
+            return False
+        size = HEADER.size + n * 17 + n_blocks * 16
+        if magic != MAGIC or version != VERSION or key != self.key or n < 1 or len(mapping) < size:
+            mapping.close()
+            return False
+        view = memoryview(mapping)
+        pos = HEADER.size
+        columns = []
+        for length, fmt in ((n * 8, 'd'), (n * 8, 'd'), (n_blocks * 16, 'i'), (n, 'B')):
+            columns.append(view[pos:pos + length].cast(fmt))
+            pos += length
+        self.xs, self.ys, self.blocks, self.facings = columns
+        self.mapping = mapping
+        self.views = [view] + columns
+        return True
+
+    def _writable(self):
+        """Mapped (read-only) columns are copied once before the first extension"""
+        if self.mapping is None:
+            return
+        xs, ys = _copy(self.xs, len(self.xs), 'd'), _copy(self.ys, len(self.ys), 'd')
+        blocks = _copy(self.blocks, len(self.blocks), 'i')
+        facings = bytearray(self.facings)
+        self.close()
+        self.xs, self.ys, self.facings, self.blocks = xs, ys, facings, blocks
+
+    def close(self):
+        """Releases the file mapping (the cache is empty afterwards)"""
+        if self.mapping is None:
+            return
+        for view in reversed(self.views):
+            view.release()
+        self.mapping.close()
+        self.mapping = None
+        self.views = []
+        self.xs, self.ys, self.facings, self.blocks = new_layout()
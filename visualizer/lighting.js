@@ -0,0 +1,135 @@
+// Time-of-day and weather lighting for the map.
+//
+// The light for every minute of the day and every weather is precomputed
+// once into a lookup table: an RGB multiplier (warm at dawn and dusk, blue
+// at night, grey in the rain) and a darkness (0 = noon, 1 = night) that
+// windows and clouds follow. Dawn and dusk are interpolated between a few
+// keyframes, so they are smooth without any per-frame math.
+//
+// set(minute, weather) picks the current entry (world.json's minuteOfDay and
+// weather); only when it changes are the cached colors dropped. Everything a
+// frame asks for is a lookup:
+//   - ground: background and grass colors, blended day -> night.
+//   - lit(color, amount): a house face shaded by `amount` (adjustColor), then
+//     lit, per color string.
+//   - shade(color, amount): adjustColor alone, for colors already lit.
+// Amounts are cache keys: pass whole numbers (an animated, fractional amount
+// would miss every frame).
+class Lighting {
+    static MINUTES = 1440;
+    static WEATHERS = ['none', 'rain']; // Anything else lights as 'none'
+    // [minute, r, g, b, darkness]; darkness crosses 0.5 at 6:00 and 18:00
+    static KEYFRAMES = [
+        [0, 0.57, 0.65, 0.72, 1],
+        [315, 0.57, 0.65, 0.72, 1],
+        [360, 0.95, 0.80, 0.74, 0.5],   // Dawn
+        [405, 1, 1, 1, 0],
+        [1035, 1, 1, 1, 0],
+        [1080, 1, 0.78, 0.62, 0.5],     // Dusk
+        [1125, 0.57, 0.65, 0.72, 1],
+        [1440, 0.57, 0.65, 0.72, 1]
+    ];
+    static WEATHER_TINT = {
+        none: [1, 1, 1, 0],
+        rain: [0.80, 0.83, 0.90, 0.15]  // Multiplier and extra darkness
+    };
+
+    constructor(palette) {
+        this.palette = palette;
+        this.table = Lighting.buildTable();
+        this.key = -1;
+        this.r = 1; this.g = 1; this.b = 1;
+        this.darkness = 0;
+        this.ground = palette.day;
+        this.litCache = new Map();   // color -> Map(amount -> lit color)
+        this.shadeCache = new Map();
+        this.set(720, 'none');
+    }
+
+    // Float32Array of [r, g, b, darkness] per (minute, weather)
+    static buildTable() {
+        const weathers = Lighting.WEATHERS;
+        const table = new Float32Array(Lighting.MINUTES * weathers.length * 4);
+        const keys = Lighting.KEYFRAMES;
+        let k = 0;
+        for (let m = 0; m < Lighting.MINUTES; m++) {
+            while (keys[k + 1][0] <= m && k + 2 < keys.length) k++;
+            const a = keys[k], b = keys[k + 1];
+            const f = b[0] > a[0] ? Math.min(1, (m - a[0]) / (b[0] - a[0])) : 0;
+            const light = [1, 2, 3, 4].map(i => a[i] + (b[i] - a[i]) * f);
+            weathers.forEach((w, wi) => {
+                const tint = Lighting.WEATHER_TINT[w];
+                const o = (m * weathers.length + wi) * 4;
+                table[o] = light[0] * tint[0];
+                table[o + 1] = light[1] * tint[1];
+                table[o + 2] = light[2] * tint[2];
+                table[o + 3] = Math.min(1, light[3] + tint[3]);
+            });
+        }
+        return table;
+    }
+
+    // Current lighting step; returns true if it changed (cached colors are dropped)
+    set(minute, weather) {
+        const m = ((Math.floor(minute) % Lighting.MINUTES) + Lighting.MINUTES) % Lighting.MINUTES;
+        const wi = Math.max(0, Lighting.WEATHERS.indexOf(weather));
+        const key = m * Lighting.WEATHERS.length + wi;
+        if (key === this.key) return false;
+        this.key = key;
+        const o = key * 4;
+        this.r = this.table[o];
+        this.g = this.table[o + 1];
+        this.b = this.table[o + 2];
+        this.darkness = this.table[o + 3];
+        this.litCache.clear();
+        this.shadeCache.clear();
+        this.ground = this.groundColors();
+        return true;
+    }
+
+    // Palette colors for this step: the day palette under the light, fading into the night palette
+    groundColors() {
+        const day = this.palette.day, night = this.palette.night;
+        const t = this.darkness;
+        const out = { windowLit: t >= 0.5 };
+        for (const name of Object.keys(day)) {
+            if (typeof day[name] !== 'string') continue;
+            const d = Lighting.parse(day[name]), n = Lighting.parse(night[name] || day[name]);
+            out[name] = Lighting.format(
+                d[0] * this.r * (1 - t) + n[0] * t,
+                d[1] * this.g * (1 - t) + n[1] * t,
+                d[2] * this.b * (1 - t) + n[2] * t);
+        }
+        return out;
+    }
+
+    lit(color, amount = 0) {
+        let byAmount = this.litCache.get(color);
+        if (!byAmount) this.litCache.set(color, byAmount = new Map());
+        let out = byAmount.get(amount);
+        if (out === undefined) {
+            const c = Lighting.parse(amount ? adjustColor(color, amount) : color);
+            out = Lighting.format(c[0] * this.r, c[1] * this.g, c[2] * this.b);
+            byAmount.set(amount, out);
+        }
+        return out;
+    }
+
+    shade(color, amount) {
+        let byAmount = this.shadeCache.get(color);
+        if (!byAmount) this.shadeCache.set(color, byAmount = new Map());
+        let out = byAmount.get(amount);
+        if (out === undefined) byAmount.set(amount, out = adjustColor(color, amount));
+        return out;
+    }
+
+    static parse(color) {
+        const num = parseInt(color[0] === '#' ? color.slice(1) : color, 16) || 0;
+        return [num >> 16, (num >> 8) & 0xFF, num & 0xFF];
+    }
+
+    static format(r, g, b) {
+        const c = v => Math.max(0, Math.min(255, Math.round(v)));
+        return '#' + ((c(r) << 16) | (c(g) << 8) | c(b)).toString(16).padStart(6, '0');
+    }
+}
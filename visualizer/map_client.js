@@ -0,0 +1,56 @@
+// Map load/save through the visualizer_app bridge (see map_store.py).
+// The map text crosses the bridge in chunks, so a big map isn't one huge
+// pywebview call; map.json's versioned, shape-encoded layout is decoded here.
+const MAP_READER_VERSION = 1;
+
+function decodeMap(text) {
+    const doc = JSON.parse(text);
+    if (!('format' in doc)) return Object.assign({ entities: [] }, doc); // Unversioned
+    if (doc.format !== 'bitville-map') throw new Error(`Unknown map format ${doc.format}`);
+    if ((doc.min_reader || 1) > MAP_READER_VERSION) {
+        throw new Error(`Map version ${doc.version} needs a newer reader`);
+    }
+    const map = {};
+    for (const [key, value] of Object.entries(doc)) {
+        if (key !== 'format' && key !== 'version' && key !== 'min_reader') map[key] = value;
+    }
+    const table = doc.entities;
+    if (table && !Array.isArray(table)) {
+        map.entities = table.rows.map(row => {
+            const keys = table.shapes[row[0]];
+            const e = {};
+            for (let i = 0; i < keys.length; i++) e[keys[i]] = row[i + 1];
+            return e;
+        });
+    } else {
+        map.entities = table || [];
+    }
+    return map;
+}
+
+async function loadMap() {
+    const api = window.pywebview && window.pywebview.api;
+    if (!api || !api.map_read_begin) return { entities: [] };
+    const info = await api.map_read_begin();
+    const parts = [];
+    for (let i = 0; i < info.chunks; i++) {
+        const res = await api.map_read_chunk(info.id, i);
+        if (res.error) throw new Error(res.error);
+        parts.push(res.data);
+    }
+    return decodeMap(parts.join(''));
+}
+
+async function saveMap(map) {
+    const api = window.pywebview && window.pywebview.api;
+    if (!api || !api.map_write_begin) throw new Error('No map bridge');
+    const text = JSON.stringify(map);
+    const { id, chunk_chars: size } = await api.map_write_begin();
+    for (let i = 0, start = 0; start < text.length || i === 0; i++, start += size) {
+        const res = await api.map_write_chunk(id, i, text.slice(start, start + size));
+        if (res.error) throw new Error(res.error);
+    }
+    const res = await api.map_write_commit(id);
+    if (res.error) throw new Error(res.error);
+    return res;
+}
@@ -0,0 +1,93 @@
+// Dense occupancy grid (see occupancy.py): one byte per cell with kind bits.
+// occupancy.bin is a 24-byte header followed by the cells; the cells are
+// viewed in place (Uint8Array over the fetched ArrayBuffer, no copy).
+const CELL = { ROAD: 1, HOUSE: 2, TREE: 4, GIT_POST: 8, OWNER: 16 };
+CELL.BUILDING = CELL.HOUSE | CELL.GIT_POST | CELL.OWNER;
+
+class OccupancyGrid {
+    constructor(minX = 0, minY = 0, width = 0, height = 0, cells = null) {
+        this.minX = minX;
+        this.minY = minY;
+        this.width = width;
+        this.height = height;
+        this.cells = cells || new Uint8Array(width * height);
+    }
+
+    static CHUNK = 64;
+    static HEADER_SIZE = 24;
+
+    static fromBuffer(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== 'BVOG' || view.getUint8(4) !== 1) throw new Error('Unknown occupancy format');
+        const minX = view.getInt32(8, true);
+        const minY = view.getInt32(12, true);
+        const width = view.getInt32(16, true);
+        const height = view.getInt32(20, true);
+        return new OccupancyGrid(minX, minY, width, height,
+            new Uint8Array(buffer, OccupancyGrid.HEADER_SIZE, width * height));
+    }
+
+    // Fallback when occupancy.bin is missing: rasterize from houses + RoadMap
+    static build(houses, roadMap) {
+        const grid = new OccupancyGrid();
+        grid.markRoads(roadMap);
+        houses.forEach((h, i) => grid.markEntity(h, i));
+        return grid;
+    }
+
+    get(x, y) {
+        const cx = x - this.minX, cy = y - this.minY;
+        if (cx < 0 || cy < 0 || cx >= this.width || cy >= this.height) return 0;
+        return this.cells[cy * this.width + cx];
+    }
+
+    isRoad(x, y) { return (this.get(x, y) & CELL.ROAD) !== 0; }
+    isBuilding(x, y) { return (this.get(x, y) & CELL.BUILDING) !== 0; }
+
+    // Grows in CHUNK steps so (x0, y0)..(x1, y1) is covered
+    ensure(x0, y0, x1, y1) {
+        const C = OccupancyGrid.CHUNK;
+        if (this.width && x0 >= this.minX && y0 >= this.minY &&
+            x1 < this.minX + this.width && y1 < this.minY + this.height) return;
+        if (this.width) {
+            x0 = Math.min(x0, this.minX); y0 = Math.min(y0, this.minY);
+            x1 = Math.max(x1, this.minX + this.width - 1); y1 = Math.max(y1, this.minY + this.height - 1);
+        }
+        const minX = Math.floor(x0 / C) * C, minY = Math.floor(y0 / C) * C;
+        const width = Math.ceil((x1 + 1 - minX) / C) * C, height = Math.ceil((y1 + 1 - minY) / C) * C;
+        const cells = new Uint8Array(width * height);
+        for (let row = 0; row < this.height; row++) {
+            cells.set(this.cells.subarray(row * this.width, (row + 1) * this.width),
+                (row + this.minY - minY) * width + (this.minX - minX));
+        }
+        Object.assign(this, { minX, minY, width, height, cells });
+    }
+
+    mark(x, y, kind) {
+        x = Math.round(x); y = Math.round(y);
+        this.ensure(x, y, x, y);
+        this.cells[(y - this.minY) * this.width + (x - this.minX)] |= kind;
+    }
+
+    markEntity(ent, index) {
+        let kind = CELL.HOUSE;
+        if (ent.obstacle === 'tree') kind = CELL.TREE;
+        else if (ent.type === 'git_post') kind = CELL.GIT_POST;
+        else if (ent.type === 'owner' || index === 0) kind = CELL.OWNER;
+        this.mark(ent.x, ent.y, kind);
+    }
+
+    markRoads(roadMap) {
+        for (const [y, runs] of roadMap.h) {
+            for (let i = 0; i < runs.length; i += 2) {
+                for (let x = runs[i]; x <= runs[i + 1]; x++) this.mark(x, y, CELL.ROAD);
+            }
+        }
+        for (const [x, runs] of roadMap.v) {
+            for (let i = 0; i < runs.length; i += 2) {
+                for (let y = runs[i]; y <= runs[i + 1]; y++) this.mark(x, y, CELL.ROAD);
+            }
+        }
+    }
+}
@@ -0,0 +1,195 @@
+"""
+Dense occupancy grid: one byte per cell with kind bits, shared by the layout
+code, the collector and the renderer.
+
+The grid covers [min_x, min_x + width) x [min_y, min_y + height) and grows in
+CHUNK-sized steps when something is marked outside it. A cell's byte is at
+(y - min_y) * width + (x - min_x).
+
+occupancy.bin (next to stargazers_houses.json):
+    24-byte header  "BVOG", version, 0, 0 (u16), min_x, min_y, width, height (i32 LE)
+    width * height  cell bytes
+
+load() maps the file and exposes the cells as a memoryview over the mapping
+(no copy); the renderer does the same with a Uint8Array over the fetched
+ArrayBuffer (occupancy.js).
+"""
+import os
+import mmap
+import struct
+
+ROAD = 1
+HOUSE = 2
+TREE = 4
+GIT_POST = 8
+OWNER = 16
+BUILDING = HOUSE | GIT_POST | OWNER
+
+CHUNK = 64
+MAGIC = b"BVOG"
+VERSION = 1
+HEADER = struct.Struct('<4sBBHiiii')
+
+
+def entity_kind(ent, index=None):
+    if ent.get('obstacle') == 'tree':
+        return TREE
+    if ent.get('type') == 'git_post':
+        return GIT_POST
+    if ent.get('type') == 'owner' or index == 0:
+        return OWNER
+    return HOUSE
+
+
+class OccupancyGrid:
+    def __init__(self, min_x=0, min_y=0, width=0, height=0, cells=None):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.width = width
+        self.height = height
+        self.cells = cells if cells is not None else bytearray(width * height)
+        self.mapping = None
+        self.view = None
+
+    # --- Queries (plain array lookups) ---
+    def get(self, x, y):
+        cx = int(x) - self.min_x
+        cy = int(y) - self.min_y
+        if 0 <= cx < self.width and 0 <= cy < self.height:
+            return self.cells[cy * self.width + cx]
+        return 0
+
+    def has(self, x, y, kind):
+        return bool(self.get(x, y) & kind)
+
+    def is_road(self, x, y):
+        return self.has(x, y, ROAD)
+
+    def is_free(self, x, y):
+        return self.get(x, y) == 0
+
+    # --- Building ---
+    def _writable(self):
+        """Mapped (read-only) grids are copied once before the first change"""
+        if not isinstance(self.cells, bytearray):
+            cells = bytearray(self.cells)
+            self._unmap()
+            self.cells = cells
+
+    def ensure(self, x0, y0, x1, y1):
+        """Grows (in CHUNK steps) so the inclusive box x0..x1, y0..y1 is covered"""
+        self._writable()
+        if self.width and self.height and x0 >= self.min_x and y0 >= self.min_y \
+                and x1 < self.min_x + self.width and y1 < self.min_y + self.height:
+            return
+        if self.width and self.height:
+            x0, y0 = min(x0, self.min_x), min(y0, self.min_y)
+            x1 = max(x1, self.min_x + self.width - 1)
+            y1 = max(y1, self.min_y + self.height - 1)
+        new_min_x = (x0 // CHUNK) * CHUNK
+        new_min_y = (y0 // CHUNK) * CHUNK
+        new_w = ((x1 + 1 - new_min_x + CHUNK - 1) // CHUNK) * CHUNK
+        new_h = ((y1 + 1 - new_min_y + CHUNK - 1) // CHUNK) * CHUNK
+        cells = bytearray(new_w * new_h)
+        # Copy the old rows into place
+        dx = self.min_x - new_min_x
+        for row in range(self.height):
+            src = row * self.width
+            dst = (row + self.min_y - new_min_y) * new_w + dx
+            cells[dst:dst + self.width] = self.cells[src:src + self.width]
+        self.min_x, self.min_y, self.width, self.height = new_min_x, new_min_y, new_w, new_h
+        self.cells = cells
+
+    def mark(self, x, y, kind):
+        x, y = int(x), int(y)
+        self.ensure(x, y, x, y)
+        self.cells[(y - self.min_y) * self.width + (x - self.min_x)] |= kind
+
+    def mark_entities(self, entities, first_index=0):
+        for i, ent in enumerate(entities, first_index):
+            if 'x' in ent and 'y' in ent:
+                self.mark(ent['x'], ent['y'], entity_kind(ent, i))
+
+    def mark_many(self, xs, ys, kinds):
+        """Marks cell (xs[i], ys[i]) with kinds[i] for parallel arrays (one bounds check for all)"""
+        if not len(xs):
+            return
+        self.ensure(int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys)))
+        w, min_x, min_y, cells = self.width, self.min_x, self.min_y, self.cells
+        for x, y, kind in zip(xs, ys, kinds):
+            cells[(int(y) - min_y) * w + int(x) - min_x] |= kind
+
+    def mark_roads(self, roads):
+        """Rasterizes a RoadNetwork (whole runs at a time)"""
+        roads.normalize()
+        boxes = [(a, y, b, y) for y, runs in roads.h.items() for a, b in runs]
+        boxes += [(x, a, x, b) for x, runs in roads.v.items() for a, b in runs]
+        if not boxes:
+            return
+        self.ensure(min(b[0] for b in boxes), min(b[1] for b in boxes),
+                    max(b[2] for b in boxes), max(b[3] for b in boxes))
+        w, cells = self.width, self.cells
+        for y, runs in roads.h.items():
+            base = (y - self.min_y) * w - self.min_x
+            for a, b in runs:
+                for i in range(base + a, base + b + 1):
+                    cells[i] |= ROAD
+        for x, runs in roads.v.items():
+            for a, b in runs:
+                for y in range(a, b + 1):
+                    cells[(y - self.min_y) * w + x - self.min_x] |= ROAD
+
+    @classmethod
+    def from_city(cls, entities, roads):
+        grid = cls()
+        if roads is not None:
+            grid.mark_roads(roads)
+        grid.mark_entities(entities)
+        return grid
+
+    # --- Persistence ---
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, 0, self.min_x, self.min_y, self.width, self.height))
+            f.write(self.cells)
+        os.replace(tmp, path)
+        return HEADER.size + len(self.cells)
+
+    @classmethod
+    def load(cls, path):
+        """Maps the file read-only; cells is a memoryview into the mapping. None if missing/invalid."""
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, version, _, _, min_x, min_y, width, height = HEADER.unpack_from(mapping, 0)
+        except struct.error:
+            mapping.close()
+            return None
+        if magic != MAGIC or version != VERSION or len(mapping) < HEADER.size + width * height:
+            mapping.close()
+            return None
+        view = memoryview(mapping)
+        grid = cls(min_x, min_y, width, height, view[HEADER.size:HEADER.size + width * height])
+        grid.mapping = mapping
+        grid.view = view
+        return grid
+
+    def _unmap(self):
+        if self.mapping is None:
+            return
+        self.cells.release()
+        self.view.release()
+        self.mapping.close()
+        self.mapping = self.view = None
+
+    def close(self):
+        """Releases the file mapping of a loaded grid (it is empty afterwards)"""
+        if self.mapping is None:
+            return
+        self._unmap()
+        self.cells = bytearray()
+        self.width = self.height = 0
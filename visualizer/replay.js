@@ -0,0 +1,167 @@
+// Time-lapse of the city's growth (T to open / close, Space to play).
+// The app replays datas/city_history.jsonl (city_history.py) and the page
+// walks through it with Api.replay_to: playing or scrubbing nearby brings
+// only the entities that changed, long jumps a full entity table. One
+// request is in flight at a time; a scrub that moves on meanwhile only asks
+// for where the slider is now.
+class TimeLapse {
+    static SPEEDS = [1, 7, 30, 365]; // Days of history per second
+    static STEP_MS = 1000 / 30;
+
+    constructor(onClose) {
+        this.onClose = onClose;
+        this.active = false;
+        this.playing = false;
+        this.busy = false;
+        this.index = null;   // Record shown (null: nothing yet)
+        this.ents = new Map(); // id -> entity, the city shown
+        this.t = 0;
+        this.target = null;
+        this.start = 0;
+        this.end = 0;
+        this.speed = 30;
+        this.bar = null;
+
+        window.addEventListener('keydown', e => {
+            if (e.key === 't' || e.key === 'T') this.toggle();
+            else if (e.key === ' ' && this.active) { e.preventDefault(); this.setPlaying(!this.playing); }
+        });
+    }
+
+    get api() {
+        return window.pywebview && window.pywebview.api;
+    }
+
+    async toggle() {
+        if (this.active) return this.close();
+        if (!this.api || !this.api.replay_open) { console.log("Time-lapse needs the app window"); return; }
+        const info = await this.api.replay_open();
+        if (info.error || !info.records) { console.log("No city history yet", info.error || ''); return; }
+        this.active = true;
+        this.start = info.start;
+        this.end = info.end;
+        this.index = null;
+        this.ents = new Map();
+        this.showBar();
+        this.seek(this.start);
+        this.setPlaying(true);
+    }
+
+    close() {
+        this.active = false;
+        this.playing = false;
+        if (this.bar) { this.bar.remove(); this.bar = null; }
+        this.onClose();
+    }
+
+    setPlaying(on) {
+        this.playing = on;
+        if (this.bar) this.bar.play.textContent = on ? '❚❚' : '▶';
+        if (!on) return;
+        if (this.t >= this.end) this.t = this.start;
+        let last = performance.now();
+        const tick = () => {
+            if (!this.playing || !this.active) return;
+            const now = performance.now();
+            const t = Math.min(this.end, this.t + (now - last) / 1000 * this.speed * 86400);
+            last = now;
+            this.seek(t);
+            if (t >= this.end) this.setPlaying(false);
+            else setTimeout(tick, TimeLapse.STEP_MS);
+        };
+        setTimeout(tick, TimeLapse.STEP_MS);
+    }
+
+    // Go to time t; while a step is in flight only the latest target is kept
+    seek(t) {
+        this.t = t;
+        this.target = t;
+        this.updateBar();
+        if (!this.busy) this.pump();
+    }
+
+    async pump() {
+        this.busy = true;
+        try {
+            while (this.active && this.target !== null) {
+                const t = this.target;
+                this.target = null;
+                await this.step(t);
+            }
+        } catch (e) {
+            console.error("Time-lapse step failed", e);
+        } finally {
+            this.busy = false;
+        }
+    }
+
+    async step(t) {
+        const res = await this.api.replay_to(this.index, t);
+        if (res.error) throw new Error(res.error);
+        if (!this.active) return;
+        const roadMap = res.roads ? RoadMap.fromJSON(res.roads) : null;
+
+        if (res.full) {
+            const chunks = [];
+            for (let i = 0; i < res.full.chunks; i++) {
+                const part = await this.api.city_read_chunk(res.full.id, i);
+                if (part.error) throw new Error(part.error);
+                chunks.push(part.data);
+            }
+            const entities = EntityTable.fromBase64(chunks, res.full.bytes).toObjects();
+            this.ents = new Map(entities.map(e => [e.id, e]));
+            showCity(entities, roadMap);
+        } else {
+            const { put, del } = res.delta;
+            // Only new entities (the usual forward step): add them in place
+            if (!del.length && put.every(e => !this.ents.has(e.id))) {
+                put.forEach(e => this.ents.set(e.id, e));
+                if (put.length || roadMap) addToCity(put, roadMap);
+            } else {
+                del.forEach(id => this.ents.delete(id));
+                put.forEach(e => this.ents.set(e.id, e));
+                showCity(Array.from(this.ents.values()), roadMap);
+            }
+        }
+        this.index = res.index;
+        this.updateBar();
+    }
+
+    showBar() {
+        const bar = document.createElement('div');
+        bar.id = 'timelapse';
+        bar.play = document.createElement('button');
+        bar.play.addEventListener('click', () => this.setPlaying(!this.playing));
+        bar.slider = document.createElement('input');
+        Object.assign(bar.slider, { type: 'range', min: 0, max: 1000, value: 0 });
+        bar.slider.addEventListener('input', () => {
+            this.setPlaying(false);
+            this.seek(this.start + (this.end - this.start) * bar.slider.value / 1000);
+        });
+        bar.speed = document.createElement('select');
+        TimeLapse.SPEEDS.forEach(days => {
+            const opt = document.createElement('option');
+            opt.value = days;
+            opt.textContent = days === 1 ? '1 day/s' : `${days} days/s`;
+            opt.selected = days === this.speed;
+            bar.speed.appendChild(opt);
+        });
+        bar.speed.addEventListener('change', () => { this.speed = Number(bar.speed.value); });
+        bar.label = document.createElement('span');
+        const close = document.createElement('button');
+        close.textContent = '✕';
+        close.addEventListener('click', () => this.close());
+        bar.append(bar.play, bar.slider, bar.label, bar.speed, close);
+        document.body.appendChild(bar);
+        this.bar = bar;
+    }
+
+    updateBar() {
+        if (!this.bar) return;
+        const span = this.end - this.start;
+        if (document.activeElement !== this.bar.slider) {
+            this.bar.slider.value = span > 0 ? Math.round((this.t - this.start) / span * 1000) : 1000;
+        }
+        this.bar.label.textContent = new Date(this.t * 1000).toLocaleDateString() + ` · ${this.ents.size} buildings`;
+    }
+}
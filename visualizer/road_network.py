@@ -0,0 +1,237 @@
+"""
+Road network stored as axis-aligned segments instead of individual tiles.
+
+The city's roads are long straight streets, so a tile set ({(x, y), ...}, and
+one {"x", "y"} object per tile in roads.json) is mostly redundant. Here each
+street is one segment:
+
+    h: {y: [[x0, x1], ...]}   horizontal runs on row y   (inclusive, sorted, merged)
+    v: {x: [[y0, y1], ...]}   vertical runs on column x
+
+Membership is a binary search in the runs of one row and one column.
+
+roads.json (format 2):
+    {"format": "segments", "h": [[y, x0, x1], ...], "v": [[x, y0, y1], ...]}
+
+Legacy files (a list of {"x", "y"} tiles) are still read.
+"""
+from bisect import bisect_right
+
+FORMAT = "segments"
+
+
+def _insert(lines, key, a, b):
+    lines.setdefault(key, []).append([a, b])
+
+
+def _merge(runs):
+    """Sorts and merges overlapping / touching runs in place"""
+    runs.sort()
+    merged = [runs[0]]
+    for a, b in runs[1:]:
+        last = merged[-1]
+        if a <= last[1] + 1:
+            if b > last[1]:
+                last[1] = b
+        else:
+            merged.append([a, b])
+    runs[:] = merged
+
+
+def _covers(runs, n):
+    if not runs:
+        return False
+    i = bisect_right(runs, [n, float('inf')]) - 1
+    return i >= 0 and runs[i][0] <= n <= runs[i][1]
+
+
+def _cut(lines, key, n):
+    """Removes position n from the runs on one line"""
+    runs = lines.get(key)
+    if not runs:
+        return
+    i = bisect_right(runs, [n, float('inf')]) - 1
+    if i < 0 or not runs[i][0] <= n <= runs[i][1]:
+        return
+    a, b = runs[i]
+    pieces = []
+    if a <= n - 1:
+        pieces.append([a, n - 1])
+    if n + 1 <= b:
+        pieces.append([n + 1, b])
+    runs[i:i + 1] = pieces
+    if not runs:
+        del lines[key]
+
+
+def _subtract(runs, other):
+    """Parts of `runs` not covered by `other` (both sorted and merged)"""
+    out = []
+    j = 0
+    for a, b in runs:
+        while j < len(other) and other[j][1] < a:
+            j += 1
+        k = j
+        while a <= b:
+            if k >= len(other) or other[k][0] > b:
+                out.append([a, b])
+                break
+            if other[k][0] > a:
+                out.append([a, other[k][0] - 1])
+            a = max(a, other[k][1] + 1)
+            k += 1
+    return out
+
+
+def _split_uncovered(a, b, covered):
+    """Runs of positions in [a, b] for which covered(n) is False"""
+    out = []
+    start = None
+    for n in range(a, b + 2):
+        if n <= b and not covered(n):
+            if start is None:
+                start = n
+        elif start is not None:
+            out.append([start, n - 1])
+            start = None
+    return out
+
+
+class RoadNetwork:
+    def __init__(self):
+        self.h = {}
+        self.v = {}
+        self.dirty = False
+
+    # --- Building ---
+    def add_h(self, y, x0, x1):
+        """Horizontal road on row y from x0 to x1 (either order, inclusive)"""
+        _insert(self.h, int(y), int(min(x0, x1)), int(max(x0, x1)))
+        self.dirty = True
+
+    def add_v(self, x, y0, y1):
+        """Vertical road on column x from y0 to y1 (either order, inclusive)"""
+        _insert(self.v, int(x), int(min(y0, y1)), int(max(y0, y1)))
+        self.dirty = True
+
+    def add_tile(self, x, y):
+        self.add_h(y, x, x)
+
+    def remove_tile(self, x, y):
+        self.normalize()
+        _cut(self.h, int(y), int(x))
+        _cut(self.v, int(x), int(y))
+
+    def normalize(self):
+        """Merges overlapping runs (call after a batch of add_*; lookups do it on demand)"""
+        if not self.dirty:
+            return self
+        for lines in (self.h, self.v):
+            for runs in lines.values():
+                _merge(runs)
+        self.dirty = False
+        return self
+
+    # --- Queries ---
+    def has(self, x, y):
+        self.normalize()
+        return _covers(self.h.get(y), x) or _covers(self.v.get(x), y)
+
+    def __contains__(self, tile):
+        return self.has(tile[0], tile[1])
+
+    def tiles(self):
+        """Every road tile as a set of (x, y)"""
+        self.normalize()
+        out = set()
+        for y, runs in self.h.items():
+            for a, b in runs:
+                out.update((x, y) for x in range(a, b + 1))
+        for x, runs in self.v.items():
+            for a, b in runs:
+                out.update((x, y) for y in range(a, b + 1))
+        return out
+
+    def segment_count(self):
+        self.normalize()
+        return sum(len(r) for r in self.h.values()) + sum(len(r) for r in self.v.values())
+
+    def difference(self, other):
+        """Roads in self that `other` doesn't have, as a new RoadNetwork"""
+        self.normalize()
+        if other is None:
+            return RoadNetwork.from_dict(self.to_dict())
+        other.normalize()
+        out = RoadNetwork()
+        # Same-orientation runs first (cheap), then the few leftover tiles
+        # against the crossing streets
+        for y, runs in self.h.items():
+            for a, b in _subtract(runs, other.h.get(y, [])):
+                for a2, b2 in _split_uncovered(a, b, lambda x: _covers(other.v.get(x), y)):
+                    _insert(out.h, y, a2, b2)
+        for x, runs in self.v.items():
+            for a, b in _subtract(runs, other.v.get(x, [])):
+                for a2, b2 in _split_uncovered(a, b, lambda y: _covers(other.h.get(y), x)):
+                    _insert(out.v, x, a2, b2)
+        return out
+
+    def copy(self):
+        self.normalize()
+        net = RoadNetwork()
+        net.h = {y: [run[:] for run in runs] for y, runs in self.h.items()}
+        net.v = {x: [run[:] for run in runs] for x, runs in self.v.items()}
+        return net
+
+    # --- Conversion ---
+    @classmethod
+    def from_tiles(cls, tiles):
+        """Packs a tile set: maximal horizontal runs of 2+ tiles, the rest as vertical runs"""
+        tiles = set((int(x), int(y)) for x, y in tiles)
+        net = cls()
+        leftover = set()
+        for x, y in sorted(tiles, key=lambda t: (t[1], t[0])):
+            runs = net.h.get(y)
+            if runs and runs[-1][1] == x - 1:
+                runs[-1][1] = x
+            else:
+                _insert(net.h, y, x, x)
+        for y in list(net.h):
+            keep = []
+            for a, b in net.h[y]:
+                if a == b:
+                    leftover.add((a, y))
+                else:
+                    keep.append([a, b])
+            if keep:
+                net.h[y] = keep
+            else:
+                del net.h[y]
+        for x, y in sorted(leftover):
+            runs = net.v.get(x)
+            if runs and runs[-1][1] == y - 1:
+                runs[-1][1] = y
+            else:
+                _insert(net.v, x, y, y)
+        return net
+
+    def to_dict(self):
+        self.normalize()
+        return {
+            "format": FORMAT,
+            "h": [[y, a, b] for y in sorted(self.h) for a, b in self.h[y]],
+            "v": [[x, a, b] for x in sorted(self.v) for a, b in self.v[x]]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reads either format of roads.json"""
+        if isinstance(data, list):
+            return cls.from_tiles((r['x'], r['y']) for r in data)
+        if not isinstance(data, dict) or data.get("format") != FORMAT:
+            raise ValueError("Unknown roads format")
+        net = cls()
+        for y, a, b in data.get("h", []):
+            net.add_h(y, a, b)
+        for x, a, b in data.get("v", []):
+            net.add_v(x, a, b)
+        return net.normalize()
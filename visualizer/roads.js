@@ -0,0 +1,75 @@
+// Road network as axis-aligned segments (see road_network.py).
+// Each row / column keeps its runs as a flat sorted Int32Array
+// [start0, end0, start1, end1, ...] and has() is a binary search in the
+// runs of one row and one column.
+class RoadMap {
+    constructor() {
+        this.h = new Map(); // y -> Int32Array of runs along x
+        this.v = new Map(); // x -> Int32Array of runs along y
+    }
+
+    // Accepts both roads.json formats: {"format": "segments", h, v} or a legacy [{x, y}, ...] tile list
+    static fromJSON(data) {
+        const map = new RoadMap();
+        if (Array.isArray(data)) {
+            data.forEach(r => map.addRuns(map.h, [[r.y, r.x, r.x]]));
+        } else if (data && data.format === 'segments') {
+            map.addRuns(map.h, data.h || []);
+            map.addRuns(map.v, data.v || []);
+        }
+        return map;
+    }
+
+    // Adds [line, a, b] runs and re-packs the touched lines
+    addRuns(lines, runs) {
+        const touched = new Map();
+        for (const [line, a, b] of runs) {
+            if (!touched.has(line)) {
+                const existing = lines.get(line);
+                const list = [];
+                if (existing) for (let i = 0; i < existing.length; i += 2) list.push([existing[i], existing[i + 1]]);
+                touched.set(line, list);
+            }
+            touched.get(line).push([Math.min(a, b), Math.max(a, b)]);
+        }
+        for (const [line, list] of touched) {
+            list.sort((p, q) => p[0] - q[0]);
+            const merged = [];
+            for (const [a, b] of list) {
+                const n = merged.length;
+                if (n && a <= merged[n - 1] + 1) {
+                    merged[n - 1] = Math.max(merged[n - 1], b);
+                } else {
+                    merged.push(a, b);
+                }
+            }
+            lines.set(line, Int32Array.from(merged));
+        }
+    }
+
+    // Applies a city_changes.json "roads" entry (same shape as roads.json)
+    merge(data) {
+        if (!data) return;
+        if (Array.isArray(data)) {
+            this.addRuns(this.h, data.map(r => [r.y, r.x, r.x]));
+            return;
+        }
+        this.addRuns(this.h, data.h || []);
+        this.addRuns(this.v, data.v || []);
+    }
+
+    static covers(runs, n) {
+        if (!runs) return false;
+        // Last run starting at or before n
+        let lo = 0, hi = (runs.length >> 1) - 1, found = -1;
+        while (lo <= hi) {
+            const mid = (lo + hi) >> 1;
+            if (runs[mid * 2] <= n) { found = mid; lo = mid + 1; } else { hi = mid - 1; }
+        }
+        return found >= 0 && n <= runs[found * 2 + 1];
+    }
+
+    has(x, y) {
+        return RoadMap.covers(this.h.get(y), x) || RoadMap.covers(this.v.get(x), y);
+    }
+}
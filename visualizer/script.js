@@ -38,6 +38,9 @@ const PALETTE = {
     }
 };
 
+// Smooth time-of-day / weather light over PALETTE (lighting.js); set from world.json
+const lighting = new Lighting(PALETTE);
+
 const GRID_LINE_COLOR = 'rgba(0, 0, 0, 0)'; // Transparent
 const HOUSE_SIDE_SHADE = 0.8; // Multiplier for side face
 const HOUSE_TOP_SHADE = 1.0;  // Multiplier for top face
@@ -64,12 +67,24 @@ let initialZoom = null;
 
 // World Data
 let houses = []; // Will be loaded from JSON
-let roads = new Set(); // Set of "x,y" strings
+let roads = new RoadMap(); // Road segments (roads.js)
+let grid = new OccupancyGrid(); // Cell kinds (occupancy.js): road / building lookups
+let houseAt = new Map(); // "x,y" -> house, for clicks on cells the grid marks as buildings
+let animatingHouses = new Set(); // Houses with a non-zero hover animation
 let worldConfig = { weather: "none" }; // Default config
 let cloudSystem; // Cloud Manager
 let npcManager; // NPC Manager
 let constructionState = null; // Next building spot and progress
 let constructionHoverAnim = 0; // Animation state for construction bars
+let citySeq = null; // Last applied city_changes.json sequence number
+let constructionText = null; // Last construction_state.json body, to skip redraws when unchanged
+let timeLapse = null; // Replay of the city's history (replay.js), T to open
+
+// Rendering on demand (frame_scheduler.js)
+let scheduler = null;
+let frameSteps = 1; // 60 Hz simulation ticks covered by the frame being drawn
+let hoverEasing = false; // A hover animation hasn't settled yet: draw at full rate
+const DEFAULT_AMBIENT_FPS = 10; // Idle motion (sway, clouds, smoke, rain) when world.json has no ambientFps
 
 
 
@@ -84,31 +99,32 @@ async function init() {
     // Load data
     try {
         console.log("Fetching data...");
-        const [housesRes, worldRes, roadsRes] = await Promise.all([
-            fetch('stargazers_houses.json?t=' + Date.now()),
-            fetch('world.json?t=' + Date.now()),
-            fetch('roads.json?t=' + Date.now()).catch(e => null) // Fallback for roads
+        // Changes first: anything newer than this seq is applied on top of the snapshot
+        citySeq = await fetchCitySeq();
+        const [loadedHouses, worldRes, roadsRes, gridRes] = await Promise.all([
+            fetchHouses(),
+            fetchData('world.json'),
+            fetchData('roads.json').catch(e => null), // Fallback for roads
+            fetchData('occupancy.bin').catch(e => null)
         ]);
 
-        if (!housesRes.ok) throw new Error(`Houses fetch failed: ${housesRes.status}`);
         if (!worldRes.ok) throw new Error(`World fetch failed: ${worldRes.status}`);
 
-        houses = await housesRes.json();
+        houses = loadedHouses;
         console.log("Loaded houses:", houses.length);
 
         worldConfig = await worldRes.json();
+        updateLighting();
 
         if (roadsRes && roadsRes.ok) {
             try {
-                const roadData = await roadsRes.json();
-                if (Array.isArray(roadData)) {
-                    roadData.forEach(r => roads.add(`${r.x},${r.y}`));
-                }
+                roads = RoadMap.fromJSON(await roadsRes.json());
             } catch (e) { console.log("No roads found or invalid JSON"); }
         }
 
         // Initialize animation state
         houses.forEach(h => h.hoverAnim = 0);
+        await loadGrid(gridRes);
     } catch (e) {
         console.error("Failed to load data detailed:", e);
         // Fallback for visual debugging
@@ -124,32 +140,217 @@ async function init() {
     // Polling for World Updates (every 10 seconds)
     setInterval(async () => {
         try {
-            const worldRes = await fetch('world.json?t=' + Date.now());
-            if (worldRes.ok) {
+            const worldRes = await fetchIfChanged('world.json');
+            if (worldRes) {
                 const newConfig = await worldRes.json();
-                if (newConfig.timeOfDay !== worldConfig.timeOfDay || newConfig.weather !== worldConfig.weather) {
+                if (newConfig.timeOfDay !== worldConfig.timeOfDay || newConfig.weather !== worldConfig.weather ||
+                    newConfig.ambientFps !== worldConfig.ambientFps) {
                     console.log("World State Updated:", newConfig);
                     worldConfig = newConfig;
+                    scheduler.setAmbientFps(ambientFps());
+                    updateLighting();
+                    requestRender();
+                } else if (newConfig.minuteOfDay !== worldConfig.minuteOfDay) {
+                    worldConfig = newConfig;
+                    if (updateLighting()) requestRender();
                 }
             }
         } catch(e) { console.log("Polling failed", e); }
         
+        // New entities / roads since the last poll
+        try { await pollCityChanges(); } catch(e) { /* ignore */ }
+
         // Poll Construction State (more frequently if needed, but 1s is fine)
         try {
-            const constRes = await fetch('construction_state.json?t=' + Date.now());
-            if (constRes.ok) {
-                constructionState = await constRes.json();
+            const constRes = await fetchIfChanged('construction_state.json');
+            if (constRes) {
+                const text = await constRes.text();
+                if (text !== constructionText) {
+                    constructionState = JSON.parse(text);
+                    constructionText = text;
+                    requestRender();
+                }
             }
         } catch(e) { /* ignore */ }
     }, 1000); // Increased polling rate to 1s for smoother progress bars
 
-    requestAnimationFrame(render);
+    timeLapse = new TimeLapse(() => reloadCity());
+
+    // Draw on demand: input, data changes and hover easing; idle motion
+    // (grass and trees always sway) at the ambient rate
+    scheduler = new FrameScheduler(render, {
+        isAnimating: () => hoverEasing,
+        hasAmbient: () => true,
+        ambientFps: ambientFps()
+    });
+}
+
+function ambientFps() {
+    const fps = Number(worldConfig.ambientFps);
+    return Number.isFinite(fps) && fps >= 0 ? fps : DEFAULT_AMBIENT_FPS;
+}
+
+// world.json's minute of the day; a world.json without one only says day or night
+function worldMinute() {
+    const minute = Number(worldConfig.minuteOfDay);
+    if (Number.isFinite(minute)) return minute;
+    return worldConfig.timeOfDay === 'night' ? 0 : 720;
+}
+
+function updateLighting() {
+    return lighting.set(worldMinute(), worldConfig.weather);
+}
+
+function requestRender() {
+    if (scheduler) scheduler.invalidate();
+}
+
+// Data files are revalidated, not cache-busted: served by local_server.py an
+// unchanged file comes back as a 304, and a poll whose ETag hasn't moved gets
+// null without reading or parsing the body.
+const seenETags = new Map();
+
+function fetchData(name) {
+    return fetch(name, { cache: 'no-cache' });
+}
+
+async function fetchIfChanged(name) {
+    const res = await fetchData(name);
+    if (!res.ok) return null;
+    const tag = res.headers.get('ETag');
+    if (tag && seenETags.get(name) === tag) return null;
+    if (tag) seenETags.set(name, tag);
+    return res;
+}
+
+// --- Incremental City Updates ---
+// The collector appends every layout change to city_changes.json (last few
+// only). Additions are applied in place; a "reload" change or a gap we can't
+// bridge re-fetches the whole city.
+async function fetchCitySeq() {
+    try {
+        const res = await fetchIfChanged('city_changes.json');
+        if (res) return (await res.json()).seq || 0;
+    } catch (e) { /* no changes yet */ }
+    return 0;
+}
+
+// The city's entities: in the app window a binary entity table over the
+// bridge (base64 chunks, see entity_table.js), stargazers_houses.json otherwise
+async function fetchHouses() {
+    const api = window.pywebview && window.pywebview.api;
+    if (api && api.city_read_begin) {
+        try {
+            const info = await api.city_read_begin();
+            if (info.error) throw new Error(info.error);
+            const chunks = [];
+            for (let i = 0; i < info.chunks; i++) {
+                const res = await api.city_read_chunk(info.id, i);
+                if (res.error) throw new Error(res.error);
+                chunks.push(res.data);
+            }
+            return EntityTable.fromBase64(chunks, info.bytes).toObjects();
+        } catch (e) {
+            console.log("Binary city load failed, falling back to JSON", e);
+        }
+    }
+    const res = await fetchData('stargazers_houses.json');
+    if (!res.ok) throw new Error(`Houses fetch failed: ${res.status}`);
+    return res.json();
+}
+
+// Occupancy grid from occupancy.bin, or rasterized here if it's missing/outdated
+async function loadGrid(gridRes) {
+    grid = null;
+    if (gridRes && gridRes.ok) {
+        try { grid = OccupancyGrid.fromBuffer(await gridRes.arrayBuffer()); } catch (e) { grid = null; }
+    }
+    indexCity(grid);
+}
+
+// Lookups for the current houses / roads (a loaded grid, or one rasterized here)
+function indexCity(loaded = null) {
+    grid = loaded || OccupancyGrid.build(houses, roads);
+    houseAt = new Map();
+    animatingHouses = new Set();
+    houses.forEach(h => houseAt.set(`${h.x},${h.y}`, h));
+}
+
+// The time-lapse (replay.js) shows past cities through these two
+function showCity(entities, roadMap) {
+    houses = entities;
+    houses.forEach(h => h.hoverAnim = 0);
+    if (roadMap) roads = roadMap;
+    indexCity();
+    requestRender();
+}
+
+function addToCity(entities, roadMap) {
+    for (const ent of entities) {
+        ent.hoverAnim = 0;
+        houses.push(ent);
+        grid.markEntity(ent, houses.length - 1);
+        houseAt.set(`${ent.x},${ent.y}`, ent);
+    }
+    if (roadMap) {
+        roads = roadMap;
+        grid.markRoads(roadMap);
+    }
+    requestRender();
+}
+
+async function reloadCity() {
+    const [loadedHouses, roadsRes, gridRes] = await Promise.all([
+        fetchHouses().catch(e => null),
+        fetchData('roads.json'),
+        fetchData('occupancy.bin')
+    ]);
+    if (loadedHouses) {
+        houses = loadedHouses;
+        houses.forEach(h => h.hoverAnim = 0);
+    }
+    if (roadsRes.ok) {
+        roads = RoadMap.fromJSON(await roadsRes.json());
+    }
+    await loadGrid(gridRes);
+    requestRender();
+}
+
+async function pollCityChanges() {
+    if (timeLapse && timeLapse.active) return; // Caught up with reloadCity() when it closes
+    const res = await fetchIfChanged('city_changes.json');
+    if (!res) return;
+    const data = await res.json();
+    if (!data.seq || data.seq <= citySeq) return;
+
+    const pending = (data.changes || []).filter(c => c.seq > citySeq);
+    const missed = !pending.length || pending[0].seq !== citySeq + 1;
+    citySeq = data.seq;
+    if (missed || pending.some(c => c.reload)) {
+        await reloadCity();
+        return;
+    }
+    const known = new Set(houses.map(h => h.slot));
+    for (const change of pending) {
+        for (const ent of change.added) {
+            if (ent.slot !== undefined && known.has(ent.slot)) continue;
+            ent.hoverAnim = 0;
+            houses.push(ent);
+            known.add(ent.slot);
+            grid.markEntity(ent, houses.length - 1);
+            houseAt.set(`${ent.x},${ent.y}`, ent);
+        }
+        roads.merge(change.roads);
+        grid.markRoads(RoadMap.fromJSON(change.roads));
+    }
+    requestRender();
 }
 
 function resizeCanvas() {
     canvas.width = window.innerWidth;
     canvas.height = window.innerHeight;
     // initial center if needed, but (0,0) is fine for now
+    requestRender();
 }
 
 // --- Input Handling ---
@@ -175,7 +376,7 @@ function setupInputListeners() {
         const gy = Math.round(gridPos.y);
 
         // 3. Check House
-        const house = houses.find(h => h.x === gx && h.y === gy);
+        const house = grid.isBuilding(gx, gy) ? houseAt.get(`${gx},${gy}`) : null;
         if (house && !house.obstacle) {
             // Spawn NPC from this house center
             // NPC coords are Cartesian (Grid * Scale)
@@ -195,6 +396,7 @@ function setupInputListeners() {
                 }
 
                 npcManager.spawnNPC(spawnX, spawnY);
+                requestRender();
             }
         }
     });
@@ -215,6 +417,7 @@ function setupInputListeners() {
 
         lastMouseX = e.clientX;
         lastMouseY = e.clientY;
+        requestRender();
     });
 
     // Track mouse move even when not dragging
@@ -222,6 +425,7 @@ function setupInputListeners() {
         if (isDragging) return; // handled above
         currentMouseX = e.clientX;
         currentMouseY = e.clientY;
+        requestRender(); // Hover may change
     });
 
     // Wheel Zoom
@@ -255,6 +459,7 @@ function setupInputListeners() {
 
         camera.x = worldMouseX - (screenX - centerX) / newZoom;
         camera.y = worldMouseY - (screenY - centerY) / newZoom;
+        requestRender();
 
     }, { passive: false });
 
@@ -293,6 +498,7 @@ function setupInputListeners() {
                 // Note: Pinch zoom to center could be improved here similarly to mouse wheel
             }
         }
+        requestRender();
     }, { passive: false });
 
     window.addEventListener('touchend', () => {
@@ -353,11 +559,12 @@ function worldToGrid(worldX, worldY) {
 
 
 // --- Rendering ---
-function render() {
-    // 0. Determine Palette
-    const time = worldConfig.timeOfDay || 'day'; // 'day' or 'night'
-    const colors = PALETTE[time] || PALETTE.day;
-    const isNight = time === 'night';
+// Called by the FrameScheduler; `steps` 60 Hz ticks have passed since the last frame
+function render(steps = 1) {
+    frameSteps = steps;
+
+    // 0. Determine Palette (this minute's light, see lighting.js)
+    const colors = lighting.ground;
 
     // 1. Clear background
     ctx.fillStyle = colors.bg;
@@ -381,7 +588,7 @@ function render() {
 
     // 4b. Render NPCs (Ideally integrated with houses for depth, but overlaid for now)
     if (npcManager) {
-        npcManager.update();
+        for (let i = 0; i < steps; i++) npcManager.update();
         npcManager.render(ctx);
     }
 
@@ -389,8 +596,8 @@ function render() {
     drawParticles();
 
     // 5b. Draw Clouds (Day Only)
-    if (cloudSystem && worldConfig.timeOfDay !== 'night') {
-        cloudSystem.update();
+    if (cloudSystem && lighting.darkness < 0.5) {
+        for (let i = 0; i < steps; i++) cloudSystem.update();
         cloudSystem.render(ctx);
     }
 
@@ -398,8 +605,6 @@ function render() {
     drawWeather();
 
     ctx.restore();
-
-    requestAnimationFrame(render);
 }
 
 
@@ -409,10 +614,10 @@ function drawParticles() {
     // Update and Draw in one loop
     for (let i = particles.length - 1; i >= 0; i--) {
         const p = particles[i];
-        p.life -= 0.01;
-        p.x += p.vx;
-        p.y += p.vy;
-        p.radius += 0.05; // Expand
+        p.life -= 0.01 * frameSteps;
+        p.x += p.vx * frameSteps;
+        p.y += p.vy * frameSteps;
+        p.radius += 0.05 * frameSteps; // Expand
 
         if (p.life <= 0) {
             particles.splice(i, 1);
@@ -480,8 +685,8 @@ function drawWeather() {
         ctx.lineTo(d.x - 2, d.y + d.l); // Slight tilt
 
         // Update
-        d.y += d.v;
-        d.x -= 0.5; // Wind
+        d.y += d.v * frameSteps;
+        d.x -= 0.5 * frameSteps; // Wind
 
         // Reset
         if (d.y > h) {
@@ -548,18 +753,15 @@ function renderVisibleGrid() {
 
     // Draw tiles
     ctx.lineWidth = 1;
+    const colors = lighting.ground;
 
     for (let gy = startY; gy <= endY; gy++) {
         for (let gx = startX; gx <= endX; gx++) {
             const worldPos = gridToWorld(gx, gy);
-            const tileKey = `${gx},${gy}`;
-
-            if (roads.has(tileKey)) {
+            if (grid.isRoad(gx, gy)) {
                 drawRoadTile(gx, gy, worldPos);
             } else {
                 // Natural Grass Pattern
-                const colors = PALETTE[worldConfig.timeOfDay || 'day'] || PALETTE.day;
-
                 // Use a pseudo-random hash to pick distinct grass shades
                 // Simple deterministic noise
                 const seed = Math.sin(gx * 12.9898 + gy * 78.233) * 43758.5453; // common GLSL pseudo-random
@@ -649,13 +851,13 @@ function renderVisibleGrid() {
 
 function drawRoadTile(gx, gy, pos) {
     // 1. Identify Neighbors
-    const hasN = roads.has(`${gx},${gy - 1}`);
-    const hasS = roads.has(`${gx},${gy + 1}`);
-    const hasE = roads.has(`${gx + 1},${gy}`);
-    const hasW = roads.has(`${gx - 1},${gy}`);
+    const hasN = grid.isRoad(gx, gy - 1);
+    const hasS = grid.isRoad(gx, gy + 1);
+    const hasE = grid.isRoad(gx + 1, gy);
+    const hasW = grid.isRoad(gx - 1, gy);
 
     // 2. Draw Sidewalk Base (Full Tile)
-    ctx.fillStyle = "#bdc3c7"; // Concrete Color
+    ctx.fillStyle = lighting.lit("#bdc3c7"); // Concrete Color
     const halfW = TILE_WIDTH / 2;
     const halfH = TILE_HEIGHT / 2;
 
@@ -675,7 +877,7 @@ function drawRoadTile(gx, gy, pos) {
     const cpBottom = { x: pos.x, y: pos.y + halfH * rW };
     const cpLeft = { x: pos.x - halfW * rW, y: pos.y };
 
-    ctx.fillStyle = "#34495e"; // Wet Asphalt / Dark Blue-Grey
+    ctx.fillStyle = lighting.lit("#34495e"); // Wet Asphalt / Dark Blue-Grey
 
     // Draw Center Patch
     ctx.beginPath();
@@ -843,7 +1045,7 @@ function renderHouses() {
              if (typeof drawGitFoundation !== 'undefined') {
                 drawGitFoundation(house.x, house.y, house.hoverAnim, house.username, house.facing);
              } else {
-                 drawHouse(house.x, house.y, house.color, house.roofStyle, house.doorStyle, house.windowStyle, house.chimneyStyle, house.wallStyle, house.hoverAnim, house.username, house.abandoned, house.facing, house.has_terrace, house.is_upgrade_target);
+                 drawHouse(house.x, house.y, house.color, house.roofStyle, house.doorStyle, house.windowStyle, house.chimneyStyle, house.wallStyle, house.hoverAnim, house.username, house.abandoned, house.facing, house.has_terrace, house.id);
              }
         } else if (house.type === 'git_post') {
             // Check if drawGitHouse exists, fall back to drawHouse if not
@@ -851,10 +1053,10 @@ function renderHouses() {
                 drawGitHouse(house.x, house.y, house.hoverAnim, house.username, house.facing);
              } else {
                  // Fallback
-                 drawHouse(house.x, house.y, house.color, house.roofStyle, house.doorStyle, house.windowStyle, house.chimneyStyle, house.wallStyle, house.hoverAnim, house.username, house.abandoned, house.facing, house.has_terrace, house.is_upgrade_target);
+                 drawHouse(house.x, house.y, house.color, house.roofStyle, house.doorStyle, house.windowStyle, house.chimneyStyle, house.wallStyle, house.hoverAnim, house.username, house.abandoned, house.facing, house.has_terrace, house.id);
              }
         } else {
-            drawHouse(house.x, house.y, house.color, house.roofStyle, house.doorStyle, house.windowStyle, house.chimneyStyle, house.wallStyle, house.hoverAnim, house.username, house.abandoned, house.facing, house.has_terrace, house.is_upgrade_target);
+            drawHouse(house.x, house.y, house.color, house.roofStyle, house.doorStyle, house.windowStyle, house.chimneyStyle, house.wallStyle, house.hoverAnim, house.username, house.abandoned, house.facing, house.has_terrace, house.id);
         }
     }
 }
@@ -872,12 +1074,19 @@ function updateHoverState() {
     const gx = Math.round(gridP.x);
     const gy = Math.round(gridP.y);
 
-    // 4. Update Animations
-    for (const house of houses) {
-        const isHovered = (house.x === gx && house.y === gy);
-        const target = isHovered ? 1.0 : 0.0;
+    // 4. Update Animations (only the hovered house and the ones still easing back)
+    const hovered = grid.get(gx, gy) ? houseAt.get(`${gx},${gy}`) : null;
+    if (hovered) animatingHouses.add(hovered);
+    hoverEasing = false;
+    for (const house of animatingHouses) {
+        const target = house === hovered ? 1.0 : 0.0;
         // Smooth Lerp
         house.hoverAnim += (target - house.hoverAnim) * 0.3;
+        if (Math.abs(target - house.hoverAnim) > 0.001) hoverEasing = true;
+        if (house !== hovered && house.hoverAnim < 0.001) {
+            house.hoverAnim = 0;
+            animatingHouses.delete(house);
+        }
     }
 
     // 5. Check Construction Site
@@ -887,10 +1096,11 @@ function updateHoverState() {
         const isHovered = (cx === gx && cy === gy);
         const target = isHovered ? 1.0 : 0.0;
         constructionHoverAnim += (target - constructionHoverAnim) * 0.2; // Slightly slower
+        if (Math.abs(target - constructionHoverAnim) > 0.001) hoverEasing = true;
     }
 }
 
-function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyle, wallStyle, hoverAnim, username, abandoned, facing, has_terrace, is_upgrade_target) {
+function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyle, wallStyle, hoverAnim, username, abandoned, facing, has_terrace, id) {
     const isoCenter = gridToWorld(gx, gy);
 
     // --- "Sketchy" Style Hook (Abandoned Only) ---
@@ -1012,37 +1222,27 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
         color = "#535c68"; // Override roof to dark grey
         glassColor1 = "#2d3436"; // Broken/Dark
         glassColor2 = "#2d3436";
-    } else {
-        // Night Mode Window Light Logic
-        const isNight = worldConfig.timeOfDay === 'night';
-        // Randomly light up windows if night (mostly on)
-        if (isNight) {
-            // Hash for stable randomness per house
-            const seed = Math.abs(Math.sin(gx * 12.9898 + gy * 78.233) * 43758.5453);
-            const isLit = seed > 0.2; // 80% of houses lit
-
-            if (isLit) {
-                glassColor1 = "#f1c40f"; // Warm Yellow Light
-                glassColor2 = "#f39c12"; // Oranger Light
-            } else {
-                glassColor1 = "#2c3e50"; // Dark Blue (Unlit at night)
-                glassColor2 = "#34495e";
-            }
-
-            // Darken Walls and Roof for Night
-            // Slightly blue-tined grey for walls at night
-            wallColor = "#90a4ae";
-            wallShadow = "#607d8b";
-            // Darken Roof Color (Simple overlay)
-            // We'll use adjustColor helper to darken significantly
-            color = adjustColor(color, -60);
-
+    } else if (lighting.darkness > 0.3) {
+        // Windows light up through dusk, each house at its own point (80% of houses lit at night)
+        // Hash for stable randomness per house
+        const seed = Math.abs(Math.sin(gx * 12.9898 + gy * 78.233) * 43758.5453) % 1;
+        const isLit = seed > 0.2 && lighting.darkness >= 0.3 + seed * 0.5;
+
+        if (isLit) {
+            glassColor1 = "#f1c40f"; // Warm Yellow Light
+            glassColor2 = "#f39c12"; // Oranger Light
+        } else if (lighting.darkness >= 0.5) {
+            glassColor1 = "#2c3e50"; // Dark Blue (Unlit at night)
+            glassColor2 = "#34495e";
         }
     }
 
-    const roofColorMain = adjustColor(color, -20);
-    const roofColorDark = adjustColor(color, -40);
-    const roofEdgeColor = adjustColor(color, -50);
+    // Walls and roof under this minute's light (cached per color, see lighting.js)
+    wallColor = lighting.lit(wallColor);
+    wallShadow = lighting.lit(wallShadow);
+    const roofColorMain = lighting.lit(color, -20);
+    const roofColorDark = lighting.lit(color, -40);
+    const roofEdgeColor = lighting.lit(color, -50);
 
     // --- Geometry Points ---
 
@@ -1098,7 +1298,7 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
     ctx.stroke();
 
     // Right Wall Corner Trim (Right Edge)
-    ctx.fillStyle = adjustColor(wallColor, -10); // Slightly distinct trim
+    ctx.fillStyle = lighting.shade(wallColor, -10); // Slightly distinct trim
     ctx.beginPath();
     ctx.moveTo(b2.x, b2.y); // Bottom Right
     ctx.lineTo(toScreen(hw - trimW, -hd, 0).x, toScreen(hw - trimW, -hd, 0).y); // In slightly
@@ -1678,7 +1878,7 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
     }
 
     // Front Wall Trim (Corners)
-    ctx.fillStyle = adjustColor(wallColor, -5);
+    ctx.fillStyle = lighting.shade(wallColor, -5);
     // Left Corner Trim
     ctx.beginPath();
     ctx.moveTo(b4.x, b4.y);
@@ -2085,7 +2285,7 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
     }
 
     ctx.beginPath();
-    ctx.strokeStyle = adjustColor(roofColorMain, -15);
+    ctx.strokeStyle = lighting.shade(roofColorMain, -15);
     ctx.lineWidth = 1;
 
     if (styleIndex === 0) {
@@ -2284,7 +2484,7 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
     // Bottom Edge is parallel to Top Edge, shifted down by 'fasciaHeight'.
     const fasciaHeight = 4;
 
-    ctx.fillStyle = adjustColor(roofColorMain, -10);
+    ctx.fillStyle = lighting.shade(roofColorMain, -10);
     ctx.strokeStyle = roofEdgeColor;
 
     ctx.beginPath();
@@ -2487,14 +2687,14 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
             const c_br_bot = toScreen(cx2, cy2, czBot);
 
             // Cap Front
-            ctx.fillStyle = adjustColor(cColorMain, 10);
+            ctx.fillStyle = lighting.shade(cColorMain, 10);
             ctx.beginPath();
             ctx.moveTo(c_fl_bot.x, c_fl_bot.y); ctx.lineTo(c_fr_bot.x, c_fr_bot.y);
             ctx.lineTo(c_fr_top.x, c_fr_top.y); ctx.lineTo(c_fl_top.x, c_fl_top.y);
             ctx.fill(); ctx.stroke();
 
             // Cap Side
-            ctx.fillStyle = adjustColor(cColorSide, 10);
+            ctx.fillStyle = lighting.shade(cColorSide, 10);
             ctx.beginPath();
             ctx.moveTo(c_fr_bot.x, c_fr_bot.y); ctx.lineTo(c_br_bot.x, c_br_bot.y);
             ctx.lineTo(c_br_top.x, c_br_top.y); ctx.lineTo(c_fr_top.x, c_fr_top.y);
@@ -2552,7 +2752,7 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
             ctx.fill();
 
             // Side
-            ctx.fillStyle = adjustColor(fColor, -15);
+            ctx.fillStyle = lighting.shade(fColor, -15);
             ctx.beginPath();
             ctx.moveTo(fl_fr_bot.x, fl_fr_bot.y); ctx.lineTo(fl_br_bot.x, fl_br_bot.y);
             ctx.lineTo(fl_br_top.x, fl_br_top.y); ctx.lineTo(fl_fr_top.x, fl_fr_top.y);
@@ -2566,7 +2766,7 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
             ctx.fill();
 
             // Rim highlight
-            ctx.strokeStyle = adjustColor(fColor, 20);
+            ctx.strokeStyle = lighting.shade(fColor, 20);
             ctx.lineWidth = 1;
             ctx.beginPath();
             ctx.moveTo(fl_fl_top.x, fl_fl_top.y); ctx.lineTo(fl_fr_top.x, fl_fr_top.y);
@@ -2633,8 +2833,8 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
         }
 
         // --- Smoke Emitter ---
-        // Chance to spawn smoke
-        if (Math.random() < 0.05) {
+        // Chance to spawn smoke (per tick)
+        if (Math.random() < 0.05 * frameSteps) {
             const tip = toScreen(cPos.lx, cPos.ly, zTop + 3);
             spawnSmoke(tip.x, tip.y);
         }
@@ -2824,8 +3024,9 @@ function drawHouse(gx, gy, color, roofStyle, doorStyle, windowStyle, chimneyStyl
     }
 
     // --- Upgrade Progress Bar ---
-    // Check dynamic target from construction state (allows update without reload)
-    const isTarget = (typeof constructionState !== 'undefined' && constructionState && constructionState.upgrade_target === username);
+    // Check dynamic target (an entity id) from construction state (allows update without reload)
+    const isTarget = (typeof constructionState !== 'undefined' && constructionState &&
+        constructionState.upgrade_target != null && constructionState.upgrade_target === id);
     
     if (isTarget && constructionState.metrics && constructionState.metrics.keys) {
         const kParams = constructionState.metrics.keys;
@@ -2940,10 +3141,10 @@ function drawGitFoundation(gx, gy, hoverAnim, username, facing) {
         const p_t_tl = toScreen(-w, -d, z+stepH);
 
         // Front Face
-        ctx.fillStyle = adjustColor(col, -10);
+        ctx.fillStyle = lighting.shade(col, -10);
         ctx.beginPath(); ctx.moveTo(p_bl.x, p_bl.y); ctx.lineTo(p_br.x, p_br.y); ctx.lineTo(p_t_br.x, p_t_br.y); ctx.lineTo(p_t_bl.x, p_t_bl.y); ctx.fill(); ctx.stroke();
         // Right Face
-        ctx.fillStyle = adjustColor(col, -20);
+        ctx.fillStyle = lighting.shade(col, -20);
         ctx.beginPath(); ctx.moveTo(p_br.x, p_br.y); ctx.lineTo(p_tr.x, p_tr.y); ctx.lineTo(p_t_tr.x, p_t_tr.y); ctx.lineTo(p_t_br.x, p_t_br.y); ctx.fill(); ctx.stroke();
         // Top Face
         ctx.fillStyle = col;
@@ -3060,9 +3261,10 @@ function drawGitFoundation(gx, gy, hoverAnim, username, facing) {
         
         // Color variance for facets
         // Use the face index or vertex position to pick shade
-        const shade = 10 + (Math.sin(i * 13 + rotSpeed*2) * 20); // Shimmering
+        // Whole steps: the 41 shades are cached for the lighting step instead of a new one every frame
+        const shade = Math.round(10 + (Math.sin(i * 13 + rotSpeed*2) * 20)); // Shimmering
         // Base Gold: #f1c40f (RGB: 241, 196, 15)
-        const col = adjustColor("#f1c40f", shade);
+        const col = lighting.shade("#f1c40f", shade);
         
         ctx.fillStyle = col;
         ctx.fill();
@@ -2,30 +2,195 @@ import os
 import sys
 import json
 import threading
+import logging
+log = logging.getLogger(__name__)
+
 try:
     import webview
 except ImportError:
-    print("pywebview is not installed. Please run: pip install pywebview")
+    log.critical("pywebview is not installed. Please run: pip install pywebview")
     import sys
     sys.exit(1)
 
 import ctypes
+import base64
+
+import map_store
+from map_store import MapFormatError
+from local_server import start_app_server
+
+if getattr(sys, 'frozen', False):
+    BASE_PATH = sys._MEIPASS
+else:
+    BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_PATH, 'visualizer'))
+
+import entity_table
+from city_history import CityReplay, FULL_STATE_RATIO
+
+
+class Api:
+    """
+    The page's bridge. Maps go through map_store (datas/map.json, atomic,
+    versioned). get_map/save_map carry the whole map in one call; big maps
+    use the chunked calls (see visualizer/map_client.js). The city itself
+    goes as a binary entity table (city_read_*), base64 in chunks.
+    """
+    def __init__(self, base_path=BASE_PATH):
+        self.transfers = map_store.Transfers()
+        self.houses_path = os.path.join(base_path, 'visualizer', 'stargazers_houses.json')
+        self.city_key = None
+        self.city_b64 = None
+        self.city_bytes = 0
+        self.city_lock = threading.Lock()
+        self.replay = None  # CityReplay, loaded when the page opens the time-lapse
+        self.replay_lock = threading.Lock()
+
+    def get_data(self):
+        try:
+            with open(map_store.activity_log_path(), 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def get_map(self):
+        try:
+            return map_store.load_map()
+        except (OSError, MapFormatError) as e:
+            log.error("Error reading map: %s", e)
+            return {"entities": []}
+
+    def save_map(self, data):
+        try:
+            map_store.save_map(data)
+            return {"status": "ok"}
+        except Exception as e:
+            log.error("Error saving map: %s", e)
+            return {"error": str(e)}
+
+    # --- City as a binary entity table ---
+    def city_binary(self):
+        """(base64 text, byte size) of the city's entity table, re-encoded only when the file changes"""
+        st = os.stat(self.houses_path)
+        key = (st.st_mtime_ns, st.st_size)
+        with self.city_lock:
+            if key != self.city_key:
+                with open(self.houses_path, 'r') as f:
+                    data = entity_table.encode(json.load(f))
+                self.city_b64 = base64.b64encode(data).decode('ascii')
+                self.city_bytes = len(data)
+                self.city_key = key
+            return self.city_b64, self.city_bytes
+
+    def city_read_begin(self):
+        """{"id", "size", "chunks", "bytes"}: read the base64 with city_read_chunk, decode with EntityTable"""
+        try:
+            text, size = self.city_binary()
+        except (OSError, ValueError) as e:
+            log.error("Error reading the city: %s", e)
+            return {"error": str(e)}
+        info = self.transfers.begin_read(text)
+        info["bytes"] = size
+        return info
+
+    def city_read_chunk(self, transfer_id, index):
+        return self.map_read_chunk(transfer_id, index)
+
+    # --- Time-lapse replay (city_history.py) ---
+    def replay_open(self):
+        """{"start", "end", "records"} of the city's history (times in epoch seconds), picking up new records"""
+        try:
+            with self.replay_lock:
+                if self.replay is None:
+                    self.replay = CityReplay(map_store.history_path())
+                self.replay.refresh()
+                return {"start": self.replay.start, "end": self.replay.end, "records": len(self.replay)}
+        except (OSError, ValueError) as e:
+            log.error("Error reading the city history: %s", e)
+            return {"error": str(e)}
+
+    def replay_to(self, from_index, t):
+        """
+        The city at time t, for a page showing the state after record
+        from_index (None: nothing yet). Small steps come as a delta
+        ({"put", "del"}), big ones as a full entity table to read with
+        city_read_chunk; "roads" only when they differ.
+        """
+        with self.replay_lock:
+            replay = self.replay
+            if replay is None or not len(replay):
+                return {"error": "no history"}
+            j = replay.index_at(t)
+            out = {"index": j, "t": replay.times[j] if j >= 0 else replay.start}
+            delta = None
+            if from_index is not None:
+                limit = max(64, int(len(replay.ents) * FULL_STATE_RATIO))
+                delta = replay.delta(from_index, j, limit)
+            if delta is not None:
+                out["delta"] = delta
+                if replay.roads_changed(from_index, j):
+                    out["roads"] = replay.roads_at(j).to_dict()
+                return out
+            entities, roads = replay.state_at(j)
+            out["roads"] = roads.to_dict()
+        data = entity_table.encode(entities)
+        out["full"] = self.transfers.begin_read(base64.b64encode(data).decode('ascii'))
+        out["full"]["bytes"] = len(data)
+        return out
+
+    # --- Chunked (large maps) ---
+    def map_read_begin(self):
+        """{"id", "size", "chunks", "version"} for reading the saved map text chunk by chunk"""
+        try:
+            text = map_store.read_map_text()
+            map_store.decode_map(text)  # Refuse unreadable maps up front
+        except (OSError, MapFormatError) as e:
+            log.error("Error reading map: %s", e)
+            text = map_store.encode_map({"entities": []})
+        info = self.transfers.begin_read(text)
+        info["version"] = map_store.VERSION
+        return info
+
+    def map_read_chunk(self, transfer_id, index):
+        try:
+            return {"data": self.transfers.read_chunk(transfer_id, index)}
+        except (KeyError, IndexError) as e:
+            return {"error": str(e)}
+
+    def map_write_begin(self):
+        return {"id": self.transfers.begin_write(), "chunk_chars": self.transfers.chunk_chars}
+
+    def map_write_chunk(self, transfer_id, index, text):
+        try:
+            self.transfers.write_chunk(transfer_id, index, text)
+            return {"status": "ok"}
+        except (KeyError, IndexError) as e:
+            return {"error": str(e)}
+
+    def map_write_commit(self, transfer_id):
+        try:
+            size = map_store.save_map_text(self.transfers.finish_write(transfer_id))
+            return {"status": "ok", "bytes": size}
+        except Exception as e:
+            log.error("Error saving map: %s", e)
+            return {"error": str(e)}
+
 
 def main():
     # Calculate path to the HTML file
-    if getattr(sys, 'frozen', False):
-        cpath = sys._MEIPASS
-    else:
-        cpath = os.path.dirname(os.path.abspath(__file__))
-    html_file = os.path.join(cpath, 'visualizer', 'index.html')
+    html_file = os.path.join(BASE_PATH, 'visualizer', 'index.html')
     
     if not os.path.exists(html_file):
-        print(f"File not found: {html_file}")
+        log.error("File not found: %s", html_file)
         return
         
-    # Create file URL
-    file_url = f"file:///{html_file.replace(os.sep, '/')}"
-    print(f"Opening: {file_url}")
+    # Served over loopback HTTP (ETags, 304s, compression); file:/// if that fails
+    server = start_app_server()
+    if server:
+        file_url = server.url('visualizer/index.html')
+    else:
+        file_url = f"file:///{html_file.replace(os.sep, '/')}"
+    log.info("Opening: %s", file_url)
     
     # Calculate Center
     width = 800
@@ -38,37 +203,10 @@ def main():
         x = (screen_width - width) // 2
         y = (screen_height - height) // 2
     except Exception as e:
-        print(f"Error getting screen size: {e}")
+        log.warning("Error getting screen size: %s", e)
         x = None
         y = None
     
-    # API Class for communication
-    class Api:
-        def get_data(self):
-            try:
-                with open('activity_log.json', 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                return {"error": str(e)}
-
-        def get_map(self):
-            if not os.path.exists('map.json'):
-                return {"entities": []}
-            try:
-                with open('map.json', 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error reading map: {e}")
-                return {"entities": []}
-
-        def save_map(self, data):
-            try:
-                with open('map.json', 'w') as f:
-                    json.dump(data, f, indent=4)
-                return {"status": "ok"}
-            except Exception as e:
-                return {"error": str(e)}
-
     # Create the window directly
     webview.create_window(
         'My Visualizer', 
@@ -84,4 +222,6 @@ def main():
     webview.start(debug=False)
 
 if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging("visualizer")
     main()